@@ -0,0 +1,257 @@
+# balance_sim.py
+# Monte Carlo balance sweep for quick battles, run as arrays so millions of fights take seconds.
+# Mirrors combat.CombatEngine: same swing timers, crit/dodge/avoid/block rolls and armor mitigation.
+#
+# Usage:
+#   python balance_sim.py                                   # every class, levels 1-50, every rarity
+#   python balance_sim.py --classes Warrior --levels 10-20 --rarities Common Epic --fights 50000
+#   python balance_sim.py --csv balance.csv
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from combat import QUICK_SPAWN_DELAY, QUICK_UNARMED_DAMAGE, MIN_ATTACK_DELAY, find_tier
+from items import create_item, EQUIP_SLOTS, WEAPON_TYPES
+from settings import RARITY_MULTIPLIERS, CLASS_PRIMARIES, CLASS_SECONDARIES
+from stats import calculate_total_stats
+
+MAX_FIGHT_SECONDS = 600.0  # A fight still going after this counts as a loss
+ELITE_CHANCE = 0.15
+
+# Fresh character stats, see CharacterCreationScreen
+BASE_STATS = {
+    "Health": 10, "Mana": 10, "base_health": 10, "base_mana": 10,
+    "Strength": 5, "Dexterity": 5, "Intelligence": 5, "Vitality": 5,
+    "Critical Chance": 0, "Critical Damage": 0, "Armor": 0, "Block": 0, "Dodge": 0,
+    "Attack Speed": 1.0
+}
+
+
+# --- Loadouts ---
+
+def weapon_loadouts(char_class):
+    """Every distinct (primary, secondary) pair the class can wield, two-handers get no secondary."""
+    loadouts = []
+    for primary in dict.fromkeys(CLASS_PRIMARIES[char_class]):
+        if WEAPON_TYPES[primary]["slots"] == 2:
+            loadouts.append((primary, None))
+            continue
+        for secondary in dict.fromkeys(CLASS_SECONDARIES[char_class]):
+            loadouts.append((primary, secondary))
+    return loadouts
+
+
+def build_player(char_class, level, rarity, primary, secondary):
+    """Total stats and equipment for a character of this level wearing a full set of one rarity."""
+    stats = dict(BASE_STATS)
+    stats["base_health"] += 5 * (level - 1)
+    stats["base_mana"] += 5 * (level - 1)
+
+    equipment = {}
+    for slot in EQUIP_SLOTS["armor"] + EQUIP_SLOTS["accessory"]:
+        equipment[slot] = create_item(slot, char_class, rarity=rarity, item_level=level)
+    equipment["primary"] = create_item("primary", char_class, rarity=rarity, weapon_type=primary, item_level=level)
+    if secondary:
+        equipment["secondary"] = create_item("secondary", char_class, rarity=rarity, weapon_type=secondary,
+                                             item_level=level)
+
+    return calculate_total_stats(stats, equipment, char_class), equipment
+
+
+def weapon_range(equipment, slot):
+    weapon = equipment.get(slot)
+    if weapon:
+        return weapon["stats"].get("Min Damage", 1), weapon["stats"].get("Max Damage", 5)
+    return QUICK_UNARMED_DAMAGE
+
+
+def quick_enemy_variants(level):
+    """(normal, elite) stat tuples, same formulas as combat.generate_quick_enemy."""
+    tier = find_tier(level)
+    hp = int(tier["base_hp"] + level * 5)
+    dmg = int(tier["base_dmg"] + level * 1.5)
+    speed = round(max(0.5, tier["base_speed"] - level * 0.02), 2)
+    xp = int(tier["base_xp"] + level * 2.5)
+    copper = int(tier["base_copper"] + level * 15)
+    normal = (hp, dmg, speed, xp, copper)
+    elite = (int(hp * 1.6), int(dmg * 1.5), max(speed - 0.1, 0.5), int(xp * 2), int(copper * 1.75))
+    return normal, elite, 10 + level * 0.5, 50
+
+
+# --- Batch fights ---
+
+def simulate_batch(configs, fights, rng):
+    """Fights `fights` quick battles for every config at once. Returns one result dict per config."""
+    n = len(configs) * fights
+    owner = np.repeat(np.arange(len(configs)), fights)
+
+    def column(key, dtype=np.float64):
+        return np.asarray([c[key] for c in configs], dtype=dtype)[owner]
+
+    # Player side
+    p_min1, p_max1 = column("p_min1", np.int64), column("p_max1", np.int64)
+    p_min2, p_max2 = column("p_min2", np.int64), column("p_max2", np.int64)
+    bonus = column("bonus")
+    p_crit, p_crit_dmg = column("crit") / 100, column("crit_dmg") / 100
+    dodge, avoid, block = column("dodge") / 100, column("avoid") / 100, column("block") / 100
+    armor = column("armor")
+    p_delay = column("delay")
+    player_hp = column("health")
+
+    # Enemy side, elites rolled per fight
+    elite = rng.random(n) < ELITE_CHANCE
+    def enemy(index):
+        return np.where(elite, column(f"elite_{index}"), column(f"normal_{index}"))
+    enemy_hp, e_dmg, e_speed, reward_xp, reward_copper = (enemy(i) for i in range(5))
+    e_delay = np.maximum(MIN_ATTACK_DELAY, 1.0 / e_speed)
+    e_crit, e_crit_dmg = column("enemy_crit") / 100, column("enemy_crit_dmg") / 100
+
+    next_player = p_delay.copy()
+    next_enemy = e_delay.copy()
+    won = np.zeros(n, dtype=bool)
+    duration = np.full(n, MAX_FIGHT_SECONDS)
+
+    active = np.arange(n)
+    while active.size:
+        t_player, t_enemy = next_player[active], next_enemy[active]
+
+        # Timed out fights are losses
+        timed_out = np.minimum(t_player, t_enemy) > MAX_FIGHT_SECONDS
+        active, t_player, t_enemy = active[~timed_out], t_player[~timed_out], t_enemy[~timed_out]
+
+        # Whoever's swing comes first acts, the player wins ties like in the screens
+        player_turn = t_player <= t_enemy
+        p = active[player_turn]
+        e = active[~player_turn]
+
+        dmg = rng.integers(p_min1[p], p_max1[p] + 1) + rng.integers(p_min2[p], p_max2[p] + 1) + bonus[p]
+        crit = rng.random(p.size) < p_crit[p]
+        dmg = np.where(crit, np.floor(dmg * (1 + p_crit_dmg[p])), dmg)
+        enemy_hp[p] -= dmg
+        next_player[p] += p_delay[p]
+
+        missed = (rng.random(e.size) < dodge[e]) | (rng.random(e.size) < avoid[e])
+        hit = e_dmg[e]
+        hit = np.where(rng.random(e.size) < e_crit[e], np.floor(hit * (1 + e_crit_dmg[e])), hit)
+        hit = np.where(rng.random(e.size) < block[e], np.floor(hit * 0.5), hit)
+        hit = np.where(missed, 0, np.maximum(0, hit - armor[e]))
+        player_hp[e] -= hit
+        next_enemy[e] += e_delay[e]
+
+        kills = p[enemy_hp[p] <= 0]
+        won[kills] = True
+        duration[kills] = t_player[player_turn][enemy_hp[p] <= 0]
+        deaths = e[player_hp[e] <= 0]
+        duration[deaths] = t_enemy[~player_turn][player_hp[e] <= 0]
+
+        finished = np.zeros(n, dtype=bool)
+        finished[kills] = True
+        finished[deaths] = True
+        active = active[~finished[active]]
+
+    # Quick battles respawn after QUICK_SPAWN_DELAY on a win and restart straight away on a loss
+    results = []
+    for i, config in enumerate(configs):
+        span = slice(i * fights, (i + 1) * fights)
+        wins = won[span]
+        seconds = duration[span].sum() + wins.sum() * QUICK_SPAWN_DELAY
+        hours = seconds / 3600
+        results.append({
+            "class": config["class"],
+            "loadout": config["loadout"],
+            "level": config["level"],
+            "rarity": config["rarity"],
+            "win_rate": wins.mean(),
+            "ttk_mean": duration[span][wins].mean() if wins.any() else float("nan"),
+            "ttk_p90": np.percentile(duration[span][wins], 90) if wins.any() else float("nan"),
+            "xp_per_hour": (reward_xp[span] * wins).sum() / hours,
+            "copper_per_hour": (reward_copper[span] * wins).sum() / hours
+        })
+    return results
+
+
+def make_config(char_class, level, rarity, primary, secondary):
+    total_stats, equipment = build_player(char_class, level, rarity, primary, secondary)
+    normal, elite, enemy_crit, enemy_crit_dmg = quick_enemy_variants(level)
+    p_min1, p_max1 = weapon_range(equipment, "primary")
+    p_min2, p_max2 = weapon_range(equipment, "secondary")
+
+    config = {
+        "class": char_class,
+        "loadout": f"{primary}/{secondary}" if secondary else primary,
+        "level": level,
+        "rarity": rarity,
+        "p_min1": p_min1, "p_max1": p_max1, "p_min2": p_min2, "p_max2": p_max2,
+        "bonus": total_stats.get("Bonus Damage", 0),
+        "crit": total_stats.get("Critical Chance", 0),
+        "crit_dmg": total_stats.get("Critical Damage", 0),
+        "dodge": total_stats.get("Dodge", 0),
+        "avoid": total_stats.get("Avoidance", 0),
+        "block": total_stats.get("Block", 0),
+        "armor": total_stats.get("Armor", 0),
+        "delay": max(MIN_ATTACK_DELAY, 1.0 / total_stats.get("Attack Speed", 1.0)),
+        "health": total_stats.get("Health", 100),
+        "enemy_crit": enemy_crit,
+        "enemy_crit_dmg": enemy_crit_dmg
+    }
+    for index, value in enumerate(normal):
+        config[f"normal_{index}"] = value
+    for index, value in enumerate(elite):
+        config[f"elite_{index}"] = value
+    return config
+
+
+def parse_levels(text):
+    if "-" in text:
+        low, high = text.split("-", 1)
+        return list(range(int(low), int(high) + 1))
+    return [int(text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quick battle balance sweep")
+    parser.add_argument("--classes", nargs="+", default=list(CLASS_PRIMARIES))
+    parser.add_argument("--levels", default="1-50", help="a level or an inclusive range like 1-50")
+    parser.add_argument("--rarities", nargs="+", default=list(RARITY_MULTIPLIERS))
+    parser.add_argument("--fights", type=int, default=10000, help="fights per configuration")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--csv", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    results = []
+
+    # One batch per level keeps memory flat while still running hundreds of thousands of fights at once
+    for level in parse_levels(args.levels):
+        configs = [
+            make_config(char_class, level, rarity, primary, secondary)
+            for char_class, rarity in itertools.product(args.classes, args.rarities)
+            for primary, secondary in weapon_loadouts(char_class)
+        ]
+        results.extend(simulate_batch(configs, args.fights, rng))
+
+    elapsed = time.perf_counter() - started
+    total_fights = len(results) * args.fights
+
+    header = f"{'class':<8} {'loadout':<14} {'lvl':>3} {'rarity':<10} {'win%':>6} {'ttk':>7} {'ttk p90':>8} {'xp/h':>9} {'copper/h':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['class']:<8} {r['loadout']:<14} {r['level']:>3} {r['rarity']:<10} {r['win_rate'] * 100:>5.1f}% "
+              f"{r['ttk_mean']:>6.1f}s {r['ttk_p90']:>7.1f}s {r['xp_per_hour']:>9.0f} {r['copper_per_hour']:>10.0f}")
+    print(f"\n{total_fights:,} fights in {elapsed:.1f}s")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Results written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# chat_hub.py
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import and_, or_, event
+
+import models
+
+# Seen by every player whoever they're addressed to, System messages only without a recipient.
+# Everything else only concerns its recipient (plus the sender for whispers)
+PUBLIC_TYPES = ("Chat", "Admin")
+SUBSCRIBER_QUEUE_SIZE = 256
+RECENT_BUFFER_SIZE = 500  # Public messages kept in memory
+INBOX_SIZE = 100  # Private messages kept in memory per player
+
+
+def serialize_message(msg):
+    return {
+        "id": str(msg.id) if msg.id else None,
+        "sender": msg.sender,
+        "recipient": msg.recipient,
+        "message": msg.message,
+        "timestamp": msg.timestamp,
+        "type": msg.type
+    }
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def is_public(msg):
+    """Whether everyone sees the message, and so whether it goes in the recent buffer. public_clause() is the SQL."""
+    return msg["type"] in PUBLIC_TYPES or (msg["type"] == "System" and msg.get("recipient") is None)
+
+
+def public_clause():
+    return or_(models.ChatMessage.type.in_(PUBLIC_TYPES),
+               and_(models.ChatMessage.type == "System", models.ChatMessage.recipient == None))
+
+
+def is_visible_to(msg, player_name):
+    """Same rules as the /chat/fetch filter."""
+    msg_type = msg["type"]
+    recipient = msg.get("recipient")
+
+    if is_public(msg):
+        return True
+    if msg_type == "System":
+        return recipient == player_name
+    if msg_type == "whisper":
+        return msg["sender"] == player_name or recipient == player_name
+    if msg_type in ("InventoryUpdate", "GatheringUpdate"):
+        return recipient == player_name
+    return False
+
+
+class ChatHub:
+    def __init__(self):
+        self.loop = None
+        self.session_factory = None
+        self.writer = None
+        self.subscribers = {}  # player_name -> set of asyncio.Queue
+        self.lock = threading.Lock()
+
+        # Everything posted since started_at is in memory, older history lives in the database
+        self.started_at = time.time()
+        self.recent = deque()
+        self.recent_floor = 0.0  # Newest timestamp evicted from self.recent
+        self.inboxes = {}  # player_name -> deque of private messages
+        self.inbox_floors = {}
+
+    def bind_loop(self, loop):
+        self.loop = loop
+
+    def start(self, session_factory, writer):
+        self.session_factory = session_factory
+        self.writer = writer
+        self.started_at = time.time()
+        self._load_recent()
+        self.writer.start()
+
+    def _load_recent(self):
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(models.ChatMessage)
+                .filter(public_clause())
+                .order_by(models.ChatMessage.timestamp.desc())
+                .limit(RECENT_BUFFER_SIZE)
+                .all()
+            )
+            with self.lock:
+                self.recent = deque(serialize_message(row) for row in reversed(rows))
+        finally:
+            db.close()
+
+    # --- Posting ---
+
+    def post(self, sender, message, type="System", recipient=None, timestamp=None):
+        """Stores and publishes a message. In "sync" durability it waits for the write, except when called
+        on the event loop, where blocking would stall every other request (use post_async to wait there)."""
+        msg, done = self._post(sender, message, type, recipient, timestamp)
+        if not on_event_loop():
+            self.writer.wait(done)
+        return msg
+
+    async def post_async(self, sender, message, type="System", recipient=None, timestamp=None):
+        """post() for async handlers, waits for a "sync" durability write without blocking the loop."""
+        msg, done = self._post(sender, message, type, recipient, timestamp)
+        await self.writer.wait_async(done)
+        return msg
+
+    def _post(self, sender, message, type, recipient, timestamp):
+        msg = {
+            "id": str(uuid.uuid4()),
+            "sender": sender,
+            "recipient": recipient,
+            "message": message,
+            "timestamp": timestamp if timestamp is not None else time.time(),
+            "type": type
+        }
+
+        with self.lock:
+            if is_public(msg):
+                self._append(self.recent, msg, RECENT_BUFFER_SIZE)
+            else:
+                names = {recipient, sender} if type == "whisper" else {recipient}
+                for name in names - {None}:
+                    self._append(self.inboxes.setdefault(name, deque()), msg, INBOX_SIZE, name)
+
+        self.publish(msg)
+        return msg, self.writer.submit({**msg, "id": uuid.UUID(msg["id"])})
+
+    def attach(self, session_class):
+        event.listen(session_class, "after_commit", self._post_staged)
+        event.listen(session_class, "after_rollback", lambda session: session.info.pop("chat_posts", None))
+
+    def stage(self, session, sender, message, type="System", recipient=None):
+        """post() once the session commits, for messages about what it changed. Dropped if it rolls back."""
+        session = getattr(session, "sync_session", session)  # AsyncSession wraps the one the hooks see
+        session.info.setdefault("chat_posts", []).append(
+            {"sender": sender, "message": message, "type": type, "recipient": recipient})
+
+    def _post_staged(self, session):
+        for staged in session.info.pop("chat_posts", None) or ():
+            self.post(**staged)
+
+    def notify(self, recipient, type, data):
+        """Live-only message for one player: not stored or written, a client that wasn't connected asks again.
+
+        Returns False when the player has no open stream.
+        """
+        msg = {"id": None, "sender": "System", "recipient": recipient, "message": "", "timestamp": time.time(),
+               "type": type, "data": data}
+        targets = self._targets(msg)
+        if self.loop is None or not targets:
+            return False
+        for _, subscriber in targets:
+            self.loop.call_soon_threadsafe(self._deliver, subscriber, msg)
+        return True
+
+    def _append(self, buffer, msg, max_size, inbox_name=None):
+        buffer.append(msg)
+        if len(buffer) > max_size:
+            evicted = buffer.popleft()
+            if inbox_name is None:
+                self.recent_floor = max(self.recent_floor, evicted["timestamp"])
+            else:
+                self.inbox_floors[inbox_name] = max(self.inbox_floors.get(inbox_name, 0.0), evicted["timestamp"])
+
+    # --- Reading ---
+
+    def fetch(self, since, player_name):
+        """Returns (messages, complete). complete is False when part of the range may only be in the database."""
+        with self.lock:
+            messages = [m for m in self.recent if m["timestamp"] > since]
+            messages.extend(m for m in self.inboxes.get(player_name, ()) if m["timestamp"] > since)
+            floor = max(self.started_at, self.recent_floor, self.inbox_floors.get(player_name, 0.0))
+
+        messages.sort(key=lambda m: m["timestamp"])
+        return messages, since >= floor
+
+    def recent_messages(self, limit):
+        with self.lock:
+            return list(self.recent)[-limit:] if limit > 0 else []
+
+    # --- Live delivery ---
+
+    def subscribe(self, player_name):
+        subscriber = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(player_name, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, player_name, subscriber):
+        with self.lock:
+            queues = self.subscribers.get(player_name)
+            if queues:
+                queues.discard(subscriber)
+                if not queues:
+                    del self.subscribers[player_name]
+
+    def _targets(self, msg):
+        with self.lock:
+            # Whispers, inventory updates and targeted System messages go straight to their player
+            if not is_public(msg):
+                recipient = msg.get("recipient")
+                names = {recipient, msg["sender"]} if msg["type"] == "whisper" else {recipient}
+                return [(name, q) for name in names for q in self.subscribers.get(name, ())]
+
+            return [(name, q) for name, queues in self.subscribers.items() for q in queues]
+
+    def publish(self, msg):
+        if self.loop is None:
+            return
+
+        for name, subscriber in self._targets(msg):
+            if is_visible_to(msg, name):
+                self.loop.call_soon_threadsafe(self._deliver, subscriber, msg)
+
+    @staticmethod
+    def _deliver(subscriber, msg):
+        try:
+            subscriber.put_nowait(msg)
+        except asyncio.QueueFull:
+            # Slow client: drop the stream, it will reconnect and catch up through /chat/fetch
+            while not subscriber.empty():
+                subscriber.get_nowait()
+            subscriber.put_nowait(None)
+
+
+chat_hub = ChatHub()
@@ -1,8 +1,11 @@
 # chat_system.py
 import inspect
+import json
 import threading
 import time
-import requests
+import urllib.parse
+from collections import deque
+import websocket
 import pygame
 import pygame_gui
 import datetime
@@ -11,6 +14,7 @@ from screens.login_screen import LoginScreen
 from pyexpat.errors import messages
 
 from my_reports_window import MyReportsWindow
+from network import network, transport, run_on_main_thread, PRIORITY_HIGH
 from player_registry import get_player
 from reports_window import ReportsWindow
 from settings import *
@@ -24,6 +28,7 @@ ROLE_HIERARCHY = {
     "gm": 1,
     "dev": 2
 }
+SEEN_MESSAGE_IDS_SIZE = 1000  # duplicates only come from a catch-up fetch overlapping the stream, so recent ids are enough
 
 from settings import SERVER_URL
 
@@ -108,11 +113,19 @@ class ChatWindow:
         self.running = True
 
         self.last_fetch_time = time.time()
-        self.polling_thread = threading.Thread(target=self.poll_server_for_messages, daemon=True)
-        self.polling_thread.start()
+        self.seen_message_ids = set()
+        self.seen_message_order = deque()  # same ids oldest first, to forget the oldest past SEEN_MESSAGE_IDS_SIZE
+        self.chat_socket = None
+        self.stream_thread = threading.Thread(target=self.listen_for_messages, daemon=True)
+        self.stream_thread.start()
 
     def teardown(self):
         self.running = False
+        if self.chat_socket:
+            try:
+                self.chat_socket.close()
+            except Exception:
+                pass
         self.panel.kill()
         for label in self.labels:
             label.kill()
@@ -122,6 +135,13 @@ class ChatWindow:
         for btn in self.tab_buttons:
             btn.kill()
 
+    def _reply(self, handler):
+        """Wraps a network callback so results that land after teardown are dropped."""
+        def run(result):
+            if self.running:
+                handler(result)
+        return run
+
     def send_chat_to_server(self, text):
         payload = {
             "sender": self.player.name,
@@ -129,114 +149,173 @@ class ChatWindow:
             "timestamp": time.time(),
             "type": "Chat"
         }
-        try:
-            requests.post(f"{SERVER_URL}/chat/send", json=payload, timeout=1)
-        except Exception as e:
-            self.log_message(f"[Error] Failed to send message: {e}", "System")
-            print(f"[Error] Failed to send message: {e}", "System")
 
-    def poll_server_for_messages(self):
+        def on_sent(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to send message: {result.error}", "System")
+                print(f"[Error] Failed to send message: {result.error}", "System")
+
+        network.post("/chat/send", json=payload, callback=self._reply(on_sent), priority=PRIORITY_HIGH)
+
+    def listen_for_messages(self):
         while self.running:
             try:
-                response = requests.get(
-                    f"{SERVER_URL}/chat/fetch",
-                    params={"since": self.last_fetch_time, "player_name": self.player.name},
-                    timeout=2
+                self.chat_socket = websocket.create_connection(
+                    f"{SERVER_WS_URL}/chat/ws?{urllib.parse.urlencode({'player_name': self.player.name})}",
+                    timeout=5
                 )
+                # ✅ Pick up anything sent while we were disconnected, then just wait for pushes
+                self.catch_up_messages()
 
-                if response.status_code == 200:
-                    data = response.json()
-                    for msg in data.get("messages", []):
+                while self.running:
+                    try:
+                        raw = self.chat_socket.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    if not raw:
+                        break
+                    self._receive(json.loads(raw))
+            except Exception as e:
+                if self.running:
+                    print(f"[Chat] Stream disconnected: {e}")
+            finally:
+                if self.chat_socket:
+                    try:
+                        self.chat_socket.close()
+                    except Exception:
+                        pass
+                    self.chat_socket = None
+
+            if self.running:
+                time.sleep(2)  # Back off before reconnecting
+
+    def catch_up_messages(self):
+        # Already off the main thread here, so this one goes straight through the transport
+        response = transport.request(
+            "GET", "/chat/fetch",
+            params={"since": self.last_fetch_time, "player_name": self.player.name}
+        )
+        if response.status_code == 200:
+            for msg in response.json().get("messages", []):
+                self._receive(msg)
 
+    def _receive(self, msg):
+        # Called on the stream thread, the message is handled on the main thread like a network callback
+        try:
+            run_on_main_thread(self.handle_incoming_message, msg)
+        except pygame.error as e:
+            print(f"[Chat] Dropped message {msg.get('id')}: {e}")
 
+    def handle_incoming_message(self, msg):
+        if not self.running:
+            return  # queued before this window was torn down
 
-                        self.last_fetch_time = max(self.last_fetch_time, msg["timestamp"])
-                        msg_type = msg['type']
-                        timestamp = msg["timestamp"]
+        if msg["type"] == "GatheringUpdate":
+            # Live-only progress push, the gathering screen picks it up on its next frame
+            self.player.gathering_update = msg.get("data")
+            return
 
+        # The same message can arrive from both the catch-up fetch and the stream
+        msg_id = msg.get("id")
+        if msg_id:
+            if msg_id in self.seen_message_ids:
+                return
+            self.seen_message_ids.add(msg_id)
+            self.seen_message_order.append(msg_id)
+            if len(self.seen_message_order) > SEEN_MESSAGE_IDS_SIZE:
+                self.seen_message_ids.discard(self.seen_message_order.popleft())
 
-                        if msg_type == "admin" and self.player.role not in ("gm", "dev"):
-                            continue
+        self.last_fetch_time = max(self.last_fetch_time, msg["timestamp"])
+        msg_type = msg['type']
+        timestamp = msg["timestamp"]
 
-                        elif msg_type == "whisper":
-                            if msg['sender'] == self.player.name:
-                                display = f"[To: {msg['recipient']}] {msg['message']}"
-                            else:
-                                display = f"[From: {msg['sender']}] {msg['message']}"
-                                self.last_whisper_from = msg["sender"]
-                            tab = "Chat"
-                            label_type = "Whisper"  # Ensure purple formatting
-
-                        elif msg_type == "InventoryUpdate":
-                            if self.inventory_screen:
-                                self.inventory_screen.reload_inventory()
-                            continue
-
-                        elif msg_type == "System" and msg.get("recipient") == self.player.name:
-                            message_lower = msg["message"].lower()
-                            if message_lower.startswith("[kick]"):
-                                self.screen_manager.force_logout(reason="Kicked by an admin")
-                                continue  # Do not display kick message
 
-                        else:
-                            if msg_type in ("admin", "Admin"):
-                                display = f"[Admin] {msg['message']}"
-                            elif msg_type in ("system", "System"):
-                                display = f"[System] {msg['message']}"
-                            else:
-                                display = f"{msg['sender']}: {msg['message']}"
+        if msg_type == "admin" and self.player.role not in ("gm", "dev"):
+            return
 
-                            tab = msg_type
-                            label_type = msg_type.capitalize()
+        elif msg_type == "whisper":
+            if msg['sender'] == self.player.name:
+                display = f"[To: {msg['recipient']}] {msg['message']}"
+            else:
+                display = f"[From: {msg['sender']}] {msg['message']}"
+                self.last_whisper_from = msg["sender"]
+            tab = "Chat"
+            label_type = "Whisper"  # Ensure purple formatting
+
+        elif msg_type == "InventoryUpdate":
+            # Only the changed slots come back, the open inventory screen re-renders through its listener
+            self.player.inventory_sync.refresh()
+            return
 
-                        valid_tabs = {"Chat", "System", "Combat", "Admin"}
-                        tab = tab.capitalize() if tab.capitalize() in valid_tabs else "Chat"
+        elif msg_type == "System" and msg.get("recipient") == self.player.name:
+            message_lower = msg["message"].lower()
+            if message_lower.startswith("[kick]"):
+                self.screen_manager.force_logout(reason="Kicked by an admin")
+                return  # Do not display kick message
+            display = f"[System] {msg['message']}"
+            tab = "System"
+            label_type = "System"
 
-                        self.messages[tab].append((timestamp, msg["message"], label_type))
-                        self.messages["All"].append((timestamp, msg["message"], label_type))
+        else:
+            if msg_type in ("admin", "Admin"):
+                display = f"[Admin] {msg['message']}"
+            elif msg_type in ("system", "System"):
+                display = f"[System] {msg['message']}"
+            else:
+                display = f"{msg['sender']}: {msg['message']}"
 
-                        # Always display in current tab (All, Chat, etc.)
-                        self._create_label(display, label_type)
-                        # Flash target tab if not actively viewed
-                        if tab != self.active_tab:
-                            self.flashing_tabs.add(tab)
-            except:
-                pass
-            time.sleep(2)
+            tab = msg_type
+            label_type = msg_type.capitalize()
 
-    def fetch_recent_messages(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/chat/recent", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                for msg in data.get("messages", []):
-                    msg_type = msg["type"]
-                    if msg_type.lower() in ("whisper", "system"):
-                        continue  # ✅ Skip whispers & system for history
-
-                    # ✅ Skip admin messages unless player has access
-                    if msg_type.lower() == "admin" and self.player.role not in ("gm", "dev"):
-                        continue
+        valid_tabs = {"Chat", "System", "Combat", "Admin"}
+        tab = tab.capitalize() if tab.capitalize() in valid_tabs else "Chat"
 
-                    if msg_type not in self.messages:
-                        continue  # Skip types we don't support
+        self.messages[tab].append((timestamp, msg["message"], label_type))
+        self.messages["All"].append((timestamp, msg["message"], label_type))
 
-                    self.messages[msg_type].append((msg["timestamp"], msg["message"], msg_type))
-                    self.messages["All"].append((msg["timestamp"], msg["message"], msg_type))
+        # Always display in current tab (All, Chat, etc.)
+        self._create_label(display, label_type)
+        # Flash target tab if not actively viewed
+        if tab != self.active_tab:
+            self.flashing_tabs.add(tab)
 
-                    # display = f"{msg['sender']}: {msg['message']}" if msg_type == "Chat" else f"[{msg['timestamp']}] {msg['message']}"
-                    if msg_type.lower() == "chat":
-                        display = f"{msg['sender']}: {msg['message']}"
-                    elif msg_type.lower() == "admin":
-                        display = f"[Admin] {msg['message']}"
-                    elif msg_type.lower() == "system":
-                        display = f"[System] {msg['message']}"
-                    else:
-                        display = f"[{msg_type}] {msg['message']}"
-                    if self.active_tab == msg_type or self.active_tab == "All":
-                        self._create_label(display, msg_type)
-        except Exception as e:
-            self.log_message(f"[Error] Failed to load recent chat: {e}", "System")
+    def fetch_recent_messages(self):
+        network.get("/chat/recent", callback=self._reply(self.on_recent_messages))
+
+    def on_recent_messages(self, result):
+        if result.error is not None:
+            self.log_message(f"[Error] Failed to load recent chat: {result.error}", "System")
+            return
+        if not result.ok:
+            return
+
+        data = result.json()
+        for msg in data.get("messages", []):
+            msg_type = msg["type"]
+            if msg_type.lower() in ("whisper", "system"):
+                continue  # ✅ Skip whispers & system for history
+
+            # ✅ Skip admin messages unless player has access
+            if msg_type.lower() == "admin" and self.player.role not in ("gm", "dev"):
+                continue
+
+            if msg_type not in self.messages:
+                continue  # Skip types we don't support
+
+            self.messages[msg_type].append((msg["timestamp"], msg["message"], msg_type))
+            self.messages["All"].append((msg["timestamp"], msg["message"], msg_type))
+
+            # display = f"{msg['sender']}: {msg['message']}" if msg_type == "Chat" else f"[{msg['timestamp']}] {msg['message']}"
+            if msg_type.lower() == "chat":
+                display = f"{msg['sender']}: {msg['message']}"
+            elif msg_type.lower() == "admin":
+                display = f"[Admin] {msg['message']}"
+            elif msg_type.lower() == "system":
+                display = f"[System] {msg['message']}"
+            else:
+                display = f"[{msg_type}] {msg['message']}"
+            if self.active_tab == msg_type or self.active_tab == "All":
+                self._create_label(display, msg_type)
 
     def _load_player_commands(self):
         return {
@@ -328,22 +407,21 @@ class ChatWindow:
         }
 
     def send_admin_command(self, command_text):
-        try:
-            response = requests.post(
-                f"{SERVER_URL}/admin_command",
-                json={
-                    "username": self.player.username,
-                    "command": command_text
-                },
-                timeout=5
-            )
-            data = response.json()
-            if data.get("success"):
-                pass
-            else:
-                self.log_message(f"[Error] {data.get('error')}", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Admin command failed: {e}", "System")
+        def on_done(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Admin command failed: {result.error}", "System")
+            elif not result.json().get("success"):
+                self.log_message(f"[Error] {result.json().get('error')}", "System")
+
+        network.post(
+            "/admin_command",
+            json={
+                "username": self.player.username,
+                "command": command_text
+            },
+            callback=self._reply(on_done),
+            priority=PRIORITY_HIGH
+        )
 
     def wrap_text(self, text, font, max_width):
         if isinstance(text, tuple):
@@ -430,17 +508,11 @@ class ChatWindow:
         self.scroll_container.vert_scroll_bar.set_scroll_from_start_percentage(100)
 
     def send_whisper(self, target_name, message):
-        try:
-            response = requests.post(
-                f"{SERVER_URL}/whisper",
-                json={
-                    "sender": self.player.name,
-                    "recipient": target_name,
-                    "message": message
-                },
-                timeout=5
-            )
-            data = response.json()
+        def on_sent(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Whisper failed: {result.error}", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 pass
                 # display_text = f"[To: {target_name}] {message}"
@@ -453,8 +525,17 @@ class ChatWindow:
                 #     self.flashing_tabs.add("Chat")
             else:
                 self.log_message(f"[System] {data.get('error', 'Failed to send whisper.')}", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Whisper failed: {e}", "System")
+
+        network.post(
+            "/whisper",
+            json={
+                "sender": self.player.name,
+                "recipient": target_name,
+                "message": message
+            },
+            callback=self._reply(on_sent),
+            priority=PRIORITY_HIGH
+        )
 
     def switch_tab(self, new_tab):
         if new_tab not in self.tabs:
@@ -636,28 +717,31 @@ class ChatWindow:
             return
 
         elif command == "myreports":
-            try:
-                response = requests.get(f"{SERVER_URL}/my_reports", params={"player_name": self.player.name})
-                reports = response.json()
-                MyReportsWindow(self.manager, reports, self.player.name)
-                return
-            except Exception as e:
-                self.log_message(f"[Error] Could not fetch your reports: {e}", "System")
+            def on_reports(result):
+                if result.error is not None:
+                    self.log_message(f"[Error] Could not fetch your reports: {result.error}", "System")
+                    return
+                MyReportsWindow(self.manager, result.json(), self.player.name)
+
+            network.get("/my_reports", params={"player_name": self.player.name},
+                        callback=self._reply(on_reports), priority=PRIORITY_HIGH)
+            return
 
         elif command in ("reports-view", "reports"):
             if self.player.role not in ("gm", "dev"):
                 self.log_message("[System] You do not have permission to use this command.\nTry /report to generate a report or /myreports to see your reports", "System")
                 return
-            try:
-                response = requests.get(f"{SERVER_URL}/reports_view")
-                if response.status_code == 200:
-                    reports = response.json().get("reports", [])
+            def on_reports(result):
+                if result.error is not None:
+                    self.log_message("[Error] Could not connect to server for reports.", "System")
+                    print(f"[Reports Error] {result.error}")
+                elif result.status_code == 200:
+                    reports = result.json().get("reports", [])
                     self.reports_window = ReportsWindow(self.manager, reports, self)
                 else:
                     self.log_message("[Error] Failed to fetch reports from server.", "System")
-            except Exception as e:
-                self.log_message("[Error] Could not connect to server for reports.", "System")
-                print(f"[Reports Error] {e}")
+
+            network.get("/reports_view", callback=self._reply(on_reports), priority=PRIORITY_HIGH)
             return
 
         elif command == "createitem":
@@ -811,36 +895,45 @@ class ChatWindow:
             "target": kv_pairs.get("target", self.player.name)
         }
 
-        try:
-            response = requests.post(f"{SERVER_URL}/createitem", json=payload, timeout=5)
-            # response.raise_for_status()
-            result = response.json()
-            if result.get("success"):
-                self.log_message(result.get("message"), "System")
+        def on_created(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to contact server: {result.error}", "System")
+                return
+            data = result.json()
+            if data.get("success"):
+                self.log_message(data.get("message"), "System")
                 # Refresh inventory if item is for us
                 if payload["target"] == self.player.name and self.inventory_screen:
                     self.inventory_screen.refresh_inventory_data()
             else:
-                self.log_message(f"[Error] {result.get('error', 'Unknown error')}", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Failed to contact server: {e}", "System")
+                self.log_message(f"[Error] {data.get('error', 'Unknown error')}", "System")
+
+        network.post("/createitem", json=payload, callback=self._reply(on_created), priority=PRIORITY_HIGH)
 
     def cmd_giveitem(self, *args):
         try:
             item_id = int(args[0])
             amount = int(args[1]) if len(args) > 1 and args[1].isdigit() else 1
-            target_player = args[2] if len(args) > 2 else self.player.name
+        except (IndexError, ValueError) as e:
+            self.log_message(f"❌ Failed to give item: {e}", "System")
+            return
+        target_player = args[2] if len(args) > 2 else self.player.name
 
-            # Check if target is online
-            online_response = requests.get(f"{SERVER_URL}/online_players", timeout=5)
-            if online_response.status_code == 200:
-                online_data = online_response.json().get("online", [])
-                online_names = [p["name"] for p in online_data]
-                if target_player not in online_names:
-                    self.player.chat_window.log_message(f"❌ Player '{target_player}' is not online.", "System")
-                    return
+        def on_given(result):
+            if result.status_code == 200:
+                msg = result.json().get("message", "Item given.")
+                self.log_message(f"✅ {msg}", "System")
             else:
-                self.player.chat_window.log_message("❌ Failed to fetch online players.", "System")
+                self.log_message(f"❌ Failed to give item: {result.describe_error()}", "System")
+
+        def on_online(result):
+            # Check if target is online
+            if result.status_code != 200:
+                self.log_message("❌ Failed to fetch online players.", "System")
+                return
+            online_names = [p["name"] for p in result.json().get("online", [])]
+            if target_player not in online_names:
+                self.log_message(f"❌ Player '{target_player}' is not online.", "System")
                 return
 
             payload = {
@@ -848,15 +941,9 @@ class ChatWindow:
                 "quantity": amount,
                 "target_player": target_player
             }
-            response = requests.post(f"{SERVER_URL}/give_item", json=payload, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                msg = data.get("message", "Item given.")
-                self.player.chat_window.log_message(f"✅ {msg}", "System")
-            else:
-                self.player.chat_window.log_message("❌ Failed to give item.", "System")
-        except Exception as e:
-            self.player.chat_window.log_message(f"❌ Failed to give item: {e}", "System")
+            network.post("/give_item", json=payload, callback=self._reply(on_given), priority=PRIORITY_HIGH)
+
+        network.get("/online_players", callback=self._reply(on_online), priority=PRIORITY_HIGH)
 
     def cmd_addexperience(self, *args):
         if not args:
@@ -874,29 +961,29 @@ class ChatWindow:
         if target_name == self.player.name:
             # Local player
             self.player.gain_experience(amount)
-            self.player.save_to_server(self.player.auth_token)
             self.log_message(f"[Dev] You gained {amount} experience!", "System")
             # Refresh inventory stat display if visible
             if self.inventory_screen and hasattr(self.inventory_screen, "refresh_stat_display"):
                 self.inventory_screen.refresh_stat_display()
         else:
-            try:
-                response = requests.post(
-                    f"{SERVER_URL}/add_experience",
-                    json={
-                        "requester": self.player.name,
-                        "target": target_name,
-                        "amount": amount
-                    },
-                    timeout=5
-                )
-                result = response.json()
-                if result.get("success"):
+            def on_added(result):
+                if result.error is not None:
+                    self.log_message(f"[Error] Failed to add experience: {result.error}", "System")
+                elif result.json().get("success"):
                     self.log_message(f"[Dev] Gave {amount} XP to {target_name}.", "System")
                 else:
-                    self.log_message(f"[Error] {result.get('error')}", "System")
-            except Exception as e:
-                self.log_message(f"[Error] Failed to add experience: {e}", "System")
+                    self.log_message(f"[Error] {result.json().get('error')}", "System")
+
+            network.post(
+                "/add_experience",
+                json={
+                    "requester": self.player.name,
+                    "target": target_name,
+                    "amount": amount
+                },
+                callback=self._reply(on_added),
+                priority=PRIORITY_HIGH
+            )
 
     def cmd_addcoins(self, *args):
         if len(args) < 2:
@@ -914,22 +1001,25 @@ class ChatWindow:
             "target": target
         }
 
-        try:
-            response = requests.post(f"{SERVER_URL}/add_coins", json=payload, timeout=5)
-            result = response.json()
-            if result.get("success"):
-                self.log_message(f"[Coins] {result['message']}", "System")
+        def on_added(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to contact server: {result.error}", "System")
+                return
+            data = result.json()
+            if data.get("success"):
+                self.log_message(f"[Coins] {data['message']}", "System")
                 self.player.refresh_coins()
             else:
-                self.log_message(f"[Error] {result.get('error', 'Unknown error')}", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Failed to contact server: {e}", "System")
+                self.log_message(f"[Error] {data.get('error', 'Unknown error')}", "System")
+
+        network.post("/add_coins", json=payload, callback=self._reply(on_added), priority=PRIORITY_HIGH)
 
     def cmd_online(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/online_players", timeout=2)
-            data = response.json()
-            players = data.get("online", [])
+        def on_online(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to fetch online players: {result.error}", "System")
+                return
+            players = result.json().get("online", [])
             if players:
                 formatted = []
                 for p in players:
@@ -940,15 +1030,15 @@ class ChatWindow:
                 self.log_message(f"[Online] {len(formatted)} player(s): {', '.join(formatted)}", "System")
             else:
                 self.log_message("[Online] No players are currently online.", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Failed to fetch online players: {e}", "System")
 
-    def check_online_gms(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/online_gms", timeout=5)
-
-            data = response.json()
+        network.get("/online_players", callback=self._reply(on_online), priority=PRIORITY_HIGH)
 
+    def check_online_gms(self):
+        def on_gms(result):
+            if result.error is not None:
+                self.log_message("[Error] Could not contact server.", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 gms = data.get("gms", [])
                 if gms:
@@ -958,13 +1048,15 @@ class ChatWindow:
                     self.log_message("No GMs are currently online.", "System")
             else:
                 self.log_message("[Error] Failed to fetch GM list.", "System")
-        except Exception as e:
-            self.log_message("[Error] Could not contact server.", "System")
+
+        network.get("/online_gms", callback=self._reply(on_gms), priority=PRIORITY_HIGH)
 
     def check_online_staff(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/online_staff", timeout=5)
-            data = response.json()
+        def on_staff(result):
+            if result.error is not None:
+                self.log_message("[Error] Could not contact server.", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 staff = data.get("staff", [])
                 if staff:
@@ -974,38 +1066,43 @@ class ChatWindow:
                     self.log_message("No GMs or Devs are currently online.", "System")
             else:
                 self.log_message("[Error] Failed to fetch staff list.", "System")
-        except Exception as e:
-            self.log_message("[Error] Could not contact server.", "System")
+
+        network.get("/online_staff", callback=self._reply(on_staff), priority=PRIORITY_HIGH)
 
     def send_report(self, message):
         if not message:
             self.log_message("[Error] Usage: /report <your message>", "System")
             return
-        try:
-            response = requests.post(f"{SERVER_URL}/report", json={
-                "sender": self.player.name,
-                "message": message
-            }, timeout=5)
-            data = response.json()
+
+        def on_sent(result):
+            if result.error is not None:
+                self.log_message("[Error] Could not send report.", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 self.log_message("Your report has been sent to online staff.", "System")
             else:
                 self.log_message(f"[Error] {data.get('error', 'Report failed.')}", "System")
-        except Exception as e:
-            self.log_message("[Error] Could not send report.", "System")
+
+        network.post("/report", json={
+            "sender": self.player.name,
+            "message": message
+        }, callback=self._reply(on_sent), priority=PRIORITY_HIGH)
 
     def cmd_reports_view(self):
-        try:
-            res = requests.get(f"{SERVER_URL}/reports_view", timeout=5)
-            data = res.json()
+        def on_reports(result):
+            if result.error is not None:
+                self.log_message("[Error] Could not reach server.", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 for case in data.get("reports", []):
                     text = f"[Case #{case['id']}] {case['timestamp']} - {case['sender']}: {case['message']}"
                     self.log_message(text, "Admin")
             else:
                 self.log_message("[Admin] Failed to load report log.", "System")
-        except Exception:
-            self.log_message("[Error] Could not reach server.", "System")
+
+        network.get("/reports_view", callback=self._reply(on_reports), priority=PRIORITY_HIGH)
 
     def cmd_report_resolve(self, *args):
         if len(args) < 2:
@@ -1014,33 +1111,38 @@ class ChatWindow:
 
         try:
             case_id = int(args[0])
-            resolution = " ".join(args[1:])
-            res = requests.post(f"{SERVER_URL}/report_resolve", json={
-                "case_id": case_id,
-                "resolution": resolution
-            }, timeout=5)
-            data = res.json()
+        except ValueError:
+            self.log_message("Usage: /report-resolve <case number> <resolution message>", "System")
+            return
+        resolution = " ".join(args[1:])
+
+        def on_resolved(result):
+            if result.error is not None:
+                self.log_message("[Error] Could not contact server.", "System")
+                return
+            data = result.json()
             if data.get("success"):
                 self.log_message(f"✅ {data.get('message')}", "Admin")
             else:
                 self.log_message(f"[Admin] {data.get('error')}", "System")
-        except Exception:
-            self.log_message("[Error] Could not contact server.", "System")
+
+        network.post("/report_resolve", json={
+            "case_id": case_id,
+            "resolution": resolution
+        }, callback=self._reply(on_resolved), priority=PRIORITY_HIGH)
 
     def cmd_stats(self, *args):
         target = args[0] if args else self.player.name
 
-        try:
-            response = requests.get(
-                f"{SERVER_URL}/player_stats",
-                params={"requester_name": self.player.name, "target_name": target},
-                timeout=5
-            )
-            if response.status_code != 200:
+        def on_stats(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to fetch stats: {result.error}", "System")
+                return
+            if result.status_code != 200:
                 self.log_message(f"[Stats] Could not fetch stats for {target}.", "System")
                 return
 
-            data = response.json()
+            data = result.json()
             self.log_message(f"[Stats for {data['name']} - Level {data['level']} {data['char_class']}]", "System")
             coins = data.get("coins", {})
 
@@ -1076,8 +1178,12 @@ class ChatWindow:
                     if item:
                         self.log_message(f"  {slot}: {item.get('name', 'Unknown')}", "System")
 
-        except Exception as e:
-            self.log_message(f"[Error] Failed to fetch stats: {e}", "System")
+        network.get(
+            "/player_stats",
+            params={"requester_name": self.player.name, "target_name": target},
+            callback=self._reply(on_stats),
+            priority=PRIORITY_HIGH
+        )
 
     def cmd_setbanner(self, *args):
         if not args:
@@ -1091,22 +1197,24 @@ class ChatWindow:
             "message": message
         }
 
-        try:
-            response = requests.post(f"{SERVER_URL}/set_banner", json=payload, timeout=5)
-            data = response.json()
-            if data.get("success"):
+        def on_set(result):
+            if result.error is not None:
+                self.log_message(f"[Error] Failed to update banner: {result.error}", "System")
+            elif result.json().get("success"):
                 self.log_message("[Banner] Login banner updated successfully.", "System")
             else:
-                self.log_message(f"[Error] {data.get('error')}", "System")
-        except Exception as e:
-            self.log_message(f"[Error] Failed to update banner: {e}", "System")
+                self.log_message(f"[Error] {result.json().get('error')}", "System")
+
+        network.post("/set_banner", json=payload, callback=self._reply(on_set), priority=PRIORITY_HIGH)
 
     def cmd_patchnotes(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/patch_notes", timeout=5)
-            notes = response.json().get("notes", "No patch notes available.")
-        except Exception as e:
-            notes = f"[Error] Could not fetch patch notes: {e}"
+        network.get("/patch_notes", callback=self._reply(self.show_patch_notes), priority=PRIORITY_HIGH)
+
+    def show_patch_notes(self, result):
+        if result.error is not None:
+            notes = f"[Error] Could not fetch patch notes: {result.error}"
+        else:
+            notes = result.json().get("notes", "No patch notes available.")
 
         # Format with line breaks
         formatted = notes.replace('\n', '<br>')
@@ -0,0 +1,118 @@
+# chat_writer.py
+import asyncio
+import queue
+import threading
+import time
+
+import models
+
+# Durability modes:
+#   "sync"    - the caller waits (wait() or wait_async()) until the batch holding the message is committed
+#   "async"   - submit() returns immediately, the message is committed with the next batch
+#   "relaxed" - like "async", and batches commit with synchronous_commit off (may lose the last
+#               few hundred ms of chat if Postgres crashes, never corrupts anything)
+DURABILITY_MODES = ("sync", "async", "relaxed")
+SYNC_WAIT_TIMEOUT = 5  # seconds a "sync" caller waits for its batch before giving up
+
+
+class ChatWriter:
+    def __init__(self, engine, flush_interval=0.05, batch_size=200, durability="async"):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown chat durability mode: {durability}")
+
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.durability = durability
+
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, row):
+        """Queues a row. In "sync" mode returns an Event that is set once its batch is written, otherwise None."""
+        done = threading.Event() if self.durability == "sync" else None
+        self.queue.put((row, done))
+        return done
+
+    @staticmethod
+    def wait(done, timeout=SYNC_WAIT_TIMEOUT):
+        if done:
+            done.wait(timeout)
+
+    @staticmethod
+    async def wait_async(done, timeout=SYNC_WAIT_TIMEOUT):
+        # The blocking wait runs on the default executor so the event loop keeps serving other requests
+        if done:
+            await asyncio.get_running_loop().run_in_executor(None, done.wait, timeout)
+
+    def close(self, timeout=5):
+        """Flush whatever is still queued. Called on server shutdown."""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._flush(batch)
+            if stopping:
+                self._drain()
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                batch.append(entry)
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            self._insert(rows)
+        except Exception as e:
+            # One bad row shouldn't cost the whole batch, retry them one at a time
+            print(f"[ChatWriter] Batch of {len(rows)} failed ({e}), retrying row by row")
+            for row in rows:
+                try:
+                    self._insert([row])
+                except Exception as row_error:
+                    print(f"[ChatWriter] Dropped message {row.get('id')}: {row_error}")
+        finally:
+            for _, done in batch:
+                if done:
+                    done.set()
+
+    def _insert(self, rows):
+        with self.engine.begin() as conn:
+            if self.durability == "relaxed":
+                conn.exec_driver_sql("SET LOCAL synchronous_commit TO OFF")
+            conn.execute(models.ChatMessage.__table__.insert(), rows)
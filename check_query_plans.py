@@ -0,0 +1,87 @@
+# check_query_plans.py
+# Runs EXPLAIN on the server's hot queries and fails if any of them still scans a whole table.
+# Usage: python check_query_plans.py [database_url]
+import datetime
+import json
+import sys
+import time
+
+from sqlalchemy import create_engine, or_, and_, select
+from sqlalchemy.dialects import postgresql
+
+import models
+from db_init import DATABASE_URL
+
+SOME_ID = "00000000-0000-0000-0000-000000000000"  # ids are UUIDs, a literal of another type can change the plan
+
+HOT_QUERIES = [
+    ("player by name", "players",
+     select(models.Player).where(models.Player.name == "Somebody")),
+    ("active character for account", "players",
+     select(models.Player).where(models.Player.account_id == SOME_ID, models.Player.is_active == True)),
+    ("active player by name", "players",
+     select(models.Player).where(models.Player.name == "Somebody", models.Player.is_active == True)),
+    ("stale online accounts", "accounts",
+     select(models.Account).where(models.Account.is_online == True, models.Account.last_seen < datetime.datetime(2000, 1, 1))),
+    ("chat since timestamp", "chat_messages",
+     select(models.ChatMessage).where(models.ChatMessage.timestamp > time.time())),
+    ("chat fetch for player", "chat_messages",
+     select(models.ChatMessage).where(
+         models.ChatMessage.timestamp > time.time(),
+         or_(
+             models.ChatMessage.type.in_(["Chat", "Admin"]),
+             and_(models.ChatMessage.type == "System", models.ChatMessage.recipient == None),
+             and_(models.ChatMessage.type == "System", models.ChatMessage.recipient == "Somebody"),
+             and_(models.ChatMessage.type == "whisper", models.ChatMessage.recipient == "Somebody"),
+             and_(models.ChatMessage.type == "whisper", models.ChatMessage.sender == "Somebody"),
+             and_(models.ChatMessage.type == "InventoryUpdate", models.ChatMessage.recipient == "Somebody")
+         )
+     )),
+    ("items in slots", "items",
+     select(models.Item).where(
+         models.Item.owner_id == SOME_ID,
+         models.Item.slot.in_(["0", "equipped:primary", "equipped:secondary"])
+     )),
+    ("used slots for player", "items",
+     select(models.Item.slot).where(models.Item.owner_id == SOME_ID)),
+    ("gathered material for player", "gathered_materials",
+     select(models.GatheredMaterial).where(
+         models.GatheredMaterial.player_id == SOME_ID,
+         models.GatheredMaterial.item_id == 1
+     )),
+]
+
+
+def seq_scans(plan, table):
+    """Yields every Seq Scan node on the given table."""
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child, table)
+
+
+def check(database_url):
+    engine = create_engine(database_url)
+    failures = 0
+
+    with engine.connect() as conn:
+        # Small dev tables would otherwise always get a seq scan, we only want to know an index is usable
+        conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for label, table, query in HOT_QUERIES:
+            compiled = query.compile(dialect=postgresql.psycopg2.dialect())
+            row = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+            plan = (json.loads(row) if isinstance(row, str) else row)[0]["Plan"]
+
+            if any(seq_scans(plan, table)):
+                failures += 1
+                print(f"❌ {label}: sequential scan on {table}")
+            else:
+                print(f"✅ {label}")
+
+    return failures
+
+
+if __name__ == "__main__":
+    failed = check(sys.argv[1] if len(sys.argv) > 1 else DATABASE_URL)
+    sys.exit(1 if failed else 0)
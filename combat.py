@@ -0,0 +1,300 @@
+# combat.py
+# Headless combat rules shared by the battle screens, balancing scripts and the server.
+# Nothing in here touches pygame: the engine takes total stats and enemy dicts and returns events,
+# the screens decide how to show them.
+import random
+
+from enemies import ENEMY_TIERS, NAME_PREFIXES, ELITE_AURA_COLORS
+from items import create_item
+from settings import RARITY_TIERS, CLASS_PRIMARIES, CLASS_SECONDARIES
+
+MIN_ATTACK_DELAY = 0.2  # Fastest anyone can swing, in seconds
+DUNGEON_ENEMY_COUNT = 10  # Regular enemies before the boss
+DUNGEON_SPAWN_DELAY = 1.0  # Seconds between one dungeon enemy dying and the next one engaging
+QUICK_SPAWN_DELAY = 3.0  # Same for quick battles
+QUICK_UNARMED_DAMAGE = (0, 2)
+DUNGEON_UNARMED_DAMAGE = (2, 2)
+
+FIRST_TIME_RARITY_TIERS = {
+    "Rare": 75,
+    "Epic": 10,
+    "Legendary": 10,
+    "Mythical": 5
+}
+LOOT_SLOTS = [
+    "head", "shoulders", "chest", "gloves", "legs", "boots",
+    "primary", "secondary", "amulet", "ring", "bracelet", "belt"
+]
+
+
+def attack_delay(speed):
+    return max(MIN_ATTACK_DELAY, 1.0 / speed)
+
+
+def find_tier(level):
+    for tier in reversed(ENEMY_TIERS):
+        if int(level) >= tier["min_level"]:
+            return tier
+    return ENEMY_TIERS[0]
+
+
+# --- Enemy generation ---
+
+def generate_quick_enemy(level, rng=random):
+    tier = find_tier(level)
+
+    is_elite = rng.random() < 0.15  # 15% chance to be elite
+    name = f"{rng.choice(NAME_PREFIXES)} {tier['name']} Lv{level}"
+
+    elite_type = None
+    if is_elite:
+        elite_type = rng.choice(list(ELITE_AURA_COLORS.keys()))  # Shown as a title, the name stays plain
+
+    hp = int(tier["base_hp"] + level * 5)
+    dmg = int(tier["base_dmg"] + level * 1.5)
+    crit_chance = 10 + level * 0.5  # scale slightly with dungeon level
+    crit_damage = 50  # 1.5x damage
+    speed = round(max(0.5, tier["base_speed"] - level * 0.02), 2)
+    xp = int(tier["base_xp"] + level * 2.5)
+    copper = int(tier["base_copper"] + level * 15)
+
+    if is_elite:
+        hp = int(hp * 1.6)
+        dmg = int(dmg * 1.5)
+        speed = max(speed - 0.1, 0.5)
+        xp = int(xp * 2)
+        copper = int(copper * 1.75)
+
+    return {
+        "name": name,
+        "hp": hp,
+        "max_hp": hp,
+        "damage": dmg,
+        "speed": speed,
+        "reward_xp": xp,
+        "reward_copper": copper,
+        "elite": is_elite,
+        "elite_type": elite_type,
+        "crit_chance": crit_chance,
+        "crit_damage": crit_damage
+    }
+
+
+def generate_dungeon_enemy(level, rng=random, is_boss=False):
+    tier = find_tier(level)
+    name = f"{rng.choice(NAME_PREFIXES)} {tier['name']} Lv{level}"
+    hp = int(tier["base_hp"] + int(level) * 7)
+    dmg = int(tier["base_dmg"] + level * 2)
+    if is_boss:
+        hp = int(hp * 2)
+        dmg = int(dmg * 1.8)
+        name = f"BOSS: {name}"
+
+    return {
+        "name": name,
+        "hp": hp,
+        "max_hp": hp,
+        "damage": dmg,
+        "is_boss": is_boss
+    }
+
+
+def generate_dungeon(level, rng=random):
+    """Returns (enemies, boss) for one run of a dungeon level."""
+    enemies = [generate_dungeon_enemy(level, rng) for _ in range(DUNGEON_ENEMY_COUNT)]
+    boss = generate_dungeon_enemy(level, rng, is_boss=True)
+    return enemies, boss
+
+
+# --- Fights ---
+
+class CombatEngine:
+    """One player against one enemy. Deterministic for a given seed (or rng).
+
+    advance(dt) steps the fight in real time for the screens, resolve() runs it to the end in one go.
+    Both return lists of event dicts, each stamped with "at" (seconds into the fight):
+        {"type": "player_hit", "damage": int, "crit": bool}
+        {"type": "enemy_defeated"}
+        {"type": "dodged"} / {"type": "avoided"}
+        {"type": "enemy_hit", "damage": int, "crit": bool, "blocked": bool}   (damage after armor, may be 0)
+        {"type": "player_defeated"}
+    """
+
+    def __init__(self, total_stats, equipment, enemy, seed=None, rng=None, unarmed_damage=QUICK_UNARMED_DAMAGE):
+        self.stats = total_stats
+        self.equipment = equipment or {}
+        self.enemy = dict(enemy)
+        self.rng = rng or random.Random(seed)
+        self.unarmed_damage = unarmed_damage
+
+        self.max_hp = total_stats.get("Health", 100)
+        self.player_hp = self.max_hp
+        self.player_delay = attack_delay(total_stats.get("Attack Speed", 1.0))
+        self.enemy_delay = attack_delay(self.enemy.get("speed", 1.0))
+        self.player_timer = 0.0
+        self.enemy_timer = 0.0
+
+        self.elapsed = 0.0
+        self.damage_dealt = 0
+        self.damage_taken = 0
+        self.winner = None  # "player" or "enemy" once the fight is over
+
+    @property
+    def finished(self):
+        return self.winner is not None
+
+    def advance(self, dt):
+        if self.finished:
+            return []
+
+        events = []
+        self.elapsed += dt
+        self.player_timer += dt
+        self.enemy_timer += dt
+
+        if self.player_timer >= self.player_delay:
+            self.player_timer = 0.0
+            events.extend(self.player_attack())
+
+        if not self.finished and self.enemy_timer >= self.enemy_delay:
+            self.enemy_timer = 0.0
+            events.extend(self.enemy_attack())
+
+        for event in events:
+            event["at"] = round(self.elapsed, 3)
+        return events
+
+    def resolve(self, max_seconds=600.0):
+        """Fights until someone dies (or max_seconds of combat time pass, which counts as a loss)."""
+        events = []
+        while not self.finished:
+            if self.elapsed >= max_seconds:
+                self.winner = "enemy"
+                break
+            # Jump straight to the next swing instead of ticking frame by frame
+            step = min(self.player_delay - self.player_timer, self.enemy_delay - self.enemy_timer)
+            events.extend(self.advance(max(step, 0.0) + 1e-9))
+        return events
+
+    def weapon_damage(self, slot):
+        weapon = self.equipment.get(slot)
+        if weapon:
+            return self.rng.randint(weapon["stats"].get("Min Damage", 1), weapon["stats"].get("Max Damage", 5))
+        return self.rng.randint(*self.unarmed_damage)
+
+    def player_attack(self):
+        dmg = self.weapon_damage("primary") + self.weapon_damage("secondary") + self.stats.get("Bonus Damage", 0)
+
+        is_crit = self.rng.random() < (self.stats.get("Critical Chance", 0) / 100)
+        if is_crit:
+            dmg = int(dmg * (1 + self.stats.get("Critical Damage", 0) / 100))
+
+        self.enemy["hp"] -= dmg
+        self.damage_dealt += dmg
+        events = [{"type": "player_hit", "damage": dmg, "crit": is_crit}]
+
+        if self.enemy["hp"] <= 0:
+            self.enemy["hp"] = 0
+            self.winner = "player"
+            events.append({"type": "enemy_defeated"})
+        return events
+
+    def enemy_attack(self):
+        # Dodge, then avoidance, then crit, then block, armor comes off last
+        if self.rng.random() < (self.stats.get("Dodge", 0) / 100):
+            return [{"type": "dodged"}]
+        if self.rng.random() < (self.stats.get("Avoidance", 0) / 100):
+            return [{"type": "avoided"}]
+
+        dmg = self.enemy["damage"]
+        is_crit = self.rng.random() < (self.enemy.get("crit_chance", 0) / 100)
+        if is_crit:
+            dmg = int(dmg * (1 + self.enemy.get("crit_damage", 0) / 100))
+
+        blocked = self.rng.random() < (self.stats.get("Block", 0) / 100)
+        if blocked:
+            dmg = int(dmg * 0.5)
+
+        dmg = max(0, dmg - self.stats.get("Armor", 0))
+        self.player_hp -= dmg
+        self.damage_taken += dmg
+        events = [{"type": "enemy_hit", "damage": dmg, "crit": is_crit, "blocked": blocked}]
+
+        if self.player_hp <= 0:
+            self.player_hp = 0
+            self.winner = "enemy"
+            events.append({"type": "player_defeated"})
+        return events
+
+
+def simulate_dungeon(total_stats, equipment, level, seed=None, rng=None, record_events=False):
+    """Runs a whole dungeon level headless. Time includes the pause between enemies, like the screen.
+
+    With record_events, result["fights"] holds each enemy, when its fight started and its events.
+    """
+    rng = rng or random.Random(seed)
+    enemies, boss = generate_dungeon(level, rng)
+
+    result = {"level": level, "cleared": False, "enemies_defeated": 0, "seconds": 0.0,
+              "damage_dealt": 0, "damage_taken": 0}
+    if record_events:
+        result["fights"] = []
+
+    for index, enemy in enumerate(enemies + [boss]):
+        if index:
+            result["seconds"] += DUNGEON_SPAWN_DELAY
+        fight = CombatEngine(total_stats, equipment, enemy, rng=rng, unarmed_damage=DUNGEON_UNARMED_DAMAGE)
+        events = fight.resolve()
+
+        if record_events:
+            result["fights"].append({
+                "enemy": enemy,
+                "start": round(result["seconds"], 3),
+                "events": events,
+                "winner": fight.winner
+            })
+
+        result["seconds"] += fight.elapsed
+        result["damage_dealt"] += fight.damage_dealt
+        result["damage_taken"] += fight.damage_taken
+        if fight.winner != "player":
+            return result
+        result["enemies_defeated"] += 1
+
+    result["cleared"] = True
+    return result
+
+
+# --- Dungeon rewards ---
+
+def dungeon_rewards(level, first_time):
+    """(xp, copper) for clearing a dungeon level, doubled on the first clear."""
+    multiplier = 2.0 if first_time else 1.0
+    return int((100 + level * 20) * multiplier), int((250 + level * 25) * multiplier)
+
+
+def pick_loot_rarity(rng=random, first_time=False):
+    tiers, fallback = (FIRST_TIME_RARITY_TIERS, "Rare") if first_time else (RARITY_TIERS, "Common")
+    roll = rng.random()
+    threshold = 0
+    for rarity, chance in tiers.items():
+        threshold += chance / 100
+        if roll < threshold:
+            return rarity
+    return fallback
+
+
+def roll_dungeon_loot(level, char_class, first_time, rng=random):
+    """Guaranteed item on a first clear, 25% chance after that. Returns the item dict or None."""
+    drop_chance = 1 if first_time else 0.25
+    if rng.random() >= drop_chance:
+        return None
+
+    rarity = pick_loot_rarity(rng, first_time)
+    slot = rng.choice(LOOT_SLOTS)
+    weapon_type = None
+    if slot == "primary":
+        weapon_type = rng.choice(CLASS_PRIMARIES.get(char_class, ("Sword",)))
+    elif slot == "secondary":
+        weapon_type = rng.choice(CLASS_SECONDARIES.get(char_class, ("Sword",)))
+    return create_item(slot, char_class, rarity=rarity, weapon_type=weapon_type, item_level=level)
@@ -9,7 +9,13 @@ engine = create_engine(DATABASE_URL)
 
 def init_db():
     Base.metadata.create_all(engine)
+
+    # create_all skips indexes on tables that already exist, the migrations are safe to re-run
+    from alembic import command
+    from alembic.config import Config
+    command.upgrade(Config("alembic.ini"), "head")
+
     print("✅ Database initialized!")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
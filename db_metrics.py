@@ -0,0 +1,74 @@
+# db_metrics.py
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+LATENCY_SAMPLES = 1000  # Most recent checkouts kept for the percentiles
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0  # Checkouts that found every connection (overflow included) already in use
+        self.timeouts = 0  # Checkouts that gave up after pool_timeout
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.max_latency = 0.0
+
+    def record_checkout(self, seconds, waited):
+        with self.lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.latencies.append(seconds)
+            self.max_latency = max(self.max_latency, seconds)
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+            self.waits += 1
+
+    def snapshot(self, pool):
+        with self.lock:
+            samples = sorted(self.latencies)
+            counters = {
+                "checkouts": self.checkouts,
+                "exhausted_waits": self.waits,
+                "exhausted_timeouts": self.timeouts,
+                "max_checkout_ms": round(self.max_latency * 1000, 3)
+            }
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+        return {
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            **counters,
+            "checkout_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)}
+        }
+
+
+def instrumented_pool(base_class, metrics):
+    """Returns a subclass of a QueuePool class that reports checkout latency and exhaustion to metrics."""
+
+    class InstrumentedPool(base_class):
+        def _do_get(self):
+            waited = self._max_overflow >= 0 and self.checkedout() >= self.size() + self._max_overflow
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record_timeout()
+                raise
+            metrics.record_checkout(time.perf_counter() - start, waited)
+            return conn
+
+    InstrumentedPool.__name__ = f"Instrumented{base_class.__name__}"
+    return InstrumentedPool
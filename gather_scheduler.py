@@ -0,0 +1,145 @@
+# gather_scheduler.py
+# Pushes each watched gatherer a GatheringUpdate over the chat stream every minute and when their skill levels up,
+# so the client never has to poll /gather/status. The progress is what Collect (/collect_materials) would pay.
+# Everything is worked out from the start time and xp in closed form, nothing ticks per player.
+import datetime
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+
+import idle
+from gathering import catalog, skill_progress, level_for_xp, xp_for_level, MAX_SKILL_LEVEL, SKILL_XP_PER_MINUTE
+
+# What the scheduler remembers about a gatherer, a snapshot of the Player row after the last write
+GatherWatch = namedtuple("GatherWatch", ["player_name", "activity", "started_at", "xp", "level"])
+
+
+def watch_for(player):
+    """GatherWatch for a Player that is gathering, or None."""
+    activity = player.current_gathering_activity
+    activity = activity.value if hasattr(activity, "value") else activity
+    if not activity or activity == "none" or not player.gathering_start_time:
+        return None
+    return GatherWatch(player.name, activity, idle.parse_time(player.gathering_start_time),
+                       getattr(player, f"{activity}_xp") or 0, getattr(player, f"{activity}_level") or 1)
+
+
+def progress(watch, now):
+    """What collecting right now would pay out, plus when the next update is due and the skill levels up."""
+    unit = idle.COLLECT_UNIT_SECONDS
+    elapsed = (now - watch.started_at).total_seconds()
+    units = idle.collect_units(elapsed)
+    stretches, xp = skill_progress(watch.xp, units, unit)
+    items = sum(int(count * catalog.resolve(watch.activity, level).multiplier) for level, count in stretches)
+    level = max(watch.level, level_for_xp(xp))
+
+    # Collect pays every few seconds, pushing that often would flood the stream: once a minute and on level-ups
+    next_update_at = watch.started_at + datetime.timedelta(
+        seconds=(idle.gathering_units(elapsed) + 1) * idle.GATHER_UNIT_SECONDS)
+    level_up_at = None
+    if level < MAX_SKILL_LEVEL:
+        unit_xp = max(1, SKILL_XP_PER_MINUTE * unit // 60)
+        units_left = -(-(xp_for_level(level + 1) - xp) // unit_xp)
+        level_up_at = watch.started_at + datetime.timedelta(seconds=(units + max(1, units_left)) * unit)
+        next_update_at = min(next_update_at, level_up_at)
+
+    return {
+        "activity": watch.activity,
+        "level": level,
+        "experience": xp,
+        "units": units,
+        "items": items,
+        "next_update_at": next_update_at.timestamp(),
+        "level_up_at": level_up_at.timestamp() if level_up_at else None
+    }
+
+
+class GatherScheduler:
+    """Watched gatherers and a heap of their next yields. notify(player_name, data) returns False once
+    nobody is listening, and the player stops being watched until /gather/summary (or a gather write) again."""
+
+    def __init__(self, notify):
+        self.notify = notify
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.watched = {}  # player_name -> GatherWatch
+        self.deadlines = []  # heap of (when, seq, player_name, watch), stale entries are skipped when popped
+        self.order = itertools.count()
+        self.stopping = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        with self.wakeup:
+            self.stopping = True
+            self.wakeup.notify_all()
+        if self.thread:
+            self.thread.join(1)
+
+    def watch(self, player):
+        """(Re)schedules a player after any write to their gathering. Returns the current progress or None."""
+        watch = watch_for(player)
+        if watch is None:
+            self.unwatch(player.name)
+            return None
+
+        now = datetime.datetime.now(datetime.UTC)
+        current = progress(watch, now)
+        with self.lock:
+            self.watched[watch.player_name] = watch
+            self._schedule(watch, current)
+        return current
+
+    def unwatch(self, player_name):
+        with self.lock:
+            self.watched.pop(player_name, None)
+
+    def _schedule(self, watch, current):
+        # Caller holds self.lock
+        when = current["next_update_at"]
+        earliest = self.deadlines[0][0] if self.deadlines else None
+        heapq.heappush(self.deadlines, (when, next(self.order), watch.player_name, watch))
+        if earliest is None or when < earliest:
+            self.wakeup.notify()
+
+    def _pop_due(self, now):
+        # Caller holds self.lock
+        due = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, _, player_name, watch = heapq.heappop(self.deadlines)
+            # Only the schedule from the latest write counts
+            if self.watched.get(player_name) is watch:
+                due.append(watch)
+        return due
+
+    def _run(self):
+        while True:
+            with self.wakeup:
+                while not self.stopping:
+                    now = datetime.datetime.now(datetime.UTC).timestamp()
+                    if self.deadlines and self.deadlines[0][0] <= now:
+                        break
+                    self.wakeup.wait(self.deadlines[0][0] - now if self.deadlines else None)
+                if self.stopping:
+                    return
+                due = self._pop_due(datetime.datetime.now(datetime.UTC).timestamp())
+
+            now = datetime.datetime.now(datetime.UTC)
+            for watch in due:
+                current = progress(watch, now)
+                try:
+                    listening = self.notify(watch.player_name, current)
+                except Exception as e:
+                    print(f"[Gathering] Failed to notify {watch.player_name}: {e}")
+                    listening = True
+                with self.lock:
+                    if self.watched.get(watch.player_name) is not watch:
+                        continue
+                    if listening:
+                        self._schedule(watch, current)
+                    else:
+                        del self.watched[watch.player_name]
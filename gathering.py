@@ -0,0 +1,164 @@
+# gathering.py
+# What every gathering activity yields at each skill level, worked out once from item_ID at startup.
+# Resolving a gather is then one list lookup instead of scanning and sorting the activity's item pool.
+#
+# Every item the skill level qualifies for can drop. A gather of any length is one multinomial draw over the
+# level's drop chances, so an 8 hour AFK session costs the same as a minute.
+#
+# Skill XP comes from time spent gathering. Levels are worked out from XP in closed form, and a stretch of
+# gathering is split only where a level-up happens, each part yielding at its own level's rate.
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from item_ID import WOODCUTTING_ITEMS, MINING_ITEMS, FARMING_ITEMS, SCAVENGING_ITEMS, get_item_name
+from settings import RARITY_TIERS
+
+GATHERING_POOLS = {
+    "woodcutting": WOODCUTTING_ITEMS,
+    "mining": MINING_ITEMS,
+    "farming": FARMING_ITEMS,
+    "scavenging": SCAVENGING_ITEMS
+}
+MAX_SKILL_LEVEL = 99  # tables go this far, higher levels get the level 99 entry
+SKILL_XP_PER_MINUTE = 12
+SKILL_XP_STEP = 60  # level l -> l + 1 takes l * SKILL_XP_STEP xp
+
+
+def yield_multiplier(skill_level):
+    return 1 + 0.1 * (skill_level - 1)  # +10% items per skill level
+
+
+def xp_for_level(level):
+    """Total skill xp a character has at the start of `level`."""
+    return SKILL_XP_STEP * level * (level - 1) // 2
+
+
+def level_for_xp(xp):
+    # Largest level with xp_for_level(level) <= xp: solve n(n + 1)/2 <= xp // step for n = level - 1
+    steps = max(0, xp) // SKILL_XP_STEP
+    return min(MAX_SKILL_LEVEL, (math.isqrt(8 * steps + 1) - 1) // 2 + 1)
+
+
+def skill_progress(xp, units, unit_seconds):
+    """Splits `units` of gathering (each unit_seconds long) starting at `xp` where the skill levels up.
+
+    Returns ([(level, units), ...], new xp). There's one step per level gained, however long the stretch was.
+    """
+    unit_xp = max(1, SKILL_XP_PER_MINUTE * unit_seconds // 60)
+    stretches = []
+    while units > 0:
+        level = level_for_xp(xp)
+        if level >= MAX_SKILL_LEVEL:
+            taken = units
+        else:
+            taken = min(units, -(-(xp_for_level(level + 1) - xp) // unit_xp))  # units until the next level
+        stretches.append((level, taken))
+        xp += taken * unit_xp
+        units -= taken
+    return stretches, xp
+
+
+def drop_weight(info):
+    # Rarer items stay rare, higher tiers weigh more so a new unlock shows up right away
+    return RARITY_TIERS[info["rarity"]] * info["level"]
+
+
+# item_id, name and rarity (the best item) are None and drop_ids is empty below the pool's first item level
+GatherTier = namedtuple("GatherTier", ["item_id", "name", "rarity", "multiplier", "drop_ids", "drop_chances"])
+
+
+def roll_drops(tier, count, rng=None):
+    """{item_id: quantity} for `count` items drawn from the tier's drop chances in one go."""
+    if count <= 0 or not tier.drop_ids:
+        return {}
+    counts = (rng or np.random.default_rng()).multinomial(count, tier.drop_chances)
+    return {item_id: int(quantity) for item_id, quantity in zip(tier.drop_ids, counts) if quantity}
+
+
+class GatheringCatalog:
+    def __init__(self, pools=GATHERING_POOLS, max_level=MAX_SKILL_LEVEL):
+        self.pools = pools
+        self.max_level = max_level
+        self.validate()
+        self.tables = {activity: self._build(pool) for activity, pool in pools.items()}  # activity -> [GatherTier]
+
+    def _build(self, pool):
+        # Walks up the levels keeping the last item reached, ties go to the higher id
+        by_level = sorted(pool.items(), key=lambda entry: (entry[1]["level"], entry[0]))
+        table = []
+        best = None
+        eligible = []
+        drop_ids, drop_chances = (), np.empty(0)
+        for level in range(self.max_level + 1):
+            if by_level and by_level[0][1]["level"] <= level:
+                while by_level and by_level[0][1]["level"] <= level:
+                    best = by_level.pop(0)
+                    eligible.append(best)
+                # Levels between unlocks share the arrays
+                weights = np.array([drop_weight(info) for _, info in eligible], dtype=float)
+                drop_ids, drop_chances = tuple(item_id for item_id, _ in eligible), weights / weights.sum()
+            item_id, info = best if best else (None, {})
+            table.append(GatherTier(item_id, info.get("name"), info.get("rarity"), yield_multiplier(level),
+                                    drop_ids, drop_chances))
+        return table
+
+    def resolve(self, activity, skill_level):
+        """GatherTier for the activity at that skill level, or None for an unknown activity."""
+        table = self.tables.get(activity)
+        if table is None:
+            return None
+        return table[min(max(skill_level or 0, 0), self.max_level)]
+
+    def best_item(self, activity, skill_level):
+        tier = self.resolve(activity, skill_level)
+        return tier.item_id if tier else None
+
+    def describe(self, drops):
+        """[{item_id, name, quantity}] for a roll_drops result, most first."""
+        return [{"item_id": item_id, "name": get_item_name(item_id), "quantity": quantity}
+                for item_id, quantity in sorted(drops.items(), key=lambda entry: -entry[1])]
+
+    def validate(self, activities=None):
+        """Raises ValueError listing everything wrong with the pools (and missing activities, if given).
+
+        Runs when the catalog is built, so bad item_ID data stops the server at import instead of mid-gather.
+        """
+        problems = []
+        seen = {}
+        for activity, pool in self.pools.items():
+            found = len(problems)
+            for item_id, info in pool.items():
+                if item_id in seen:
+                    problems.append(f"item {item_id} is in both {seen[item_id]} and {activity}")
+                seen[item_id] = activity
+                if not info.get("name"):
+                    problems.append(f"{activity} item {item_id} has no name")
+                if not isinstance(info.get("level"), int) or info["level"] < 1:
+                    problems.append(f"{activity} item {item_id} has an invalid level: {info.get('level')!r}")
+                if info.get("rarity") not in RARITY_TIERS:
+                    problems.append(f"{activity} item {item_id} has an unknown rarity: {info.get('rarity')!r}")
+            if len(problems) > found:
+                continue  # levels can't be compared
+
+            levels = [pool[item_id]["level"] for item_id in sorted(pool)]
+            if not levels or min(levels) != 1:
+                problems.append(f"{activity} has nothing to gather at level 1")
+            if levels != sorted(set(levels)):
+                problems.append(f"{activity} item levels don't rise with their ids")
+
+        for activity in activities or ():
+            if activity not in self.pools:
+                problems.append(f"{activity} has no item pool")
+
+        if problems:
+            raise ValueError("Gathering catalog is inconsistent: " + "; ".join(problems))
+
+
+catalog = GatheringCatalog()
+
+
+def drops_message(drops):
+    """"12 x Oak Log, 3 x Pine Log" for a describe() list."""
+    return ", ".join(f"{drop['quantity']} x {drop['name']}" for drop in drops) or "nothing"
@@ -0,0 +1,61 @@
+# idle.py
+# Idle progression worked out in closed form from timestamps, so nothing has to tick while a player is away.
+# The server settles everything that accrued since the last claim in one go.
+import datetime
+
+IDLE_CAP = datetime.timedelta(hours=4)  # Longest online or offline stretch that still pays out
+
+OFFLINE_XP_SECONDS = 10  # 1 XP per 10 seconds logged out
+OFFLINE_GOLD_SECONDS = 5  # 1 gold per 5 seconds logged out
+
+GATHER_UNIT_SECONDS = 60  # 1 gathering unit per minute
+COLLECT_UNIT_SECONDS = 5  # /collect_materials pays a unit per 5 seconds, and at least one
+
+
+def parse_time(value):
+    """UTC-aware datetime from a datetime or an ISO string (last_logout_time is stored as text)."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.UTC)
+    return value
+
+
+def split_windows(settled_at, logout_at, now):
+    """(start, online_seconds, offline_seconds) since the last settlement.
+
+    The player counts as online from settled_at until they logged out (or until now if they haven't),
+    and offline from the logout until now. Both stretches are capped at IDLE_CAP.
+    """
+    start = settled_at or logout_at or now
+    went_offline = logout_at if logout_at and logout_at >= start else None
+
+    online_end = min(went_offline or now, now)
+    online = max(0.0, (online_end - start).total_seconds())
+    offline = max(0.0, (now - went_offline).total_seconds()) if went_offline else 0.0
+
+    cap = IDLE_CAP.total_seconds()
+    return start, min(online, cap), min(offline, cap)
+
+
+def offline_rewards(seconds):
+    """(xp, gold) for time spent logged out."""
+    return int(seconds // OFFLINE_XP_SECONDS), int(seconds // OFFLINE_GOLD_SECONDS)
+
+
+def gathering_units(seconds):
+    """Whole gathering units in `seconds`, callers advance the start by units only.
+
+    What they yield, and the skill xp, is worked out by the gathering catalog (see gathering.skill_progress).
+    """
+    return int(max(0.0, seconds) // GATHER_UNIT_SECONDS)
+
+
+def collect_units(seconds):
+    """Units /collect_materials pays for `seconds` of gathering, at least one however short the run."""
+    return max(1, int(max(0.0, seconds) // COLLECT_UNIT_SECONDS))
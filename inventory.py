@@ -0,0 +1,281 @@
+# inventory.py
+# Versioned inventory edits. Clients send small ops (move/swap/equip/remove) against the version they last saw,
+# the server applies them, bumps Player.inventory_version and remembers which slots each version touched, so
+# clients can catch up with just those slots instead of downloading the whole bag.
+#
+# A change is {"slot": slot, "item": item or None}: the final content of a slot after that version.
+#
+# Items are rows of the items table (one per item, unique per owner and slot). Edits only load the rows in the
+# slots they touch, so nothing reads or rewrites a whole inventory.
+import threading
+import uuid
+
+from sqlalchemy import event, select
+
+from models import Item
+from settings import CLASS_WEAPON_RESTRICTIONS
+
+EQUIP_SUBTYPES = (
+    "head", "shoulders", "chest", "gloves", "legs", "boots",
+    "primary", "secondary", "amulet", "ring", "bracelet", "belt"
+)
+TWO_HANDED_WEAPONS = ("Bow", "Staff")
+CLIENT_OPS = ("move", "swap", "equip", "remove")  # "add" is server only (loot, /createitem)
+EQUIPPED_SLOTS = [f"equipped:{subtype}" for subtype in EQUIP_SUBTYPES]
+ITEM_FIELDS = ("name", "type", "subtype", "rarity", "level", "weapon_type", "icon", "stats")
+
+
+class InventoryError(ValueError):
+    pass
+
+
+def is_bag_slot(slot, max_slots):
+    return isinstance(slot, int) and not isinstance(slot, bool) and 0 <= slot < max_slots
+
+
+def is_equip_slot(slot):
+    return isinstance(slot, str) and slot.startswith("equipped:") and slot.split(":", 1)[1] in EQUIP_SUBTYPES
+
+
+# --- Rows ---
+
+def slot_to_db(slot):
+    return str(slot)
+
+
+def slot_from_db(value):
+    return int(value) if value.isdigit() else value
+
+
+def item_to_dict(row):
+    """Same shape items.create_item makes, plus the row id."""
+    item = {"id": str(row.id), "slot": slot_from_db(row.slot)}
+    for field in ITEM_FIELDS:
+        value = getattr(row, field)
+        if value is not None:
+            item[field] = value
+    return item
+
+
+def equipment_from_items(items):
+    """{subtype: item} for the equipped ones, the shape Player.equipment and calculate_total_stats use."""
+    equipment = {}
+    for item in items:
+        slot = item["slot"]
+        if is_equip_slot(slot):
+            equipment[slot.split(":", 1)[1]] = item
+    return equipment
+
+
+def items_of(*owner_ids):
+    return select(Item).where(Item.owner_id.in_(owner_ids))
+
+
+def items_at(owner_id, slots):
+    return select(Item).where(Item.owner_id == owner_id, Item.slot.in_([slot_to_db(slot) for slot in slots]))
+
+
+def equipped_items(owner_id):
+    return items_at(owner_id, EQUIPPED_SLOTS)
+
+
+def used_slots(owner_id):
+    return select(Item.slot).where(Item.owner_id == owner_id)
+
+
+def first_free_slot(taken, max_slots):
+    """First bag index not in `taken` (slot values as stored), or None when the bag is full."""
+    taken = set(taken)
+    return next((i for i in range(max_slots) if slot_to_db(i) not in taken), None)
+
+
+def slots_for_ops(ops):
+    """Every slot the ops read or write, plus both hands for the 2-handed weapon check. Load these rows.
+
+    Raises InventoryError for malformed ops, like apply_ops.
+    """
+    check_op_shapes(ops)
+    slots = {"equipped:primary", "equipped:secondary"}
+    for op in ops:
+        for key in ("from", "to", "slot"):
+            if op.get(key) is not None:
+                slots.add(op[key])
+    return slots
+
+
+def persist_ops(db, owner_id, rows, ops, max_slots, char_class=None, allow_add=False):
+    """Applies ops to the loaded rows (see slots_for_ops) and queues the row updates and inserts on db.
+
+    Returns (changes, removed rows). Deleting is left to the caller since it has to be awaited on an AsyncSession.
+    """
+    _, changes = apply_ops([item_to_dict(row) for row in rows], ops, max_slots, char_class, allow_add)
+
+    by_id = {str(row.id): row for row in rows}
+    kept = set()
+    for change in changes:
+        item = change["item"]
+        if item is None:
+            continue
+        row = by_id.get(item.get("id"))
+        if row is None:
+            item["id"] = item.get("id") or str(uuid.uuid4())
+            db.add(Item(id=uuid.UUID(item["id"]), owner_id=owner_id, slot=slot_to_db(change["slot"]),
+                        **{field: item.get(field) for field in ITEM_FIELDS if field in item}))
+        else:
+            row.slot = slot_to_db(change["slot"])
+        kept.add(item["id"])
+
+    changed = {slot_to_db(change["slot"]) for change in changes}
+    removed = [row for item_id, row in by_id.items() if item_id not in kept and row.slot in changed]
+    return changes, removed
+
+
+# --- Ops ---
+
+def check_op_shapes(ops):
+    """Raises InventoryError unless every op is a dict whose slots are ints or strings (or missing)."""
+    if not isinstance(ops, list):
+        raise InventoryError("ops must be a list")
+    for op in ops:
+        if not isinstance(op, dict):
+            raise InventoryError(f"Invalid op: {op!r}")
+        for key in ("from", "to", "slot"):
+            slot = op.get(key)
+            if slot is not None and (isinstance(slot, bool) or not isinstance(slot, (int, str))):
+                raise InventoryError(f"Invalid slot: {slot!r}")
+
+
+def check_equip(item, slot, char_class):
+    subtype = slot.split(":", 1)[1]
+    weapon_type = item.get("weapon_type")
+    if weapon_type in TWO_HANDED_WEAPONS:
+        if subtype != "primary":
+            raise InventoryError(f"{weapon_type} can only go in the primary slot")
+    elif item.get("subtype") != subtype:
+        raise InventoryError(f"{item.get('subtype')} can't go into {subtype}")
+    if weapon_type and char_class and weapon_type not in CLASS_WEAPON_RESTRICTIONS.get(char_class, set()):
+        raise InventoryError(f"{char_class} cannot equip {weapon_type}")
+
+
+def apply_ops(inventory, ops, max_slots, char_class=None, allow_add=False):
+    """(new inventory, changes). Raises InventoryError and leaves inventory alone if any op is invalid."""
+    check_op_shapes(ops)
+    slots = {}
+    unplaced = []  # items without a usable slot are kept as they are
+    for item in inventory or []:
+        slot = item.get("slot")
+        if (is_bag_slot(slot, max_slots) or is_equip_slot(slot)) and slot not in slots:
+            slots[slot] = item
+        else:
+            unplaced.append(item)
+
+    touched = []
+
+    def check_slot(slot):
+        if not (is_bag_slot(slot, max_slots) or is_equip_slot(slot)):
+            raise InventoryError(f"Invalid slot: {slot!r}")
+        if slot not in touched:
+            touched.append(slot)
+        return slot
+
+    for op in ops:
+        kind = op.get("op")
+        if kind not in CLIENT_OPS and not (allow_add and kind == "add"):
+            raise InventoryError(f"Unknown op: {kind!r}")
+
+        if kind == "add":
+            slot = op.get("slot")
+            if slot is None:
+                slot = next((i for i in range(max_slots) if i not in slots), None)
+                if slot is None:
+                    raise InventoryError("Inventory is full")
+            if check_slot(slot) in slots:
+                raise InventoryError(f"Slot {slot!r} is taken")
+            slots[slot] = dict(op["item"])
+
+        elif kind == "remove":
+            if slots.pop(check_slot(op.get("slot")), None) is None:
+                raise InventoryError(f"Nothing in slot {op.get('slot')!r}")
+
+        else:
+            source, target = check_slot(op.get("from")), check_slot(op.get("to"))
+            if kind == "move" and target in slots:
+                raise InventoryError(f"Slot {target!r} is taken")
+            if kind == "equip" and not (is_bag_slot(source, max_slots) and is_equip_slot(target)):
+                raise InventoryError("equip goes from a bag slot to an equipment slot")
+            moving, displaced = slots.pop(source, None), slots.pop(target, None)
+            if moving is None and (kind != "swap" or displaced is None):
+                raise InventoryError(f"Nothing in slot {source!r}")
+            if moving is not None:
+                slots[target] = moving
+            if displaced is not None:
+                slots[source] = displaced
+
+    # Only the slots these ops touched are checked, so an old bad item elsewhere doesn't lock the bag
+    changes = []
+    for slot in touched:
+        item = slots.get(slot)
+        if item is not None:
+            item = {**item, "slot": slot}
+            slots[slot] = item
+            if is_equip_slot(slot):
+                check_equip(item, slot, char_class)
+        changes.append({"slot": slot, "item": item})
+
+    primary = slots.get("equipped:primary")
+    hands_touched = "equipped:primary" in touched or "equipped:secondary" in touched
+    if hands_touched and primary and primary.get("weapon_type") in TWO_HANDED_WEAPONS and "equipped:secondary" in slots:
+        raise InventoryError("Cannot equip a secondary item with a 2-handed weapon")
+
+    return list(slots.values()) + unplaced, changes
+
+
+class InventoryChangeLog:
+    """The last `size` versions of every inventory that changed since startup, recorded on commit.
+
+    After a restart (or for versions that fell out of the log) since() returns None and callers send the
+    whole inventory instead.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.versions = {}  # player_id (str) -> {version: changes}
+
+    def attach(self, session_class):
+        event.listen(session_class, "after_commit", self._apply)
+        event.listen(session_class, "after_rollback", lambda session: session.info.pop("inventory_changes", None))
+
+    def stage(self, session, player, changes):
+        """Call after bumping player.inventory_version. Recorded only if the session commits."""
+        session = getattr(session, "sync_session", session)  # AsyncSession wraps the one the hooks see
+        session.info.setdefault("inventory_changes", []).append((str(player.id), player.inventory_version, changes))
+
+    def _apply(self, session):
+        staged = session.info.pop("inventory_changes", None)
+        if not staged:
+            return
+
+        with self.lock:
+            for player_id, version, changes in staged:
+                log = self.versions.setdefault(player_id, {})
+                log[version] = changes
+                while len(log) > self.size:
+                    del log[min(log)]
+
+    def since(self, player_id, version, current):
+        """Changes from `version` up to `current`, one entry per slot, or None if the log can't cover it."""
+        if version == current:
+            return []
+        if version > current:
+            return None
+
+        with self.lock:
+            log = self.versions.get(str(player_id), {})
+            if any(v not in log for v in range(version + 1, current + 1)):
+                return None
+            merged = {}
+            for v in range(version + 1, current + 1):
+                for change in log[v]:
+                    merged[change["slot"]] = change
+        return list(merged.values())
@@ -0,0 +1,122 @@
+# leaderboard.py
+import math
+import threading
+
+from sortedcontainers import SortedList
+from sqlalchemy import event
+
+import models
+
+TOP_SIZE = 10
+
+
+def rank_key(entry):
+    # Same order as ORDER BY highest_dungeon_completed DESC, best_dungeon_time_seconds ASC (NULL times last)
+    return (-(entry["dungeon"] or 0), entry["time"] if entry["time"] is not None else math.inf, entry["id"])
+
+
+def snapshot(player):
+    return {
+        "id": str(player.id),
+        "name": player.name,
+        "class": player.char_class,
+        "level": player.level,
+        "dungeon": player.highest_dungeon_completed,
+        "time": player.best_dungeon_time_seconds
+    }
+
+
+class DungeonLeaderboard:
+    """Every character ordered by dungeon progress, kept in memory and updated on commit."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ranking = SortedList()  # rank_key tuples
+        self.entries = {}  # player_id (str) -> snapshot
+        self.keys = {}  # player_id -> rank_key
+        self.names = {}  # character name -> player_id
+        self.top_cache = None
+
+    def load(self, session_factory):
+        db = session_factory()
+        try:
+            players = db.query(models.Player).all()
+            with self.lock:
+                for player in players:
+                    self._put(snapshot(player))
+                self.top_cache = None
+        finally:
+            db.close()
+
+    def attach(self, session_class):
+        """Keeps the ranking in sync with every committed Player insert, update and delete."""
+        event.listen(session_class, "after_flush", self._collect)
+        event.listen(session_class, "after_commit", self._apply)
+        event.listen(session_class, "after_rollback", lambda session: session.info.pop("leaderboard", None))
+
+    # --- Session hooks ---
+
+    @staticmethod
+    def _collect(session, flush_context):
+        changes = session.info.setdefault("leaderboard", {})
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, models.Player):
+                changes[str(obj.id)] = snapshot(obj)
+        for obj in session.deleted:
+            if isinstance(obj, models.Player):
+                changes[str(obj.id)] = None
+
+    def _apply(self, session):
+        changes = session.info.pop("leaderboard", None)
+        if not changes:
+            return
+
+        with self.lock:
+            for player_id, entry in changes.items():
+                if entry is None:
+                    self._remove(player_id)
+                elif entry != self.entries.get(player_id):
+                    self._put(entry)
+                else:
+                    continue
+                self.top_cache = None
+
+    # --- Bookkeeping (caller holds self.lock) ---
+
+    def _put(self, entry):
+        self._remove(entry["id"])
+        key = rank_key(entry)
+        self.ranking.add(key)
+        self.entries[entry["id"]] = entry
+        self.keys[entry["id"]] = key
+        self.names[entry["name"]] = entry["id"]
+
+    def _remove(self, player_id):
+        key = self.keys.pop(player_id, None)
+        if key is None:
+            return
+        self.ranking.remove(key)
+        entry = self.entries.pop(player_id)
+        if self.names.get(entry["name"]) == player_id:
+            del self.names[entry["name"]]
+
+    @staticmethod
+    def _public(entry):
+        return {k: v for k, v in entry.items() if k != "id"}
+
+    # --- Queries ---
+
+    def top(self):
+        with self.lock:
+            if self.top_cache is None:
+                self.top_cache = [
+                    self._public(self.entries[key[2]]) for key in self.ranking.islice(0, TOP_SIZE)
+                ]
+            return self.top_cache
+
+    def rank_of(self, name):
+        with self.lock:
+            player_id = self.names.get(name)
+            if player_id is None:
+                return None
+            return {"rank": self.ranking.index(self.keys[player_id]) + 1, **self._public(self.entries[player_id])}
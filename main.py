@@ -1,8 +1,8 @@
 # main.py
 import pygame
 import pygame_gui
-import requests
 
+from network import network, NETWORK_RESPONSE, PRIORITY_HIGH
 from player import Player
 from player_registry import unregister_player
 from screen_manager import ScreenManager
@@ -40,16 +40,22 @@ while running:
     events = pygame.event.get()
 
     for event in events:
+        # Finished requests from the network workers, their callbacks run here on the main thread
+        if event.type == NETWORK_RESPONSE:
+            network.dispatch(event)
+            continue
+
         if event.type == pygame.QUIT:
-            # When the game is quitting or logging out
-            try:
-                requests.post(
-                    f"{SERVER_URL}/logout",
-                    json={"username": screen_manager.current_account},
-                    timeout=3
-                )
-            except Exception as e:
-                print(f"[Logout] Failed to notify server: {e}")
+            # Anything the sync manager hasn't sent yet goes out before we leave
+            if screen_manager.player:
+                screen_manager.player.save_to_server(screen_manager.auth_token)
+
+            # When the game is quitting or logging out, the one request worth waiting for (but not retrying)
+            result = network.post(
+                "/logout", json={"username": screen_manager.current_account}, priority=PRIORITY_HIGH, retries=0
+            ).result()
+            if result.error:
+                print(f"[Logout] Failed to notify server: {result.error}")
             running = False
 
         ui_manager.process_events(event)   # <<< Must always process first
@@ -57,6 +63,8 @@ while running:
 
     ui_manager.update(time_delta)
     screen_manager.update(time_delta)
+    if screen_manager.player:
+        screen_manager.player.sync.update(time_delta)  # only snapshots, the HTTP runs on the sync worker
 
     window_surface.fill((0, 0, 0))
     screen_manager.draw(window_surface)
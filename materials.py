@@ -0,0 +1,45 @@
+# materials.py
+# Reads and writes of gathered_materials. Every write is one INSERT ... ON CONFLICT statement however many
+# players and items it covers, so two collections or grants landing together both count.
+from sqlalchemy import select, text
+
+import models
+from item_ID import get_item_name, get_item_rarity
+
+# Stacks onto the unique (player_id, item_id) row, or starts it
+GRANT_MATERIALS_SQL = text("""
+    INSERT INTO gathered_materials (player_id, item_id, quantity, name, rarity)
+    SELECT * FROM unnest(CAST(:player_ids AS uuid[]), CAST(:item_ids AS integer[]), CAST(:quantities AS integer[]),
+                         CAST(:names AS varchar[]), CAST(:rarities AS varchar[]))
+    ON CONFLICT (player_id, item_id) DO UPDATE
+    SET quantity = gathered_materials.quantity + excluded.quantity
+""")
+
+
+def grant_materials(grants):
+    """Statement adding (player_id, item_id, quantity) grants. db.execute it (awaited on an AsyncSession).
+
+    Repeats of a player and item are summed first, a single INSERT ... ON CONFLICT can't touch a row twice.
+    """
+    totals = {}
+    for player_id, item_id, quantity in grants:
+        key = (str(player_id), item_id)
+        totals[key] = totals.get(key, 0) + quantity
+
+    keys = sorted(totals)  # same row order every time, so concurrent grants lock rows in the same order
+    return GRANT_MATERIALS_SQL.bindparams(
+        player_ids=[player_id for player_id, _ in keys],
+        item_ids=[item_id for _, item_id in keys],
+        quantities=[totals[key] for key in keys],
+        names=[get_item_name(item_id) for _, item_id in keys],
+        rarities=[get_item_rarity(item_id) for _, item_id in keys]
+    )
+
+
+def add_materials(player_id, drops):
+    """grant_materials for one player's {item_id: quantity}."""
+    return grant_materials((player_id, item_id, quantity) for item_id, quantity in drops.items())
+
+
+def materials_of(player_id):
+    return select(models.GatheredMaterial).where(models.GatheredMaterial.player_id == player_id)
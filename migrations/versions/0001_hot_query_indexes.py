@@ -0,0 +1,43 @@
+"""Indexes for the hot query predicates
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# name, table, columns, partial index predicate
+INDEXES = [
+    ("ix_accounts_is_online_last_seen", "accounts", ["is_online", "last_seen"], None),
+    ("ix_players_name", "players", ["name"], None),
+    ("ix_players_account_id_is_active", "players", ["account_id", "is_active"], None),
+    ("ix_players_name_active", "players", ["name"], "is_active = true"),
+    ("ix_chat_messages_timestamp", "chat_messages", ["timestamp"], None),
+    ("ix_chat_messages_type_recipient_timestamp", "chat_messages", ["type", "recipient", "timestamp"], None),
+    ("ix_chat_messages_type_sender_timestamp", "chat_messages", ["type", "sender", "timestamp"], None),
+    ("ix_gathered_materials_player_id_item_id", "gathered_materials", ["player_id", "item_id"], None),
+]
+
+
+def upgrade():
+    # CONCURRENTLY so a live server keeps reading and writing while the indexes build
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
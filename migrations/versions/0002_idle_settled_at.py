@@ -0,0 +1,22 @@
+"""Track when a character's idle progression was last settled
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a default, so Postgres only touches the catalog and the table isn't rewritten.
+    # IF NOT EXISTS because create_all already adds the column on a fresh database.
+    op.execute("ALTER TABLE players ADD COLUMN IF NOT EXISTS idle_settled_at TIMESTAMP WITH TIME ZONE")
+
+
+def downgrade():
+    op.execute("ALTER TABLE players DROP COLUMN IF EXISTS idle_settled_at")
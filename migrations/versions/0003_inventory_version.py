@@ -0,0 +1,22 @@
+"""Version counter for optimistic inventory edits
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default is stored in the catalog (Postgres 11+), existing rows read as 0 without a rewrite.
+    # IF NOT EXISTS because create_all already adds the column on a fresh database.
+    op.execute("ALTER TABLE players ADD COLUMN IF NOT EXISTS inventory_version INTEGER NOT NULL DEFAULT 0")
+
+
+def downgrade():
+    op.execute("ALTER TABLE players DROP COLUMN IF EXISTS inventory_version")
@@ -0,0 +1,56 @@
+"""Items table, one row per item instead of the players.inventory JSONB array
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS because create_all already makes the table on a fresh database
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            id UUID PRIMARY KEY,
+            owner_id UUID NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+            slot VARCHAR NOT NULL,
+            name VARCHAR NOT NULL,
+            type VARCHAR,
+            subtype VARCHAR,
+            rarity VARCHAR,
+            level INTEGER NOT NULL DEFAULT 1,
+            weapon_type VARCHAR,
+            icon VARCHAR,
+            stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+            CONSTRAINT uq_items_owner_slot UNIQUE (owner_id, slot) DEFERRABLE INITIALLY DEFERRED
+        )
+    """)
+
+    # Copy every placed item out of the JSONB arrays. Equipped items are in there too ("equipped:<subtype>"),
+    # players.equipment was only ever a copy of them. Characters that already have rows are skipped, so this
+    # can be re-run, and DISTINCT ON keeps the first item if an old inventory had two in one slot.
+    # gen_random_uuid() is built in from Postgres 13 (pgcrypto before that).
+    op.execute("""
+        INSERT INTO items (id, owner_id, slot, name, type, subtype, rarity, level, weapon_type, icon, stats)
+        SELECT DISTINCT ON (p.id, elem->>'slot')
+            gen_random_uuid(), p.id, elem->>'slot', COALESCE(elem->>'name', 'Unknown Item'),
+            elem->>'type', elem->>'subtype', elem->>'rarity', COALESCE((elem->>'level')::numeric::int, 1),
+            elem->>'weapon_type', elem->>'icon', COALESCE(elem->'stats', '{}'::jsonb)
+        FROM players p
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.inventory) = 'array' THEN p.inventory ELSE '[]'::jsonb END
+        ) AS elem
+        WHERE elem->>'slot' IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM items i WHERE i.owner_id = p.id)
+    """)
+    # players.inventory and players.equipment are left in place (unused) so a downgrade still has the old data
+
+
+def downgrade():
+    # Items created or moved after the upgrade are lost, the JSONB columns still hold the pre-upgrade state
+    op.execute("DROP TABLE IF EXISTS items")
@@ -0,0 +1,31 @@
+"""Gathering skill xp
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+SKILLS = ("woodcutting", "mining", "farming", "scavenging")
+
+
+def upgrade():
+    for skill in SKILLS:
+        # Constant default, so no table rewrite. IF NOT EXISTS because create_all already adds it on a fresh database.
+        op.execute(f"ALTER TABLE players ADD COLUMN IF NOT EXISTS {skill}_xp INTEGER NOT NULL DEFAULT 0")
+        # Characters whose level was set by hand keep it: give them the xp that level starts at
+        # (gathering.xp_for_level with SKILL_XP_STEP = 60)
+        op.execute(f"""
+            UPDATE players SET {skill}_xp = 30 * {skill}_level * ({skill}_level - 1)
+            WHERE {skill}_xp = 0 AND {skill}_level > 1
+        """)
+
+
+def downgrade():
+    for skill in SKILLS:
+        op.execute(f"ALTER TABLE players DROP COLUMN IF EXISTS {skill}_xp")
@@ -0,0 +1,51 @@
+"""One gathered_materials row per player and item, so stacks can be upserted with ON CONFLICT
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Writers wait until the duplicates are merged and the unique index exists, so no new duplicate slips in between
+    op.execute("LOCK TABLE gathered_materials IN SHARE ROW EXCLUSIVE MODE")
+
+    # Racing SELECT-then-insert writes could leave several rows for one item: fold them into the oldest
+    op.execute("""
+        UPDATE gathered_materials AS g
+        SET quantity = merged.total
+        FROM (
+            SELECT min(id) AS keep, sum(coalesce(quantity, 0)) AS total
+            FROM gathered_materials
+            GROUP BY player_id, item_id
+            HAVING count(*) > 1
+        ) AS merged
+        WHERE g.id = merged.keep
+    """)
+    op.execute("""
+        DELETE FROM gathered_materials AS g
+        USING gathered_materials AS older
+        WHERE g.player_id = older.player_id AND g.item_id = older.item_id AND g.id > older.id
+    """)
+
+    # IF NOT EXISTS because create_all already makes it on a fresh database. It covers every lookup the
+    # old (player_id, item_id) index served.
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_gathered_materials_player_id_item_id
+        ON gathered_materials (player_id, item_id)
+    """)
+    op.execute("DROP INDEX IF EXISTS ix_gathered_materials_player_id_item_id")
+
+
+def downgrade():
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_gathered_materials_player_id_item_id
+        ON gathered_materials (player_id, item_id)
+    """)
+    op.execute("DROP INDEX IF EXISTS uq_gathered_materials_player_id_item_id")
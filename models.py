@@ -2,7 +2,7 @@
 import datetime
 import uuid
 import enum
-from sqlalchemy import Column, String, Integer, ForeignKey, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, Float, Boolean, DateTime, Text, Index, UniqueConstraint, text
 from sqlalchemy import Enum as SqlEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
@@ -22,6 +22,10 @@ class Account(Base):
     is_online = Column(Boolean, default=False)
     last_seen = Column(DateTime, default=datetime.datetime.now(datetime.UTC))
 
+    __table_args__ = (
+        Index("ix_accounts_is_online_last_seen", "is_online", "last_seen"),
+    )
+
 class GatheringActivityEnum(enum.Enum):
     none = "none"
     woodcutting = "woodcutting"
@@ -43,8 +47,10 @@ class Player(Base):
     gold = Column(Integer, default=0)
     platinum = Column(Integer, default=0)
     last_logout_time = Column(String, nullable=True)  # ✅ Add this, store ISO string
+    idle_settled_at = Column(DateTime(timezone=True), nullable=True)  # idle progression paid out up to here
     max_inventory_slots = Column(Integer, default=36)
-    inventory = Column(MutableList.as_mutable(JSONB), default=dict)
+    inventory = Column(MutableList.as_mutable(JSONB), default=dict)  # pre-0004 storage, items live in the items table now
+    inventory_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped by every inventory write
     equipment = Column(JSONB, default=dict)
     stats = Column(JSONB, default=dict)
     skills = Column(JSONB, default=dict)
@@ -60,8 +66,20 @@ class Player(Base):
     mining_level = Column(Integer, default=1)
     farming_level = Column(Integer, default=1)
     scavenging_level = Column(Integer, default=1)
+    # Skill xp, the levels above follow from these (see gathering.level_for_xp)
+    woodcutting_xp = Column(Integer, nullable=False, default=0, server_default="0")
+    mining_xp = Column(Integer, nullable=False, default=0, server_default="0")
+    farming_xp = Column(Integer, nullable=False, default=0, server_default="0")
+    scavenging_xp = Column(Integer, nullable=False, default=0, server_default="0")
     gathered_materials = relationship("GatheredMaterial", back_populates="player")
 
+    __table_args__ = (
+        Index("ix_players_name", "name"),
+        Index("ix_players_account_id_is_active", "account_id", "is_active"),
+        # Online lookups (whispers, kicks, /addexperience) only ever want the active character
+        Index("ix_players_name_active", "name", postgresql_where=text("is_active = true")),
+    )
+
 class ChatMessage(Base):
     __tablename__ = 'chat_messages'
 
@@ -72,6 +90,12 @@ class ChatMessage(Base):
     timestamp = Column(Float, nullable=False)
     type = Column(String, nullable=False, default="Chat")
 
+    __table_args__ = (
+        Index("ix_chat_messages_timestamp", "timestamp"),
+        Index("ix_chat_messages_type_recipient_timestamp", "type", "recipient", "timestamp"),
+        Index("ix_chat_messages_type_sender_timestamp", "type", "sender", "timestamp"),
+    )
+
 class ReportCase(Base):
     __tablename__ = "report_cases"
 
@@ -99,6 +123,27 @@ class ServerConfig(Base):
     last_updated = Column(DateTime, default=datetime.datetime.now(datetime.UTC))
     patch_notes = Column(Text, default="")
 
+class Item(Base):
+    """One generated item (items.create_item) in a character's bag or equipment."""
+    __tablename__ = "items"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("players.id", ondelete="CASCADE"), nullable=False)
+    slot = Column(String, nullable=False)  # bag index as text ("0".."35") or "equipped:<subtype>"
+    name = Column(String, nullable=False)
+    type = Column(String)
+    subtype = Column(String)
+    rarity = Column(String)
+    level = Column(Integer, nullable=False, default=1)
+    weapon_type = Column(String)
+    icon = Column(String)
+    stats = Column(JSONB, nullable=False, default=dict)
+
+    __table_args__ = (
+        # Doubles as the (owner, slot) index. Deferred so a swap can pass through a shared slot inside one commit
+        UniqueConstraint("owner_id", "slot", name="uq_items_owner_slot", deferrable=True, initially="DEFERRED"),
+    )
+
 class GatheredMaterial(Base):
     __tablename__ = "gathered_materials"
     id = Column(Integer, primary_key=True)
@@ -109,4 +154,9 @@ class GatheredMaterial(Base):
     name = Column(String, default="")
     rarity = Column(String, default="")
 
+    __table_args__ = (
+        # One stack per item, materials.py upserts onto it with ON CONFLICT
+        Index("uq_gathered_materials_player_id_item_id", "player_id", "item_id", unique=True),
+    )
+
 
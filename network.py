@@ -0,0 +1,205 @@
+# network.py
+# The client's HTTP goes through here. Requests run on a small worker pool and their results come back
+# through the pygame event queue, so callbacks always run on the main thread between frames and the
+# render loop never waits on the server.
+#
+#   network.get("/online_players", callback=self.on_online, priority=PRIORITY_HIGH)
+#   network.post("/gather/start", json=payload, callback=lambda result: ...)
+#
+# Every call also returns a concurrent.futures.Future for the rare caller that has to wait (logout).
+#
+# All of it, plus the sync manager and the chat catch-up, shares one HttpTransport: a single requests.Session,
+# so connections to the server are kept alive and reused instead of opened per call.
+import itertools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import pygame
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+from settings import (SERVER_URL, NETWORK_WORKERS, NETWORK_TIMEOUT, NETWORK_TIMEOUTS, NETWORK_RETRIES,
+                      NETWORK_BACKOFF, NETWORK_BACKOFF_CAP)
+
+NETWORK_RESPONSE = pygame.event.custom_type()
+
+
+def run_on_main_thread(callback, result):
+    """Queues callback(result) for the main loop like a finished request, for other threads' results (chat stream).
+
+    pygame_gui isn't thread-safe, anything that touches the UI has to come through here.
+    """
+    pygame.event.post(pygame.event.Event(NETWORK_RESPONSE, {"callback": callback, "result": result}))
+
+
+# Lower runs first
+PRIORITY_HIGH = 0  # the player just did something and is waiting on it
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # background traffic: heartbeats, saves, polling
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+
+
+class HttpTransport:
+    """Pooled keep-alive session with the auth header, per-endpoint timeouts and retries filled in.
+
+    Connection failures are retried with jittered exponential backoff. A POST is only retried when it never
+    reached the server (connect timeout), so nothing gets applied twice. GET/DELETE also retry on 502/503/504.
+    """
+
+    def __init__(self, retries=NETWORK_RETRIES, backoff=NETWORK_BACKOFF, backoff_cap=NETWORK_BACKOFF_CAP):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+
+        # Network workers, the sync worker and the chat thread can all have a request in flight
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=NETWORK_WORKERS + 2)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # gzip/deflate, plus br when brotli is installed (urllib3 decodes whatever it advertises)
+        self.session.headers["Accept-Encoding"] = DEFAULT_ACCEPT_ENCODING
+
+        # Longest prefix first so "/chat/send" wins over a shorter "/chat"
+        self.timeouts = sorted(NETWORK_TIMEOUTS.items(), key=lambda entry: len(entry[0]), reverse=True)
+
+    def set_auth_token(self, token):
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
+    def timeout_for(self, path):
+        for prefix, timeout in self.timeouts:
+            if path.startswith(prefix):
+                return timeout
+        return NETWORK_TIMEOUT
+
+    def backoff_delay(self, attempt):
+        # Full jitter, so clients that lost the server together don't all come back in the same instant
+        return random.uniform(0, min(self.backoff_cap, self.backoff * 2 ** attempt))
+
+    def request(self, method, path, timeout=None, retries=None, **kwargs):
+        """Blocking. Returns the requests.Response or raises the last error once retries run out."""
+        timeout = timeout or self.timeout_for(path)
+        retries = self.retries if retries is None else retries
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = self.session.request(method, f"{SERVER_URL}{path}", timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                never_sent = isinstance(e, requests.exceptions.ConnectTimeout)
+                if last_attempt or not (idempotent or never_sent):
+                    raise
+            else:
+                if last_attempt or not idempotent or response.status_code not in RETRY_STATUSES:
+                    return response
+                response.close()
+            time.sleep(self.backoff_delay(attempt))
+
+
+transport = HttpTransport()
+
+
+class NetworkResult:
+    """Response or error of one request. ok means it reached the server and got a 2xx back."""
+
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self._data = None
+
+    @property
+    def ok(self):
+        return self.response is not None and 200 <= self.response.status_code < 300
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    def json(self, default=None):
+        if self._data is None:
+            try:
+                self._data = self.response.json()
+            except Exception:
+                return {} if default is None else default
+        return self._data
+
+    def describe_error(self, fallback="Could not reach the server."):
+        if self.error is not None:
+            return str(self.error)
+        data = self.json()
+        if isinstance(data, dict):
+            return data.get("detail") or data.get("error") or fallback
+        return fallback
+
+
+class NetworkClient:
+    def __init__(self, workers=NETWORK_WORKERS):
+        self.workers = workers
+        self.jobs = queue.PriorityQueue()
+        self.order = itertools.count()  # keeps FIFO order within a priority
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def _ensure_workers(self):
+        with self.lock:
+            if self.threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def request(self, method, path, callback=None, priority=PRIORITY_NORMAL, **kwargs):
+        """Queues a request. callback(NetworkResult) runs on the main thread once it's done.
+
+        kwargs go to HttpTransport.request (timeout, retries) and on to requests (json, params, ...).
+        """
+        self._ensure_workers()
+        future = Future()
+        self.jobs.put((priority, next(self.order), (method, path, kwargs, callback, future)))
+        return future
+
+    def get(self, path, callback=None, priority=PRIORITY_NORMAL, **kwargs):
+        return self.request("GET", path, callback, priority, **kwargs)
+
+    def post(self, path, callback=None, priority=PRIORITY_NORMAL, **kwargs):
+        return self.request("POST", path, callback, priority, **kwargs)
+
+    def delete(self, path, callback=None, priority=PRIORITY_NORMAL, **kwargs):
+        return self.request("DELETE", path, callback, priority, **kwargs)
+
+    def _work(self):
+        while True:
+            _, _, (method, path, kwargs, callback, future) = self.jobs.get()
+            try:
+                result = NetworkResult(response=transport.request(method, path, **kwargs))
+            except Exception as e:
+                result = NetworkResult(error=e)
+
+            future.set_result(result)
+            if callback:
+                try:
+                    run_on_main_thread(callback, result)
+                except pygame.error as e:
+                    print(f"[Network] Dropped the result of {method} {path}: {e}")
+            self.jobs.task_done()
+
+    @staticmethod
+    def dispatch(event):
+        """Called by the main loop for NETWORK_RESPONSE events."""
+        try:
+            event.callback(event.result)
+        except Exception as e:
+            print(f"[Network] Callback failed: {e}")
+
+
+network = NetworkClient()
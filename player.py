@@ -1,9 +1,11 @@
 import datetime
 import json
 import os
-import requests
 from items import create_item, EQUIP_SLOTS
-from settings import SERVER_URL, CLIENT_VERSION  # or wherever your server runs
+from network import network, PRIORITY_HIGH, PRIORITY_LOW
+from stats import StatEngine
+from sync_manager import SyncManager, InventorySync
+from settings import CLIENT_VERSION
 
 class Player:
     def __init__(self, name, char_class, level=1, experience=0, inventory=None, equipment=None, skills=None, username=None, role="player"):
@@ -54,6 +56,7 @@ class Player:
             "Dodge": 0,
             "Attack Speed": 1.0  # <-- default 1 second per attack
         }
+        self.stat_engine = StatEngine(char_class=char_class)
         self.total_stats = self.calculate_total_stats()
         self.highest_dungeon_completed = 0
         self.best_dungeon_time_seconds = 0
@@ -69,16 +72,23 @@ class Player:
         self.mining_level = 1
         self.farming_level = 1
         self.scavenging_level = 1
+        self.gathering_update = None  # latest GatheringUpdate push (progress of the running activity)
+
+        self.sync = SyncManager(self)  # batches saves, see sync_manager.py
+        self.inventory_sync = InventorySync(self)  # versioned inventory edits
 
     def gain_experience(self, amount):
+        # The server levels the character up the same way once the sync lands
+        self.sync.add_experience(amount)
+        self._add_experience(amount)
+
+    def _add_experience(self, amount):
         self.experience += amount
 
         while self.experience >= self.get_exp_to_next_level():
             self.experience -= self.get_exp_to_next_level()
             self.level_up()
 
-        self.sync_coins_to_server(self.auth_token)  # this function just saves everything
-
     def get_exp_to_next_level(self):
         return self.level * 25
 
@@ -87,25 +97,20 @@ class Player:
         self.stats["base_health"] += 5
         self.stats["base_mana"] += 5
         self.recalculate_stats()
-        self.save_stats_and_equipment()
-        if self.chat_window:
-            self.chat_window.log_message(f"[Level Up] {self.name} reached level {self.level}!", "System")
+        # No chat line here, the server posts the level-up once it has applied it
 
     def refresh_stats_and_level(self):
-        try:
-            response = requests.get(
-                f"{SERVER_URL}/player_stats",
-                params={"requester_name": self.name},
-                timeout=5
-            )
-            if response.status_code == 200:
-                data = response.json()
-                self.level = data.get("level", self.level)
-                self.experience = data.get("experience", self.experience)
-                self.stats = data.get("base_stats", self.stats)
-                self.total_stats = data.get("total_stats", self.total_stats)
-        except Exception as e:
-            print(f"[Refresh Stats] Error: {e}")
+        network.get("/player_stats", params={"requester_name": self.name}, callback=self._on_stats_refreshed)
+
+    def _on_stats_refreshed(self, result):
+        if result.ok:
+            data = result.json()
+            self.level = data.get("level", self.level)
+            self.experience = data.get("experience", self.experience)
+            self.stats = data.get("base_stats", self.stats)
+            self.total_stats = data.get("total_stats", self.total_stats)
+        elif result.error:
+            print(f"[Refresh Stats] Error: {result.error}")
 
             if "base_health" not in self.stats:
                 self.stats["base_health"] = 5 + (self.level * 5)
@@ -136,72 +141,10 @@ class Player:
         self.total_stats = self.calculate_total_stats()
 
     def calculate_total_stats(self):
-        # Start with base stats
-        total_stats = self.stats.copy()
-
-        # Add bonuses from equipped items
-        for item in self.equipment.values():
-            if item and "stats" in item:
-                for stat, value in item["stats"].items():
-                    total_stats[stat] = total_stats.get(stat, 0) + value
-
-        # Make sure there's always a fallback
-        total_stats["Attack Speed"] = total_stats.get("Attack Speed", 1.0)
-
-        # Raw stats
-        strength = total_stats.get("Strength", 0)
-        intelligence = total_stats.get("Intelligence", 0)
-        dexterity = total_stats.get("Dexterity", 0)
-        vitality = total_stats.get("Vitality", 0)
-
-        # Derived bonuses
-        total_stats["Bonus Damage"] = strength // 5
-        total_stats["Bonus Mana"] = intelligence // 5
-        total_stats["Bonus Health"] = vitality // 5
-        total_stats["Avoidance"] = dexterity // 10
-
-        # Final calculated pools
-        total_stats["Health"] = total_stats["base_health"] + vitality // 5  # Or however you want to base the starting HP
-        total_stats["Mana"] = total_stats["base_mana"] + intelligence // 5  # Similar logic
-        total_stats["Avoidance"] = intelligence // 10
-        total_stats["Dodge"] = dexterity // 10
-
-        # Begin updated logic for Attack Speed
-        primary = self.equipment.get("primary")
-        secondary = self.equipment.get("secondary")
-
-        # Default base speed
-        attack_speed = 1.0
-
-        if primary and primary.get("weapon_type") in ("Bow", "Staff"):
-            # 2-handed weapons override everything
-            attack_speed = primary["stats"].get("Attack Speed", 1.0)
-
-        else:
-            primary_speed = primary["stats"].get("Attack Speed", 1.0) if primary else 1.0
-            secondary_bonus = 0
-
-            if secondary:
-                weapon_type = secondary.get("weapon_type")
-                secondary_speed = secondary["stats"].get("Attack Speed", 0)
-
-                if weapon_type == "Shield":
-                    secondary_bonus = 0
-                elif weapon_type == "Focus":
-                    secondary_bonus = secondary_speed * 0.05  # Small bonus for focus
-                elif weapon_type in ("Sword", "Dagger"):
-                    if self.char_class == "Rogue":
-                        secondary_bonus = secondary_speed * 0.25
-                    else:
-                        secondary_bonus = secondary_speed * 0.10
-
-            attack_speed = round(primary_speed + secondary_bonus, 2)
-
-        # Ensure attack_speed is never below a minimum cap
-        attack_speed = max(0.2, attack_speed)
-        total_stats["Attack Speed"] = attack_speed
-
-        return total_stats
+        # Only slots whose item changed since the last call are re-added
+        self.stat_engine.set_base(self.stats)
+        self.stat_engine.sync(self.equipment)
+        return self.stat_engine.total
 
     def equip_item(self, item):
         subtype = item.get("subtype")
@@ -294,19 +237,6 @@ class Player:
                 return False
         return False
 
-    def save_stats_and_equipment(self):
-        try:
-            payload = {
-                "character_name": self.name,
-                "stats": self.stats,
-                "equipment": self.equipment
-            }
-            response = requests.post(f"{SERVER_URL}/stats_equipment/update", json=payload, timeout=5)
-            if response.status_code != 200:
-                print(f"[Sync] Failed to save stats/equipment: {response.status_code}: {response.text}")
-        except Exception as e:
-            print(f"[Sync] Error saving stats/equipment: {e}")
-
     def condense_coins(self):
         self.coins["silver"] += self.coins["copper"] // 100
         self.coins["copper"] %= 100
@@ -317,10 +247,11 @@ class Player:
         self.coins["platinum"] += self.coins["gold"] // 100
         self.coins["gold"] %= 100
 
-        self.sync_coins_to_server(self.auth_token)
         self._notify_coin_update()
 
     def add_coins(self, copper_amount, silver_amount=None, gold_amount=None, platinum_amount=None):
+        self.sync.add_copper((copper_amount or 0) + (silver_amount or 0) * 100 + (gold_amount or 0) * 10000
+                             + (platinum_amount or 0) * 1000000)
         if copper_amount:
             self.coins["copper"] += copper_amount
         if silver_amount:
@@ -371,60 +302,31 @@ class Player:
         total_have += self.coins["platinum"] * 1000000
 
         total_have -= total_needed
+        self.sync.add_copper(-total_needed)
         self.coins["copper"] = total_have
         self.condense_coins()
 
     def format_coins(self):
         return f"{self.coins['platinum']}p {self.coins['gold']}g {self.coins['silver']}s {self.coins['copper']}c"
 
-    def sync_coins_to_server(self, auth_token):
-        try:
-            headers = {
-                "Authorization": f"Bearer {auth_token}"
-            }
-            payload = {
-                "username": self.username,
-                "name": self.name,
-                "level": self.level,  # included just to fulfill the UpdatePlayerRequest
-                "experience": self.experience,
-                "copper": self.coins["copper"],
-                "silver": self.coins["silver"],
-                "gold": self.coins["gold"],
-                "platinum": self.coins["platinum"],
-                "last_logout_time": self.last_logout_time.isoformat() if self.last_logout_time else datetime.datetime.utcnow().isoformat(),
-                "highest_dungeon_completed": self.highest_dungeon_completed,
-                "best_dungeon_time_seconds": self.best_dungeon_time_seconds
+    def refresh_coins(self):
+        def on_coins(result):
+            if not result.ok:
+                print(f"[Refresh Coins] Error: {result.describe_error()}")
+                return
+            data = result.json()
+            self.coins = {
+                "copper": data.get("copper", 0),
+                "silver": data.get("silver", 0),
+                "gold": data.get("gold", 0),
+                "platinum": data.get("platinum", 0)
             }
-            response = requests.post(f"{SERVER_URL}/update_player", json=payload, headers=headers, timeout=5)
-            if response.status_code != 200:
-                print(f"[Sync Coins] Failed to sync coins: {response.status_code} - {response.text}")
-        except Exception as e:
-            print(f"[Sync Coins] Error: {e}")
+            self._notify_coin_update()
 
-    def refresh_coins(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/player_coins", params={"requester_name": self.name}, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                self.coins = {
-                    "copper": data.get("copper", 0),
-                    "silver": data.get("silver", 0),
-                    "gold": data.get("gold", 0),
-                    "platinum": data.get("platinum", 0)
-                }
-                self._notify_coin_update()
-        except Exception as e:
-            print(f"[Refresh Coins] Error: {e}")
+        network.get("/player_coins", params={"requester_name": self.name}, callback=on_coins)
 
     def refresh_inventory(self):
-        try:
-            response = requests.get(f"{SERVER_URL}/inventory/{self.name}", timeout=5)
-            if response.status_code == 200:
-                self.inventory = response.json()
-            else:
-                print(f"[Refresh Inventory] Server returned error: {response.status_code}")
-        except Exception as e:
-            print(f"[Refresh Inventory] Error: {e}")
+        self.inventory_sync.refresh()
 
     def register_coin_update_callback(self, callback_fn):
         self._coin_update_callbacks.append(callback_fn)
@@ -466,22 +368,24 @@ class Player:
         self._heartbeat_last_time += time_delta
         if self._heartbeat_last_time >= self._heartbeat_interval:
             self._heartbeat_last_time = 0
-            try:
-                requests.post(
-                    f"{SERVER_URL}/heartbeat",
-                    json={
-                        "username": self._heartbeat_username,
-                        "character_name": self.name,
-                        "client_version": CLIENT_VERSION
-                    },
-                    timeout=2
-                )
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 426:
-                    self.chat_window.log("[Update] Client version is outdated. Disconnecting.", "System")
-                    self.screen_manager.force_logout(reason="Outdated client version")
-            except Exception as e:
-                print(f"[Heartbeat Error] {e}")
+            network.post(
+                "/heartbeat",
+                json={
+                    "username": self._heartbeat_username,
+                    "character_name": self.name,
+                    "client_version": CLIENT_VERSION
+                },
+                callback=self._on_heartbeat,
+                priority=PRIORITY_LOW
+            )
+
+    def _on_heartbeat(self, result):
+        if result.status_code == 426:
+            if self.chat_window:
+                self.chat_window.log_message("[Update] Client version is outdated. Disconnecting.", "System")
+                self.chat_window.screen_manager.force_logout(reason="Outdated client version")
+        elif result.error:
+            print(f"[Heartbeat Error] {result.error}")
 
     @classmethod
     def from_server_data(cls, data):
@@ -496,6 +400,7 @@ class Player:
             username=data["username"],
             role=data.get("role", "player")
         )
+        player.inventory_sync.reset(data.get("inventory_version"))
         if data.get("last_logout_time"):
             player.last_logout_time = datetime.datetime.fromisoformat(data["last_logout_time"])
         if data.get("is_muted"):
@@ -518,47 +423,46 @@ class Player:
         return player
 
     def save_to_server(self, auth_token):
-        try:
-            headers = {
-                "Authorization": f"Bearer {auth_token}"
-            }
-            payload = {
-                "username": self.username,  # you must have self.username stored!
-                "name": self.name,
-                "level": self.level,
-                "experience": self.experience,
-                "copper": self.coins["copper"],
-                "silver": self.coins["silver"],
-                "gold": self.coins["gold"],
-                "platinum": self.coins["platinum"],
-                "last_logout_time": self.last_logout_time.isoformat() if self.last_logout_time else datetime.datetime.utcnow().isoformat(),
-                "highest_dungeon_completed": self.highest_dungeon_completed,
-                "best_dungeon_time_seconds": self.best_dungeon_time_seconds,
-            }
-            response = requests.post(f"{SERVER_URL}/update_player", json=payload, headers=headers)
-            if response.status_code == 200:
-                pass
-                # print("[Server Sync] Player saved successfully.")
-            else:
-                print(f"[Server Sync] Failed to save player. {response.status_code}: {response.text}")
-        except Exception as e:
-            print(f"[Server Sync] Error saving player: {e}")
-
-    def calculate_idle_rewards(self):
-        if not self.last_logout_time:
-            return
-
-        now = datetime.datetime.now(datetime.UTC)
-        elapsed = now - self.last_logout_time
+        """Saves everything now and waits for it, for logout and quit. Normal play goes through self.sync."""
+        self.sync.flush(wait=True)
 
-        max_offline_seconds = 4 * 60 * 60  # 4 hours max
-        offline_seconds = min(elapsed.total_seconds(), max_offline_seconds)
+    def claim_idle_rewards(self):
+        """Collects whatever accrued on the server since the last claim (offline time, time in game, gathering)."""
+        self.sync.post_after_sync("/idle/claim", self._on_idle_claimed, json={"username": self.username})
 
-        reward_xp = int(offline_seconds // 10)  # 1 XP per 10 seconds
-        reward_gold = int(offline_seconds // 5)  # 1 gold per 5 seconds
+    def _on_idle_claimed(self, result):
+        if not result.ok:
+            print(f"[Idle Rewards] Claim failed: {result.describe_error()}")
+            return
+        data = result.json()
+
+        # Already saved on the server, the local copy just catches up
+        self.apply_server_state(data["player"])
+        rewards = data["rewards"]
+        if rewards["experience"] or rewards["gold"] or rewards["gathered"]:
+            self.pending_idle_rewards = {**rewards, "offline_seconds": data["offline_seconds"]}
+
+    def apply_server_state(self, state):
+        """Takes level, experience, stats, coins and dungeon progress the server just saved.
+
+        state has to come from a sync.post_after_sync request, the gains not synced yet are added back on top.
+        """
+        self.level = state["level"]
+        self.experience = state["experience"]
+        self.stats = state["stats"] or self.stats
+        self.coins.update(state["coins"])
+        self.highest_dungeon_completed = state["highest_dungeon_completed"] or 0
+        self.best_dungeon_time_seconds = state["best_dungeon_time_seconds"] or 0
+
+        experience_gained, copper_delta = self.sync.pending()
+        if experience_gained:
+            self._add_experience(experience_gained)
+        if copper_delta:
+            self.coins["copper"] += copper_delta
+            self.coins["copper"] += self.coins["silver"] * 100 + self.coins["gold"] * 10000 \
+                + self.coins["platinum"] * 1000000
+            self.coins["silver"] = self.coins["gold"] = self.coins["platinum"] = 0
+            self.condense_coins()
 
-        if reward_xp > 0 or reward_gold > 0:
-            self.pending_idle_rewards = {
-                "xp": reward_xp,
-                "gold": reward_gold
-            }
+        self.recalculate_stats()
+        self._notify_coin_update()
@@ -0,0 +1,190 @@
+# presence.py
+import datetime
+import heapq
+import threading
+
+from sqlalchemy import text
+
+# One statement per flush no matter how many heartbeats arrived in between.
+# is_online is left alone so a late flush can't bring back someone who just logged out or expired.
+FLUSH_LAST_SEEN_SQL = text("""
+    UPDATE accounts
+    SET last_seen = seen.last_seen
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:seen AS timestamptz[])) AS seen(id, last_seen)
+    WHERE accounts.id = seen.id
+""")
+
+# Skips accounts that came back (and got a newer last_seen) after they expired
+MARK_OFFLINE_SQL = text("""
+    UPDATE accounts
+    SET is_online = false
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:seen AS timestamptz[])) AS gone(id, last_seen)
+    WHERE accounts.id = gone.id AND (accounts.last_seen IS NULL OR accounts.last_seen <= gone.last_seen)
+""")
+
+
+class PresenceTracker:
+    """Who is online, kept in memory. Heartbeats only touch a dict, last_seen reaches the database in bulk.
+
+    Every heartbeat pushes a deadline onto a heap and the expiry thread sleeps until the earliest one, so
+    an account goes offline as soon as its timeout runs out instead of on the next sweep.
+    """
+
+    def __init__(self, engine, timeout, flush_interval=10, on_expire=None):
+        self.engine = engine
+        self.timeout = timeout  # timedelta without a heartbeat before an account counts as offline
+        self.flush_interval = flush_interval
+        self.on_expire = on_expire  # called with (username, last_seen) from the expiry thread
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.online = {}  # username -> {"account_id": UUID, "last_seen": datetime}
+        self.dirty = set()  # usernames whose last_seen hasn't been written yet
+        self.gone = {}  # account_id -> last_seen of expired accounts not yet marked offline in the database
+        self.deadlines = []  # heap of (deadline, username), stale entries are skipped when popped
+
+        self.stopping = False
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self._load_online()
+        for target in (self._flush_loop, self._expiry_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _load_online(self):
+        # Accounts left online by the previous process still need to expire normally
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT username, id, last_seen FROM accounts WHERE is_online = true")
+            ).all()
+
+        now = datetime.datetime.now(datetime.UTC)
+        with self.lock:
+            for username, account_id, last_seen in rows:
+                if last_seen is not None and last_seen.tzinfo is None:
+                    last_seen = last_seen.replace(tzinfo=datetime.UTC)
+                self._set(username, account_id, last_seen or now)
+
+    def close(self):
+        self.stop_event.set()
+        with self.wakeup:
+            self.stopping = True
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(self.flush_interval)
+        self.flush()
+
+    # --- Recording ---
+
+    def _set(self, username, account_id, last_seen):
+        # Caller holds self.lock
+        self.online[username] = {"account_id": account_id, "last_seen": last_seen}
+        self.gone.pop(account_id, None)
+        deadline = last_seen + self.timeout
+        earliest = self.deadlines[0][0] if self.deadlines else None
+        heapq.heappush(self.deadlines, (deadline, username))
+        if earliest is None or deadline < earliest:
+            self.wakeup.notify()
+
+    def touch(self, username):
+        """Records a heartbeat. Returns False when the account isn't known yet and has to be looked up first."""
+        with self.lock:
+            entry = self.online.get(username)
+            if entry is None:
+                return False
+            self._set(username, entry["account_id"], datetime.datetime.now(datetime.UTC))
+            self.dirty.add(username)
+            return True
+
+    def mark_online(self, username, account_id):
+        with self.lock:
+            self._set(username, account_id, datetime.datetime.now(datetime.UTC))
+            self.dirty.add(username)
+
+    def mark_offline(self, username):
+        # Logout/kick already wrote is_online = false themselves
+        with self.lock:
+            self.online.pop(username, None)
+            self.dirty.discard(username)
+
+    # --- Reading ---
+
+    def is_online(self, username):
+        with self.lock:
+            return username in self.online
+
+    def online_usernames(self):
+        with self.lock:
+            return list(self.online)
+
+    # --- Expiry ---
+
+    def _pop_expired(self, now):
+        # Caller holds self.lock
+        expired = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, username = heapq.heappop(self.deadlines)
+            entry = self.online.get(username)
+            # Only the deadline from the latest heartbeat counts
+            if entry is None or entry["last_seen"] + self.timeout != deadline:
+                continue
+            del self.online[username]
+            self.dirty.discard(username)
+            self.gone[entry["account_id"]] = entry["last_seen"]
+            expired.append((username, entry["last_seen"]))
+        return expired
+
+    def _expiry_loop(self):
+        while True:
+            with self.wakeup:
+                while not self.stopping:
+                    now = datetime.datetime.now(datetime.UTC)
+                    if self.deadlines and self.deadlines[0][0] <= now:
+                        break
+                    timeout = (self.deadlines[0][0] - now).total_seconds() if self.deadlines else None
+                    self.wakeup.wait(timeout)
+                if self.stopping:
+                    return
+                expired = self._pop_expired(datetime.datetime.now(datetime.UTC))
+
+            for username, last_seen in expired:
+                if self.on_expire:
+                    try:
+                        self.on_expire(username, last_seen)
+                    except Exception as e:
+                        print(f"[Presence] Expiry handler failed for {username}: {e}")
+
+    # --- Persistence ---
+
+    def flush(self):
+        """Writes pending last_seen values and offline flags, one statement each."""
+        with self.lock:
+            seen = [(str(self.online[name]["account_id"]), self.online[name]["last_seen"]) for name in self.dirty]
+            gone = [(str(account_id), last_seen) for account_id, last_seen in self.gone.items()]
+            self.dirty.clear()
+            self.gone.clear()
+
+        if not seen and not gone:
+            return
+
+        try:
+            with self.engine.begin() as conn:
+                if gone:
+                    conn.execute(MARK_OFFLINE_SQL, {
+                        "ids": [account_id for account_id, _ in gone],
+                        "seen": [last_seen for _, last_seen in gone]
+                    })
+                if seen:
+                    conn.execute(FLUSH_LAST_SEEN_SQL, {
+                        "ids": [account_id for account_id, _ in seen],
+                        "seen": [last_seen for _, last_seen in seen]
+                    })
+        except Exception as e:
+            print(f"[Presence] Failed to flush {len(seen)} heartbeat(s) and {len(gone)} expiry(s): {e}")
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
@@ -1,11 +1,11 @@
 import pygame
 import pygame_gui
-import requests
 from pygame_gui.elements import UIWindow, UIButton, UITextBox, UILabel, UITextEntryLine, UIScrollingContainer
 from pygame_gui.core import UIContainer
 from pygame import Rect
 from settings import *
 from datetime import datetime
+from network import network, PRIORITY_HIGH
 
   # Adjust as needed
 
@@ -116,24 +116,26 @@ class ResolutionPopup(UIWindow):
         if event.type == pygame_gui.UI_BUTTON_PRESSED and event.ui_element == self.submit_button:
             message = self.entry.get_text().strip()
             if message:
-                try:
-                    response = requests.post(f"{SERVER_URL}/report_resolve", json={
-                        "case_id": self.report_id,
-                        "resolution": message
-                    }, timeout=5)
-                    data = response.json()
-                    if data.get("success"):
-                        self.chat_window.log_message(f"[Resolved] {data.get('message')}", "Admin")
-                        # 🆕 Refresh Reports View
-                        if hasattr(self.chat_window, "reports_window") and self.chat_window.reports_window:
-                            self.chat_window.reports_window.remove_report_by_id(self.report_id)
-                    else:
-                        self.chat_window.log_message(f"[Admin] {data.get('error')}", "System")
-                except Exception:
-                    self.chat_window.log_message("[Error] Could not contact server.", "System")
+                network.post("/report_resolve", json={
+                    "case_id": self.report_id,
+                    "resolution": message
+                }, callback=self.chat_window._reply(self.on_resolved), priority=PRIORITY_HIGH)
             self.kill()  # <- This is enough
         return handled
 
+    def on_resolved(self, result):
+        if result.error is not None:
+            self.chat_window.log_message("[Error] Could not contact server.", "System")
+            return
+        data = result.json()
+        if data.get("success"):
+            self.chat_window.log_message(f"[Resolved] {data.get('message')}", "Admin")
+            # 🆕 Refresh Reports View
+            if hasattr(self.chat_window, "reports_window") and self.chat_window.reports_window:
+                self.chat_window.reports_window.remove_report_by_id(self.report_id)
+        else:
+            self.chat_window.log_message(f"[Admin] {data.get('error')}", "System")
+
     def kill(self):
         if hasattr(self.chat_window, "resolution_popup"):
             self.chat_window.resolution_popup = None
@@ -0,0 +1,68 @@
+# roster.py
+import threading
+
+import models
+
+
+class OnlineRoster:
+    """Active character (name, role, muted flag) of every online account, kept up to date by server events."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # username -> {"name": str or None, "role": str, "is_muted": bool}
+
+    def load(self, session_factory, usernames):
+        """Cold start: one join for everyone the presence tracker already considers online."""
+        if not usernames:
+            return
+
+        db = session_factory()
+        try:
+            rows = (
+                db.query(models.Account.username, models.Account.role, models.Player.name, models.Player.is_muted)
+                .outerjoin(
+                    models.Player,
+                    (models.Player.account_id == models.Account.id) & (models.Player.is_active == True)
+                )
+                .filter(models.Account.username.in_(usernames))
+                .all()
+            )
+        finally:
+            db.close()
+
+        with self.lock:
+            for username, role, name, is_muted in rows:
+                self.entries[username] = {"name": name, "role": role or "player", "is_muted": bool(is_muted)}
+
+    # --- Events ---
+
+    def set_character(self, username, role, name=None, is_muted=False):
+        with self.lock:
+            self.entries[username] = {"name": name, "role": role or "player", "is_muted": bool(is_muted)}
+
+    def remove(self, username):
+        with self.lock:
+            self.entries.pop(username, None)
+
+    def set_muted(self, character_name, is_muted):
+        with self.lock:
+            for entry in self.entries.values():
+                if entry["name"] == character_name:
+                    entry["is_muted"] = is_muted
+
+    # --- Reading ---
+
+    def get(self, username):
+        with self.lock:
+            entry = self.entries.get(username)
+            return dict(entry) if entry else None
+
+    def characters(self, usernames, roles=None):
+        """[(username, entry)] for the given accounts, optionally limited to some roles."""
+        with self.lock:
+            result = []
+            for username in usernames:
+                entry = self.entries.get(username)
+                if entry and (roles is None or entry["role"] in roles):
+                    result.append((username, dict(entry)))
+            return result
@@ -1,8 +1,22 @@
+from network import transport
+
+
 class ScreenManager:
     def __init__(self, manager):
         self.current_screen = None
         self.player = None
         self.manager = manager
+        self.auth_token = None
+
+    @property
+    def auth_token(self):
+        return self._auth_token
+
+    @auth_token.setter
+    def auth_token(self, token):
+        # Every request after login carries the token, logging out drops it
+        self._auth_token = token
+        transport.set_auth_token(token)
 
     def force_logout(self, reason="Disconnected"):
         """Cleanly logs the player out and returns to the login screen."""
@@ -11,8 +25,7 @@ class ScreenManager:
         if hasattr(self, "player") and self.player:
             try:
                 self.player.stop_heartbeat()
-                if hasattr(self, "auth_token"):
-                    self.player.save_to_server(self.auth_token)
+                self.player.save_to_server(self.auth_token)
             except Exception as e:
                 print(f"[Logout] Failed to stop/save player: {e}")
             self.player = None
@@ -50,6 +63,11 @@ class BaseScreen:
         self.manager = manager
         self.screen_manager = screen_manager
 
+    @property
+    def is_current(self):
+        # Network callbacks can land after the player already left the screen
+        return self.screen_manager.current_screen is self
+
     def setup(self):
         pass
 
@@ -4,6 +4,7 @@ from pygame import Rect
 from pygame_gui.elements import UIButton, UIPanel, UILabel, UIDropDownMenu
 
 from chat_system import ChatWindow
+from network import network, PRIORITY_LOW
 from settings import *
 from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
@@ -73,50 +74,48 @@ class BattleHomeScreen(BaseScreen):
         self.player.chat_window.panel.set_dimensions((400, 220))
 
     def load_leaderboard(self):
-        import threading
-        import requests
-
-        def fetch_leaderboard():
-            try:
-                response = requests.get(f"{SERVER_URL}/dungeon_leaderboard", params={"player_name": self.player.name})
-
-                if response.status_code == 200:
-                    data = response.json().get("leaders", [])
-                    pygame.time.set_timer(pygame.USEREVENT + 101, 0)  # Stop any previous timer
-
-                    # Clear previous labels
-                    for label in self.leaderboard_labels:
-                        label.kill()
-                    self.leaderboard_labels.clear()
-
-                    for i, entry in enumerate(data):
-                        text = f"{i+1}. {entry['name']} (Lv {entry['level']} {entry['class']}) - Floor {entry['dungeon']} - {entry['time']}s"
-                        label = UILabel(
-                            relative_rect=Rect((10, 40 + i * 22), (420, 20)),
-                            text=text,
-                            manager=self.manager,
-                            container=self.leaderboard_panel,
-                            object_id="#leaderboard_top" if entry["name"] == self.player.name else "#leaderboard_entry"
-                        )
-                        self.leaderboard_labels.append(label)
-
-                    player_rank = response.json().get("player_rank")
-
-                    top_names = [entry["name"] for entry in data]
-                    if player_rank and player_rank["name"] not in top_names:
-                        y_pos = 40 + len(data) * 22 + 10
-                        label = UILabel(
-                            relative_rect=Rect((10, y_pos), (420, 20)),
-                            text=f"Your Rank: #{player_rank['rank']} - {player_rank['name']} (Lv {player_rank['level']} {player_rank['class']}) - Floor {player_rank['dungeon']} {player_rank['time']}s",
-                            manager=self.manager,
-                            container=self.leaderboard_panel,
-                            object_id="#leaderboard_self"
-                        )
-                        self.leaderboard_labels.append(label)
-            except Exception as e:
-                print(f"[Leaderboard] Failed to load: {e}")
-
-        threading.Thread(target=fetch_leaderboard, daemon=True).start()
+        network.get("/dungeon_leaderboard", params={"player_name": self.player.name},
+                    callback=self.on_leaderboard, priority=PRIORITY_LOW)
+
+    def on_leaderboard(self, result):
+        if not self.is_current:
+            return
+        if not result.ok:
+            print(f"[Leaderboard] Failed to load: {result.describe_error()}")
+            return
+
+        data = result.json().get("leaders", [])
+        pygame.time.set_timer(pygame.USEREVENT + 101, 0)  # Stop any previous timer
+
+        # Clear previous labels
+        for label in self.leaderboard_labels:
+            label.kill()
+        self.leaderboard_labels.clear()
+
+        for i, entry in enumerate(data):
+            text = f"{i+1}. {entry['name']} (Lv {entry['level']} {entry['class']}) - Floor {entry['dungeon']} - {entry['time']}s"
+            label = UILabel(
+                relative_rect=Rect((10, 40 + i * 22), (420, 20)),
+                text=text,
+                manager=self.manager,
+                container=self.leaderboard_panel,
+                object_id="#leaderboard_top" if entry["name"] == self.player.name else "#leaderboard_entry"
+            )
+            self.leaderboard_labels.append(label)
+
+        player_rank = result.json().get("player_rank")
+
+        top_names = [entry["name"] for entry in data]
+        if player_rank and player_rank["name"] not in top_names:
+            y_pos = 40 + len(data) * 22 + 10
+            label = UILabel(
+                relative_rect=Rect((10, y_pos), (420, 20)),
+                text=f"Your Rank: #{player_rank['rank']} - {player_rank['name']} (Lv {player_rank['level']} {player_rank['class']}) - Floor {player_rank['dungeon']} {player_rank['time']}s",
+                manager=self.manager,
+                container=self.leaderboard_panel,
+                object_id="#leaderboard_self"
+            )
+            self.leaderboard_labels.append(label)
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
@@ -144,36 +143,30 @@ class BattleHomeScreen(BaseScreen):
             self.player.chat_window.process_event(event)
 
     def load_dungeon_stats(self):
-        import threading
-        import requests
-
-        def fetch_stats():
-            try:
-                response = requests.get(f"{SERVER_URL}/player_stats?requester_name={self.player.name}")
-                if response.status_code == 200:
-                    data = response.json()
-                    highest = data.get("highest_dungeon_completed", 0)
-                    best_time = data.get("best_dungeon_time_seconds", 0)
-                    self.player.highest_dungeon_completed = highest
-                    self.player.best_dungeon_time_seconds = best_time
-
-                    self.dungeon_levels = [str(i) for i in range(1, self.player.highest_dungeon_completed + 2)][::-1]
-                    self.selected_dungeon_level = self.dungeon_levels[0]
-                    self.dungeon_dropdown.kill()  # Remove old dropdown
-                    self.dungeon_dropdown = UIDropDownMenu(
-                        options_list=self.dungeon_levels,
-                        starting_option=self.selected_dungeon_level,
-                        relative_rect=Rect((310, 160), (100, 40)),
-                        manager=self.manager
-                    )
-                else:
-                    self.dungeon_label.set_text("Failed to load stats")
-            except Exception as e:
-                self.dungeon_label.set_text("Error loading stats")
-
-
-
-        threading.Thread(target=fetch_stats, daemon=True).start()
+        network.get("/player_stats", params={"requester_name": self.player.name}, callback=self.on_dungeon_stats)
+
+    def on_dungeon_stats(self, result):
+        if not self.is_current:
+            return
+        if not result.ok:
+            self.dungeon_label.set_text("Error loading stats" if result.error else "Failed to load stats")
+            return
+
+        data = result.json()
+        highest = data.get("highest_dungeon_completed", 0)
+        best_time = data.get("best_dungeon_time_seconds", 0)
+        self.player.highest_dungeon_completed = highest
+        self.player.best_dungeon_time_seconds = best_time
+
+        self.dungeon_levels = [str(i) for i in range(1, self.player.highest_dungeon_completed + 2)][::-1]
+        self.selected_dungeon_level = self.dungeon_levels[0]
+        self.dungeon_dropdown.kill()  # Remove old dropdown
+        self.dungeon_dropdown = UIDropDownMenu(
+            options_list=self.dungeon_levels,
+            starting_option=self.selected_dungeon_level,
+            relative_rect=Rect((310, 160), (100, 40)),
+            manager=self.manager
+        )
 
     def update(self, time_delta):
         self.manager.update(time_delta)
@@ -4,9 +4,8 @@ from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
 import pygame
 import pygame_gui
-import requests
 
-from settings import SERVER_URL  # or wherever your server runs
+from network import network, PRIORITY_HIGH
 
 
 class CharacterCreationScreen(BaseScreen):
@@ -86,8 +85,6 @@ class CharacterCreationScreen(BaseScreen):
             self.message_label.set_text("Please enter a name.")
             return
 
-        headers = {"Authorization": f"Bearer {self.screen_manager.auth_token}"}
-
         new_character_data = {
             "name": name,
             "char_class": char_class,
@@ -122,25 +119,27 @@ class CharacterCreationScreen(BaseScreen):
 
         }
 
-        try:
-            response = requests.post(
-                f"{SERVER_URL}/player/{self.screen_manager.current_account}",
-                json=new_character_data,
-                headers=headers
-            )
-
-            if response.status_code == 200:
-                print("✅ Character created successfully!")
-                char_select_class = ScreenRegistry.get("character_select")
-                if char_select_class:
-                    self.screen_manager.set_screen(char_select_class(self.manager, self.screen_manager))
-            else:
-                print(f"❌ Character creation failed: {response.text}")
-                self.message_label.set_text("Character creation failed.")
+        network.post(
+            f"/player/{self.screen_manager.current_account}",
+            json=new_character_data,
+            callback=self.on_character_created,
+            priority=PRIORITY_HIGH
+        )
 
-        except Exception as e:
-            print(f"❌ Connection error: {e}")
+    def on_character_created(self, result):
+        if not self.is_current:
+            return
+        if result.error is not None:
+            print(f"❌ Connection error: {result.error}")
             self.message_label.set_text("Connection error.")
+        elif result.status_code == 200:
+            print("✅ Character created successfully!")
+            char_select_class = ScreenRegistry.get("character_select")
+            if char_select_class:
+                self.screen_manager.set_screen(char_select_class(self.manager, self.screen_manager))
+        else:
+            print(f"❌ Character creation failed: {result.response.text}")
+            self.message_label.set_text("Character creation failed.")
 
     def update(self, time_delta):
         self.manager.update(time_delta)
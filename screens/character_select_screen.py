@@ -4,10 +4,13 @@ from player_registry import register_player
 from screen_manager import *
 import pygame
 import pygame_gui
-import requests
+from network import network, PRIORITY_HIGH
 from screen_registry import ScreenRegistry
 
-from settings import SERVER_URL  # or wherever your server runs
+
+def log_logout_failure(result):
+    if not result.ok:
+        print(f"[Logout] Failed to notify server: {result.describe_error()}")
 
 
 class ConfirmDeletePopup:
@@ -157,71 +160,62 @@ class CharacterSelectScreen(BaseScreen):
         self.logout_button.kill()
 
     def load_character_from_server(self):
-        headers = {"Authorization": f"Bearer {self.screen_manager.auth_token}"}
-
-        try:
-            response = requests.get(
-                f"{SERVER_URL}/player/{self.screen_manager.current_account}",
-                headers=headers
-            )
-
-            if response.status_code == 200:
-                # self.character_data = response.json()
-
-                if response.status_code == 200:
-                    data = response.json()
-                    self.character_data = data
-
-                    character_list_items = []
-                    for char in self.character_data:
-                        formatted_name = f"{char['name']}, the level {char['level']} {char['char_class']}"
-                        character_list_items.append(formatted_name)
+        network.get(f"/player/{self.screen_manager.current_account}",
+                    callback=self.on_characters, priority=PRIORITY_HIGH)
 
-                    self.character_list.set_item_list(character_list_items)
-
-                else:
-                    print(f"❌ Failed to load characters: {response.text}")
-
-        except Exception as e:
-            print(f"❌ Failed to load character info: {e}")
+    def on_characters(self, result):
+        if not self.is_current:
+            return
+        if result.error is not None:
+            print(f"❌ Failed to load character info: {result.error}")
             self.character_list.set_item_list([])
             self.message_label.set_text("Connection error.")
+            return
+        if result.status_code != 200:
+            print(f"❌ Failed to load characters: {result.response.text}")
+            return
 
-    def delete_character(self, name):
-        headers = {"Authorization": f"Bearer {self.screen_manager.auth_token}"}
+        self.character_data = result.json(default=[])
+
+        character_list_items = []
+        for char in self.character_data:
+            formatted_name = f"{char['name']}, the level {char['level']} {char['char_class']}"
+            character_list_items.append(formatted_name)
 
-        try:
-            response = requests.delete(
-                f"{SERVER_URL}/player/{self.screen_manager.current_account}",
-                headers=headers
-            )
+        self.character_list.set_item_list(character_list_items)
 
-            if response.status_code == 200:
+    def delete_character(self, name):
+        def on_deleted(result):
+            if not self.is_current:
+                return
+            if result.error is not None:
+                print(f"❌ Connection error during deletion: {result.error}")
+                self.message_label.set_text("Connection error.")
+            elif result.status_code == 200:
                 print("✅ Character deleted successfully.")
                 self.character_list.set_item_list([])
                 self.message_label.set_text(f"Character '{name}' deleted.")
 
                 self.load_character_from_server()
             else:
-                print(f"❌ Failed to delete character: {response.text}")
+                print(f"❌ Failed to delete character: {result.response.text}")
                 self.message_label.set_text("Failed to delete character.")
 
-        except Exception as e:
-            print(f"❌ Connection error during deletion: {e}")
-            self.message_label.set_text("Connection error.")
+        network.delete(f"/player/{self.screen_manager.current_account}",
+                       callback=on_deleted, priority=PRIORITY_HIGH)
 
     def confirm_delete(self, name):
         self.confirm_popup = None
         self.delete_character(name)
 
     def confirm_delete_account(self):
-        headers = {"Authorization": f"Bearer {self.screen_manager.auth_token}"}
-        try:
-            response = requests.delete(
-                f"{SERVER_URL}/account/{self.screen_manager.current_account}",
-                headers=headers
-            )
-            if response.status_code == 200:
+        def on_deleted(result):
+            if not self.is_current:
+                return
+            if result.error is not None:
+                print(f"❌ Connection error during account deletion: {result.error}")
+                self.message_label.set_text("Connection error.")
+            elif result.status_code == 200:
                 print("✅ Account deleted successfully.")
 
                 # Go back to login screen
@@ -229,12 +223,24 @@ class CharacterSelectScreen(BaseScreen):
                 if login_screen_class:
                     self.screen_manager.set_screen(login_screen_class(self.manager, self.screen_manager))
             else:
-                print(f"❌ Failed to delete account: {response.text}")
+                print(f"❌ Failed to delete account: {result.response.text}")
                 self.message_label.set_text("Failed to delete account.")
 
-        except Exception as e:
-            print(f"❌ Connection error during account deletion: {e}")
-            self.message_label.set_text("Connection error.")
+        network.delete(f"/account/{self.screen_manager.current_account}",
+                       callback=on_deleted, priority=PRIORITY_HIGH)
+
+    def enter_game(self, result=None):
+        if result is not None:
+            if result.error is not None:
+                print(f"❌ Error setting active character: {result.error}")
+            elif result.status_code != 200:
+                print(f"⚠️ Failed to set active character: {result.response.text}")
+        if not self.is_current:
+            return
+
+        main_game_screen_class = ScreenRegistry.get("main_game")
+        if main_game_screen_class:
+            self.screen_manager.set_screen(main_game_screen_class(self.manager, self.screen_manager))
 
     def cancel_delete(self):
         self.confirm_popup = None
@@ -262,21 +268,18 @@ class CharacterSelectScreen(BaseScreen):
                             self.screen_manager.player.refresh_stats_and_level()
                             self.screen_manager.player.recalculate_stats()
                             self.screen_manager.player.auth_token = self.screen_manager.auth_token
-                            try:
-                                response = requests.post(
-                                    f"{SERVER_URL}/set_active_character",
-                                    json={"username": self.screen_manager.current_account,
-                                          "character_name": selected_name}
-                                )
-                                if response.status_code != 200:
-                                    print(f"⚠️ Failed to set active character: {response.text}")
-                            except Exception as e:
-                                print(f"❌ Error setting active character: {e}")
+                            # ✅ Enter the game once the server has switched characters, so the idle claim
+                            # on the main screen settles this character and not the previous one
+                            network.post(
+                                "/set_active_character",
+                                json={"username": self.screen_manager.current_account,
+                                      "character_name": selected_name},
+                                callback=self.enter_game,
+                                priority=PRIORITY_HIGH
+                            )
                             break
-
-                    main_game_screen_class = ScreenRegistry.get("main_game")
-                    if main_game_screen_class:
-                        self.screen_manager.set_screen(main_game_screen_class(self.manager, self.screen_manager))
+                    else:
+                        self.enter_game()
 #Delete Character
             elif event.ui_element == self.delete_character_button:
                 selected_name = self.character_list.get_single_selection()
@@ -299,14 +302,12 @@ class CharacterSelectScreen(BaseScreen):
             elif event.ui_element == self.logout_button:
                 login_screen_class = ScreenRegistry.get("login")
                 if login_screen_class:
-                    try:
-                        requests.post(
-                            f"{SERVER_URL}/logout",
-                            json={"username": self.screen_manager.current_account},
-                            timeout=3
-                        )
-                    except Exception as e:
-                        print(f"[Logout] Failed to notify server: {e}")
+                    network.post(
+                        "/logout",
+                        json={"username": self.screen_manager.current_account},
+                        callback=log_logout_failure,
+                        priority=PRIORITY_HIGH
+                    )
                     self.screen_manager.auth_token = None
                     self.screen_manager.current_account = None
                     self.screen_manager.set_screen(login_screen_class(self.manager, self.screen_manager))
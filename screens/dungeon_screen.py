@@ -1,24 +1,16 @@
-import time
 import random
 import pygame
 import pygame_gui
-import requests
 from pygame import Rect
 from pygame_gui.elements import UILabel, UIButton, UITextBox
 
-from enemies import ENEMY_TIERS, NAME_PREFIXES, ELITE_AURA_COLORS
+from combat import DUNGEON_ENEMY_COUNT
+from network import PRIORITY_HIGH
 from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
 from chat_system import ChatWindow
 from settings import *
 
-FIRST_TIME_RARITY_TIERS = {
-    "Rare": 75,
-    "Epic": 10,
-    "Legendary": 10,
-    "Mythical": 5
-}
-
 class DungeonScreen(BaseScreen):
     def __init__(self, manager, screen_manager, drop_down_level=None):
         super().__init__(manager, screen_manager)
@@ -31,28 +23,20 @@ class DungeonScreen(BaseScreen):
         else:
             self.level = self.player.highest_dungeon_completed + 1
 
-        self.battle_running = True
-        self.player_attack_timer = 0
-        self.enemy_attack_timer = 0
         self.dungeon_complete = False
 
-        self.pending_enemy_spawn = False
-        self.enemy_spawn_timer = 0.0
-        self.enemy_spawn_delay = 1.0  # 1 second delay
-
-        self.player_hp = self.player.total_stats.get("Health", 100)
-        self.player_attack_speed = self.player.total_stats.get("Attack Speed", 1.0)
-        self.player_attack_delay = max(0.2, 1.0 / self.player_attack_speed)
-
-        # Dungeon state
-        self.current_enemy_index = 0
-        self.enemies = []
-        self.boss = None
-        self.current_enemy = None
-        self.run_active = True
+        # Dungeon state, the server resolves the whole run and the screen replays its event log
+        self.run = None
+        self.fights = []
+        self.fight_index = -1
+        self.event_index = 0
+        self.clock = 0.0
+        self.current_enemy = {"name": "", "hp": 0, "max_hp": 1}
+        self.player_max_hp = max(1, self.player.total_stats.get("Health", 100))
+        self.player_hp = self.player_max_hp
+        self.run_active = False
 
         # Run tracking
-        self.start_time = time.time()
         self.damage_dealt = 0
         self.damage_taken = 0
 
@@ -110,49 +94,29 @@ class DungeonScreen(BaseScreen):
         self.enemy_hp_rect = pygame.Rect(420, 108, 200, 20)
         self.player_hp_rect = pygame.Rect(420, 210, 200, 20)
 
-        self.load_enemies()
-
-        # Set up current enemy
-        self.set_next_enemy()
-
-        self.update_hp_display()
+        self.start_dungeon_run(self.level)
 
     def set_level(self, level):
         self.level = int(level)
 
     def start_dungeon_run(self, level: int):
         self.level = level
-        self.current_enemy_index = 0
-        self.enemies = []
-        self.boss = None
-        self.current_enemy = None
-        self.run_active = True
+        self.run_active = False
         self.dungeon_complete = False
+        self.fight_index = -1
+        self.event_index = 0
+        self.clock = 0.0
 
         self.damage_dealt = 0
         self.damage_taken = 0
-        self.start_time = time.time()
 
         self.battle_log = []
         self.log_box.set_text("")
 
-
-        # Generate first enemy (not boss)
-        self.load_enemies()
-
-        # Set up current enemy
-        self.set_next_enemy()
-
-
+        self.add_log(f"Entering Dungeon Level {level}...")
+        self.load_run()
         self.update_hp_display()
 
-        self.add_log(f"<b><font color='#aaaaff'>Dungeon Level {level} begins!</font></b>")
-
-        # Reset timers
-        self.player_attack_timer = 0
-        self.enemy_attack_timer = 0
-        self.battle_running = True
-
         self.level_label.set_text(f"Dungeon Level {self.level}")
 
         # Hide continue button if it's visible
@@ -164,275 +128,145 @@ class DungeonScreen(BaseScreen):
         self.battle_log = self.battle_log[-15:]  # Limit to last 15 messages
         self.log_box.set_text("<br>".join(self.battle_log))
 
-    def load_enemies(self):
-        tier = self.find_tier(self.level)
-        self.enemies = [self.generate_enemy(tier) for _ in range(10)]
-        self.boss = self.generate_enemy(tier, is_boss=True)
-
-    def find_tier(self, level):
-        for t in reversed(ENEMY_TIERS):
-            if int(level) >= t["min_level"]:
-                return t
-        return ENEMY_TIERS[0]
-
-    def generate_enemy(self, tier, is_boss=False):
-        name = f"{random.choice(NAME_PREFIXES)} {tier['name']} Lv{self.level}"
-        hp = int(tier["base_hp"] + int(self.level) * 7)
-        dmg = int(tier["base_dmg"] + self.level * 2)
-        if is_boss:
-            hp = int(hp * 2)
-            dmg = int(dmg * 1.8)
-            name = f"BOSS: {name}"
-
-        return {
-            "name": name,
-            "hp": hp,
-            "max_hp": hp,
-            "damage": dmg,
-            "is_boss": is_boss
+    def load_run(self):
+        """Asks the server to fight the whole level, on_run starts the replay once it answers."""
+        payload = {
+            "username": self.player.username,
+            "level": self.level,
+            "seed": random.getrandbits(32)
         }
+        self.player.sync.post_after_sync("/dungeon/run", lambda result, level=self.level: self.on_run(result, level),
+                                         json=payload, priority=PRIORITY_HIGH)
 
-    def set_next_enemy(self):
-        self.battle_log = []
-        if self.current_enemy_index < 10:
-            self.current_enemy = self.enemies[self.current_enemy_index]
-            self.current_enemy_index += 1
-            self.progress_label.set_text(f"Enemy {self.current_enemy_index} of 10")
-        else:
-            self.current_enemy = self.boss
-            self.progress_label.set_text("Final Boss")
-
+    def on_run(self, result, level):
+        succeeded = result.ok and result.json().get("success")
+        if succeeded:
+            # The server saved the rewards already, the local copy catches up now even if the replay isn't watched
+            self.player.apply_server_state(result.json()["player"])
 
-        self.enemy_attack_speed = self.current_enemy.get("speed", 1.0)
-        self.enemy_attack_delay = max(0.2, 1.0 / self.enemy_attack_speed)
-        self.battle_running = True
-        self.player_hp = self.player.total_stats.get("Health", 100)
-        self.player_attack_timer = 0
-        self.enemy_attack_timer = 0
-        self.add_log(f"You engage {self.current_enemy['name']}!")
-        self.update_hp_display()
-
-    def player_attack(self):
-        if not self.battle_running:
+        # Ignore answers for a screen or a level the player already left
+        if not self.is_current or level != self.level or self.run_active:
+            return
+        if not succeeded:
+            self.add_log(f"[Error] {result.describe_error('Could not start the dungeon')}")
             return
 
-        primary_weapon = self.player.equipment.get("primary")
-        if primary_weapon:
-            min_dmg = primary_weapon["stats"].get("Min Damage", 1)
-            max_dmg = primary_weapon["stats"].get("Max Damage", 5)
-            base_primary_dmg = random.randint(min_dmg, max_dmg)
-        else:
-            base_primary_dmg = 2  # default fallback
-
-        secondary_weapon = self.player.equipment.get("secondary")
-        if secondary_weapon:
-            min_dmg = secondary_weapon["stats"].get("Min Damage", 1)
-            max_dmg = secondary_weapon["stats"].get("Max Damage", 5)
-            base_secondary_dmg = random.randint(min_dmg, max_dmg)
-        else:
-            base_secondary_dmg = 2  # default fallback
-
-        bonus = self.player.total_stats.get("Bonus Damage", 0)
-
-        self.player_damage = base_primary_dmg + base_secondary_dmg + bonus
+        self.run = result.json()
+        self.fights = self.run["fights"]
+        self.player_max_hp = max(1, self.run.get("max_health", self.player_max_hp))
 
-        dmg = self.player_damage
+        self.run_active = True
+        self.set_next_enemy()
+        self.add_log(f"<b><font color='#aaaaff'>Dungeon Level {self.level} begins!</font></b>")
 
-        # 🎯 Get crit stats
-        crit_chance = self.player.total_stats.get("Critical Chance", 0)
-        crit_damage = self.player.total_stats.get("Critical Damage", 0)
+    def set_next_enemy(self):
+        self.battle_log = []
+        self.fight_index += 1
+        self.event_index = 0
+        fight = self.fights[self.fight_index]
 
-        # 🎲 Roll for crit
-        is_crit = random.random() < (crit_chance / 100)
-        if is_crit:
-            dmg = int(dmg * (1 + crit_damage / 100))
-            self.add_log(f"<font color='#ffcc00'>CRIT!</font> You hit {self.current_enemy['name']} for {dmg} damage!")
+        if fight["enemy"].get("is_boss"):
+            self.progress_label.set_text("Final Boss")
         else:
-            self.add_log(f"You hit {self.current_enemy['name']} for {dmg} damage.")
-
-        self.current_enemy["hp"] -= dmg
-        self.damage_dealt += dmg
+            self.progress_label.set_text(f"Enemy {self.fight_index + 1} of {DUNGEON_ENEMY_COUNT}")
 
-        if self.current_enemy["hp"] <= 0:
-            self.current_enemy["hp"] = 0
-            self.battle_running = False
-            self.add_log(f"{self.current_enemy['name']} is defeated!")
-
-            if self.current_enemy.get("is_boss"):
-                self.complete_dungeon()
-            else:
-            # Automatically start new battle
-                self.pending_enemy_spawn = True
-                self.enemy_spawn_timer = 0.0
+        # Player health resets for every enemy
+        self.current_enemy = dict(fight["enemy"])
+        self.player_hp = self.player_max_hp
+        self.add_log(f"You engage {self.current_enemy['name']}!")
         self.update_hp_display()
 
-    def enemy_attack(self):
-        if not self.battle_running:
-            return
+    def replay_events(self):
+        """Shows every event of the current fight the clock has reached."""
+        fight = self.fights[self.fight_index]
+        events = fight["events"]
+        shown = False
+        while self.run_active and self.event_index < len(events) \
+                and fight["start"] + events[self.event_index]["at"] <= self.clock:
+            event = events[self.event_index]
+            self.event_index += 1
+            if event["type"] == "player_hit":
+                self.current_enemy["hp"] = max(0, self.current_enemy["hp"] - event["damage"])
+            elif event["type"] == "enemy_hit":
+                self.player_hp = max(0, self.player_hp - event["damage"])
+            self.show_combat_event(event)
+            shown = True
+        return shown
+
+    def show_combat_event(self, event):
+        kind = event["type"]
+        name = self.current_enemy["name"]
+
+        if kind == "player_hit":
+            self.damage_dealt += event["damage"]
+            if event["crit"]:
+                self.add_log(f"<font color='#ffcc00'>CRIT!</font> You hit {name} for {event['damage']} damage!")
+            else:
+                self.add_log(f"You hit {name} for {event['damage']} damage.")
 
-        base_dmg = self.current_enemy["damage"]
-        crit_chance = self.current_enemy.get("crit_chance", 0)
-        crit_damage = self.current_enemy.get("crit_damage", 0)
+        elif kind == "enemy_defeated":
+            self.add_log(f"{name} is defeated!")
 
-        dodge_chance = self.player.total_stats.get("Dodge", 0)
-        avoid_chance = self.player.total_stats.get("Avoidance", 0)
-        block_chance = self.player.total_stats.get("Block", 0)
-        armor = self.player.total_stats.get("Armor", 0)
+            if self.current_enemy.get("is_boss"):
+                self.complete_dungeon()
 
-        # Dodge
-        if random.random() < (dodge_chance / 100):
+        elif kind == "dodged":
             self.add_log(f"<font color='#00ffff'>You dodged the attack!</font>")
-            return
 
-        # Avoidance
-        if random.random() < (avoid_chance / 100):
+        elif kind == "avoided":
             self.add_log(f"<font color='#00ffff'>You avoided the attack!</font>")
-            return
-
-        # Crit
-        is_crit = random.random() < (crit_chance / 100)
-        dmg = base_dmg
-        if is_crit:
-            dmg = int(dmg * (1 + crit_damage / 100))
-
-        # Block
-        if random.random() < (block_chance / 100):
-            dmg = int(dmg * 0.5)
-            self.add_log(f"<font color='#aaaaff'>You blocked the attack!</font> Damage reduced.")
-
-        # Armor application (after all multipliers)
-        dmg_after_armor = max(0, dmg - armor)
 
-        if dmg_after_armor <= 0:
-            self.add_log(f"<font color='#cccccc'>Your armor absorbed all damage!</font>")
-        else:
-            if is_crit:
-                self.add_log(
-                    f"<font color='#ff3333'>CRITICAL!</font> {self.current_enemy['name']} hits you for {dmg_after_armor} after armor.")
+        elif kind == "enemy_hit":
+            self.damage_taken += event["damage"]
+            if event["blocked"]:
+                self.add_log(f"<font color='#aaaaff'>You blocked the attack!</font> Damage reduced.")
+            if event["damage"] <= 0:
+                self.add_log(f"<font color='#cccccc'>Your armor absorbed all damage!</font>")
+            elif event["crit"]:
+                self.add_log(f"<font color='#ff3333'>CRITICAL!</font> {name} hits you for {event['damage']} after armor.")
             else:
-                self.add_log(f"{self.current_enemy['name']} hits you for {dmg_after_armor} after armor.")
-
-        self.player_hp -= dmg_after_armor
-        self.damage_taken += dmg_after_armor
+                self.add_log(f"{name} hits you for {event['damage']} after armor.")
 
-        if self.player_hp <= 0:
-            self.player_hp = 0
+        elif kind == "player_defeated":
             self.add_log("<font color='#ff4444'>You were slain in the dungeon!</font>")
-            self.battle_running = False
+            self.run_active = False
             from screens.battle_home_screen import BattleHomeScreen
             self.screen_manager.set_screen(BattleHomeScreen(self.manager, self.screen_manager))
 
     def update_hp_display(self):
         self.enemy_hp_label.set_text(f"HP: {self.current_enemy['hp']} / {self.current_enemy['max_hp']}")
-        self.player_hp_label.set_text(f"HP: {max(0, self.player_hp)} / {self.player.total_stats.get('Health', 100)}")
+        self.player_hp_label.set_text(f"HP: {max(0, self.player_hp)} / {self.player_max_hp}")
         self.enemy_hp_pct = max(0, self.current_enemy["hp"] / self.current_enemy["max_hp"])
-        self.player_hp_pct = max(0, self.player_hp / self.player.total_stats.get("Health", 100))
+        self.player_hp_pct = max(0, self.player_hp / self.player_max_hp)
 
     def update_enemy_labels(self):
         self.enemy_name_label.set_text(self.current_enemy['name'])
 
     def complete_dungeon(self):
-        duration = int(time.time() - self.start_time)
+        self.run_active = False
+        run = self.run["run"]
+        duration = int(round(run["seconds"]))
         minutes = duration // 60
         seconds = duration % 60
 
-        self.apply_dungeon_rewards()
+        self.show_dungeon_rewards()
 
         self.add_log(f"<font color='#00ff00'>Dungeon Level {self.level} completed!</font>")
         self.add_log(
             f"Time: {minutes}m {seconds}s | Damage Dealt: {self.damage_dealt} | Damage Taken: {self.damage_taken}")
 
-        payload = {
-            "username": self.player.username,
-            "level_completed": self.level,
-            "time_seconds": duration
-        }
-        try:
-            requests.post(f"{SERVER_URL}/dungeon_complete", json=payload)
-        except Exception as e:
-            self.add_log(f"[Error] Could not report dungeon completion: {e}")
-
-        self.player.highest_dungeon_completed = max(self.player.highest_dungeon_completed, self.level)
-        self.player.best_dungeon_time_seconds = min(self.player.best_dungeon_time_seconds, duration)
-
         self.dungeon_complete = True
         self.continue_button.show()
 
-    def apply_dungeon_rewards(self):
-        base_xp = 100 + self.level * 20
-        base_copper = 250 + self.level * 25
-
-        # Give more on first-time completion
-        first_time = self.level > self.player.highest_dungeon_completed
-        xp_reward = int(base_xp * (2.0 if first_time else 1.0))
-        copper_reward = int(base_copper * (2.0 if first_time else 1.0))
-
-        self.player.gain_experience(xp_reward)
-        self.player.add_coins(copper_amount=copper_reward)
+    def show_dungeon_rewards(self):
+        # Display only, on_run already applied them
+        rewards = self.run["rewards"]
+        xp_reward, copper_reward = rewards["experience"], rewards["copper"]
         self.add_log(f"<b>Dungeon Complete!</b><br>You earned {xp_reward} XP and {copper_reward} copper!")
         self.player.chat_window.log_message(f"Dungeon Complete!\nYou earned {xp_reward} XP and {copper_reward} copper!", "System")
 
-        # 📦 Guaranteed item drop + better drop on first clear
-        drop_chance = 1 if first_time else 0.25
-        if random.random() < drop_chance:
-            self.grant_dungeon_loot(first_time)
-
-    def grant_dungeon_loot(self, first_time=False):
-        rarity = self.pick_rarity(first_time)
-        random_slot = random.choice([
-            "head", "shoulders", "chest", "gloves", "legs", "boots",
-            "primary", "secondary", "amulet", "ring", "bracelet", "belt"
-        ])
-        char_class = self.player.char_class
-        weapon_type = None
-        if random_slot == "primary":
-            weapon_type = random.choice(CLASS_PRIMARIES.get(char_class, []))
-        elif random_slot == "secondary":
-            weapon_type = random.choice(CLASS_SECONDARIES.get(char_class, []))
-        payload = {
-            "slot_type": random_slot,
-            "char_class": char_class,
-            "weapon_type": weapon_type,
-            "rarity": rarity,
-            "item_level": self.level,
-            "target": self.player.name
-        }
-        if weapon_type:
-            payload["weapon_type"] = weapon_type
-        try:
-            response = requests.post(f"{SERVER_URL}/createitem", json=payload)
-            result = response.json()
-            if result.get("success"):
-                self.add_log(result["message"])
-                # Optionally show the item popup if you also want to show what was dropped
-                # You could refetch inventory and search for newest item to show
-                # self.show_item_drop_popup(result["item"])
-            else:
-                self.add_log(f"[Loot Error] {result.get('error', 'Unknown error')}")
-        except Exception as e:
-            self.add_log(f"[Loot Error] {str(e)}")
-
-    def pick_rarity(self, rng=None, rarity_override=None, first_time=False):
-        if first_time:
-            if rarity_override:
-                return rarity_override
-            rng = rng or random.random()
-            threshold = 0
-            for rarity, chance in FIRST_TIME_RARITY_TIERS.items():
-                threshold += chance / 100
-                if rng < threshold:
-                    return rarity
-            return "Rare"  # fallback
-        else:
-            if rarity_override:
-                return rarity_override
-            rng = rng or random.random()
-            threshold = 0
-            for rarity, chance in RARITY_TIERS.items():
-                threshold += chance / 100
-                if rng < threshold:
-                    return rarity
-            return "Common"  # fallback
+        if rewards["item"]:
+            self.add_log(f"{rewards['item']['name']} added to {self.player.name}'s inventory.")
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
@@ -446,24 +280,13 @@ class DungeonScreen(BaseScreen):
             self.player.chat_window.process_event(event)
 
     def update(self, time_delta):
-        if self.battle_running:
-            self.player_attack_timer += time_delta
-            self.enemy_attack_timer += time_delta
-
-            if self.player_attack_timer >= self.player_attack_delay:
-                self.player_attack_timer = 0
-                self.player_attack()
-
-            if self.enemy_attack_timer >= self.enemy_attack_delay:
-                self.enemy_attack_timer = 0
-                self.enemy_attack()
-
-        if self.pending_enemy_spawn:
-            self.enemy_spawn_timer += time_delta
-            if self.enemy_spawn_timer >= self.enemy_spawn_delay:
+        if self.run_active:
+            self.clock += time_delta
+            next_fight = self.fight_index + 1
+            if next_fight < len(self.fights) and self.fights[next_fight]["start"] <= self.clock:
                 self.set_next_enemy()
-                self.pending_enemy_spawn = False
-
+            if self.replay_events() and self.player_hp > 0:
+                self.update_hp_display()
 
         self.manager.update(time_delta)
         if self.player.chat_window:
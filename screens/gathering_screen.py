@@ -2,13 +2,12 @@ import pygame
 import pygame_gui
 from pygame import Rect
 from pygame_gui.elements import UIButton, UILabel, UIPanel
-import requests
 import datetime
 
 from chat_system import ChatWindow
 from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
-from settings import SERVER_URL
+from network import network, PRIORITY_HIGH
 
 
 class GatheringScreen(BaseScreen):
@@ -23,6 +22,7 @@ class GatheringScreen(BaseScreen):
         self.level_labels = []
         self.buttons = []
         self.status_panel = None
+        self.shown_update = None
 
         self.setup_ui()
         self.refresh_status()
@@ -97,96 +97,91 @@ class GatheringScreen(BaseScreen):
 
 
     def refresh_status(self):
-        import threading, requests
-
-        def fetch():
-            try:
-                response = requests.get(f"{SERVER_URL}/gather/state", params={"player_name": self.player.name})
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success"):
-                        status_text = data.get("status", "")
-                        self.status_label.set_text(status_text)
-
-                        is_gathering = "Currently" in status_text
-                        self.collect_button.show() if is_gathering else self.collect_button.hide()
-                        self.collect_button.enable() if is_gathering else self.collect_button.disable()
-
-                        print(status_text)
-            except Exception as e:
-                print("[Gathering] Failed to fetch state:", e)
-        threading.Thread(target=fetch, daemon=True).start()
+        # Skills, activity and progress in one go, after that the server pushes GatheringUpdates (see update)
+        network.get("/gather/summary", params={"player_name": self.player.name}, callback=self.on_summary)
+
+    def on_summary(self, result):
+        if not self.is_current:
+            return
+        if not result.ok:
+            print("[Gathering] Failed to fetch summary:", result.describe_error())
+            return
+        data = result.json()
+        if not data.get("success"):
+            return
+
+        for activity, skill in data.get("skills", {}).items():
+            setattr(self.player, f"{activity}_level", skill["level"])
+        self.refresh_level_labels()
+        self.player.gathering_update = data.get("pending")
+        self.show_progress(self.player.gathering_update)
+
+    def show_progress(self, pending):
+        self.shown_update = pending
+        is_gathering = pending is not None
+        if is_gathering:
+            self.status_label.set_text(
+                f"{pending['activity'].title()} (Lv {pending['level']}): {pending['items']} item(s) so far")
+        else:
+            self.status_label.set_text("Not currently gathering")
+
+        self.collect_button.show() if is_gathering else self.collect_button.hide()
+        self.collect_button.enable() if is_gathering else self.collect_button.disable()
+
+    def refresh_level_labels(self):
+        for lbl, activity in zip(self.level_labels, ("woodcutting", "mining", "farming", "scavenging")):
+            lbl.set_text(f"{activity.title()} Level: {getattr(self.player, f'{activity}_level')}")
 
     def fetch_status(self):
-        def worker():
-            try:
-                response = requests.post(
-                    f"{SERVER_URL}/gather/status",
-                    json={"player_name": self.player.name, "stop": False},
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    status = data.get("message") or data.get("error", "Unknown status.")
-                    pygame.event.post(pygame.event.Event(pygame.USEREVENT, {"status_message": status}))
-                else:
-                    raise Exception("Failed status request")
-            except Exception as e:
-                pygame.event.post(pygame.event.Event(pygame.USEREVENT, {"status_message": "Status unavailable."}))
-
-        import threading
-        threading.Thread(target=worker, daemon=True).start()
+        def on_status(result):
+            if result.ok:
+                data = result.json()
+                self.status_label.set_text(data.get("message") or data.get("error", "Unknown status."))
+                self.apply_skill(data)
+            else:
+                self.status_label.set_text("Status unavailable.")
+
+        network.post("/gather/status", json={"player_name": self.player.name, "stop": False}, callback=on_status)
+
+    def apply_skill(self, data):
+        """Takes the skill level the server worked out for the gathering it just paid out."""
+        skill = data.get("skill")
+        if not skill or not self.is_current:
+            return
+        setattr(self.player, f"{skill['activity']}_level", skill["level"])
+        self.refresh_level_labels()
 
     def start_gathering(self, activity):
-        def worker():
-            try:
-                response = requests.post(
-                    f"{SERVER_URL}/gather/start",
-                    json={"player_name": self.player.name, "activity": activity},
-                    timeout=5
-                )
-                self.refresh_status()
-            except Exception as e:
-                print("[Gathering] Failed to start", e)
-
-        import threading
-        threading.Thread(target=worker, daemon=True).start()
+        def on_started(result):
+            if result.error:
+                print("[Gathering] Failed to start", result.error)
+            self.refresh_status()
+
+        network.post("/gather/start", json={"player_name": self.player.name, "activity": activity},
+                     callback=on_started, priority=PRIORITY_HIGH)
 
     def stop_gathering(self):
-        def worker():
-            try:
-                response = requests.post(
-                    f"{SERVER_URL}/gather/status",
-                    json={"player_name": self.player.name, "stop": True},
-                    timeout=5
-                )
-                self.fetch_status()
-            except Exception as e:
-                print("[Gathering] Failed to stop", e)
-
-        import threading
-        threading.Thread(target=worker, daemon=True).start()
+        def on_stopped(result):
+            if result.error:
+                print("[Gathering] Failed to stop", result.error)
+            self.fetch_status()
+
+        network.post("/gather/status", json={"player_name": self.player.name, "stop": True},
+                     callback=on_stopped, priority=PRIORITY_HIGH)
 
     def collect_materials_and_stop(self):
-        def worker():
-            try:
-                response = requests.post(
-                    f"{SERVER_URL}/collect_materials",
-                    json={"player_name": self.player.name},
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    msg = data.get("message", "Collected.")
+        def on_collected(result):
+            if result.ok:
+                msg = result.json().get("message", "Collected.")
+                if self.player.chat_window:
                     self.player.chat_window.log_message(msg, "System")
-                else:
-                    raise Exception("Collection failed.")
-            except Exception as e:
-                print( {"status_message": "Collection failed."})
+                self.apply_skill(result.json())
+            else:
+                print({"status_message": "Collection failed."})
             self.refresh_status()
 
-        import threading
-        threading.Thread(target=worker, daemon=True).start()
+        network.post("/collect_materials", json={"player_name": self.player.name},
+                     callback=on_collected, priority=PRIORITY_HIGH)
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
@@ -199,11 +194,6 @@ class GatheringScreen(BaseScreen):
                 for btn in self.buttons:
                     if event.ui_element == btn:
                         self.start_gathering(btn.activity_name)
-                        self.refresh_status()
-
-        elif event.type == pygame.USEREVENT:
-            if "status_message" in event.__dict__:
-                self.status_label.set_text(event.status_message)
 
         # Let the chat system process any events too
         if self.player.chat_window:
@@ -212,6 +202,14 @@ class GatheringScreen(BaseScreen):
     def update(self, time_delta):
         self.manager.update(time_delta)
 
+        # Set by the chat window when the server pushes progress
+        update = self.player.gathering_update
+        if update is not self.shown_update:
+            self.show_progress(update)
+            if update and update["level"] != getattr(self.player, f"{update['activity']}_level"):
+                setattr(self.player, f"{update['activity']}_level", update["level"])
+                self.refresh_level_labels()
+
         if self.player.chat_window:
             self.player.chat_window.update(time_delta)
 
@@ -4,11 +4,11 @@ import pygame.gfxdraw
 import pygame
 import pygame_gui
 from pygame import Rect
-import requests
 from pygame_gui.elements import UIButton, UIPanel, UILabel
 
 from chat_system import ChatWindow
-from settings import SERVER_URL, rarity_colors, CLASS_WEAPON_RESTRICTIONS
+from network import network
+from settings import rarity_colors, CLASS_WEAPON_RESTRICTIONS
 from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
 
@@ -118,18 +118,11 @@ class InventoryScreen(BaseScreen):
 
         self.slot_icons = []
 
-        # Fetch inventory data from backend
-        player_name = self.screen_manager.player.name
-        try:
-            response = requests.get(f"{SERVER_URL}/inventory/{player_name}", timeout=5)
-            response.raise_for_status()
-            inventory_data = response.json()
-            self.inventory_data = inventory_data
-        except Exception as e:
-            print(f"[Inventory] Failed to load inventory: {e}")
-            inventory_data = []  # fallback to empty
-
+        # Show what we have locally right away, then catch up with whatever changed on the server
+        self.inventory_data = self.player.inventory
         self.render_inventory_icons()
+        self.player.inventory_sync.listener = self.on_inventory
+        self.reload_inventory()
 
         self.hover_tooltip_box = pygame_gui.elements.UITextBox(
             html_text="",
@@ -305,29 +298,20 @@ class InventoryScreen(BaseScreen):
             self.coin_label.set_text(f"Coins: {self.player.format_coins()}")
 
     def refresh_inventory_data(self):
-        try:
-            player_name = self.screen_manager.player.name
-            response = requests.get(f"{SERVER_URL}/inventory/{player_name}", timeout=5)
-            response.raise_for_status()
-            self.inventory_data = response.json()
-            self.render_inventory_icons()
-            self.sync_equipment_to_player()
-            self.refresh_stat_display()
-        except Exception as e:
-            print(f"[Inventory] Failed to refresh inventory: {e}")
+        self.reload_inventory()
 
     def reload_inventory(self):
-        player_name = self.screen_manager.player.name
-        try:
-            response = requests.get(f"{SERVER_URL}/inventory/{player_name}", timeout=5)
-            response.raise_for_status()
-            self.inventory_data = response.json()
-            self.render_inventory_icons()
-            self.sync_equipment_to_player()
-            self.update_secondary_slot_visual()
-            self.refresh_stat_display()
-        except Exception as e:
-            print(f"[Inventory] Failed to reload inventory: {e}")
+        self.player.inventory_sync.refresh()
+
+    def on_inventory(self):
+        if not self.is_current:
+            return
+
+        self.inventory_data = self.player.inventory
+        self.render_inventory_icons()
+        self.sync_equipment_to_player()
+        self.update_secondary_slot_visual()
+        self.refresh_stat_display()
 
     def render_inventory_icons(self):
         # Clear existing icons first
@@ -422,6 +406,7 @@ class InventoryScreen(BaseScreen):
                 surface.blit(aura_surface, (icon_center[0] - radius, icon_center[1] - radius))
 
     def teardown(self):
+        self.player.inventory_sync.listener = None
         self.back_button.kill()
         if self.player.chat_window:
             self.player.chat_window.teardown()
@@ -467,15 +452,8 @@ class InventoryScreen(BaseScreen):
             self.equip_tooltip_box.kill()
 
     def _save_inventory(self):
-        try:
-            payload = {
-                "character_name": self.screen_manager.player.name,
-                "inventory": self.inventory_data
-            }
-            response = requests.post(f"{SERVER_URL}/inventory/update", json=payload, timeout=5)
-            response.raise_for_status()
-        except Exception as e:
-            print(f"[Inventory] Failed to update inventory: {e}")
+        # The items were moved in place, the inventory sync works out the ops and sends them
+        self.player.inventory_sync.push()
 
     def sync_equipment_to_player(self):
         self.player.equipment = {
@@ -501,96 +479,99 @@ class InventoryScreen(BaseScreen):
                     self.player.equipment[subtype] = item
 
     def load_gathered_materials(self):
-        import requests
+        network.get("/gathered_materials", params={"player_name": self.player.name}, callback=self.on_gathered_materials)
+
+    def on_gathered_materials(self, result):
         from item_ID import ALL_ITEMS
 
-        try:
-            response = requests.get(f"{SERVER_URL}/gathered_materials", params={"player_name": self.player.name})
-            if response.status_code == 200:
-                for label in self.materials_labels:
-                    label.kill()
-                self.materials_labels.clear()
-
-                items = response.json().get("materials", [])
-                # Group items by gathering type
-                grouped = {
-                    "Woodcutting": [],
-                    "Mining": [],
-                    "Farming": [],
-                    "Scavenging": []
-                }
-
-                for item in items:
-                    item_id = item["item_id"]
-                    item_data = ALL_ITEMS.get(item_id)
-                    if not item_data:
-                        continue
-
-                    # Infer gathering type from ID range
-                    if 1 <= item_id <= 99:
-                        group = "Woodcutting"
-                    elif 100 <= item_id <= 199:
-                        group = "Mining"
-                    elif 200 <= item_id <= 299:
-                        group = "Farming"
-                    elif 300 <= item_id <= 399:
-                        group = "Scavenging"
-                    else:
-                        group = "Other"
-
-                    grouped[group].append({
-                        "name": item["name"],
-                        "quantity": item["quantity"],
-                        "level": item_data.get("level", 0),
-                        "rarity": item["rarity"]
-                    })
-
-                # Sort each group by level
-                for group in grouped:
-                    grouped[group].sort(key=lambda x: x["level"])
-
-                # Build UI labels
-                y_offset = 0
-                for group_name in ["Woodcutting", "Mining", "Farming", "Scavenging"]:
-                    items_in_group = grouped.get(group_name)
-                    if not items_in_group:
-                        continue
-
-                    # Section label
-                    header = UILabel(
-                        relative_rect=pygame.Rect((10, y_offset), (280, 25)),
-                        text=f"{group_name}",
-                        manager=self.manager,
-                        container=self.materials_list_container,
-                        object_id="#materials_label_header"
-                    )
-                    self.materials_labels.append(header)
-                    y_offset += 30
-
-                    for item in items_in_group:
-                        from settings import rarity_colors
-
-                        color_hex = rarity_colors.get(item.get("rarity", "Common"), "#FFFFFF")
-
-                        colored_name = f"<font color='{color_hex}'>{item['name']}</font>"
-
-                        label = pygame_gui.elements.UITextBox(
-                            html_text=f"{colored_name} (Lv {item['level']}) x{item['quantity']}",
-                            relative_rect=pygame.Rect((20, y_offset), (260, 30)),
-                            manager=self.manager,
-                            container=self.materials_list_container,
-                            object_id="#materials_label"
-                        )
-                        label.disable()
-                        self.materials_labels.append(label)
-                        y_offset += 30
-
-                    y_offset += 10  # extra space between groups
-
-                # Adjust scrollable height
-                self.materials_list_container.set_dimensions((self.container_width - 20, max(y_offset + 20, self.container_height)))
-        except Exception as e:
-            print("[Error] Failed to load gathered materials:", e)
+        if not self.is_current:
+            return
+        if not result.ok:
+            print("[Error] Failed to load gathered materials:", result.describe_error())
+            return
+
+        for label in self.materials_labels:
+            label.kill()
+        self.materials_labels.clear()
+
+        items = result.json().get("materials", [])
+        # Group items by gathering type
+        grouped = {
+            "Woodcutting": [],
+            "Mining": [],
+            "Farming": [],
+            "Scavenging": []
+        }
+
+        for item in items:
+            item_id = item["item_id"]
+            item_data = ALL_ITEMS.get(item_id)
+            if not item_data:
+                continue
+
+            # Infer gathering type from ID range
+            if 1 <= item_id <= 99:
+                group = "Woodcutting"
+            elif 100 <= item_id <= 199:
+                group = "Mining"
+            elif 200 <= item_id <= 299:
+                group = "Farming"
+            elif 300 <= item_id <= 399:
+                group = "Scavenging"
+            else:
+                group = "Other"
+
+            grouped[group].append({
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "level": item_data.get("level", 0),
+                "rarity": item["rarity"]
+            })
+
+        # Sort each group by level
+        for group in grouped:
+            grouped[group].sort(key=lambda x: x["level"])
+
+        # Build UI labels
+        y_offset = 0
+        for group_name in ["Woodcutting", "Mining", "Farming", "Scavenging"]:
+            items_in_group = grouped.get(group_name)
+            if not items_in_group:
+                continue
+
+            # Section label
+            header = UILabel(
+                relative_rect=pygame.Rect((10, y_offset), (280, 25)),
+                text=f"{group_name}",
+                manager=self.manager,
+                container=self.materials_list_container,
+                object_id="#materials_label_header"
+            )
+            self.materials_labels.append(header)
+            y_offset += 30
+
+            for item in items_in_group:
+                from settings import rarity_colors
+
+                color_hex = rarity_colors.get(item.get("rarity", "Common"), "#FFFFFF")
+
+                colored_name = f"<font color='{color_hex}'>{item['name']}</font>"
+
+                label = pygame_gui.elements.UITextBox(
+                    html_text=f"{colored_name} (Lv {item['level']}) x{item['quantity']}",
+                    relative_rect=pygame.Rect((20, y_offset), (260, 30)),
+                    manager=self.manager,
+                    container=self.materials_list_container,
+                    object_id="#materials_label"
+                )
+                label.disable()
+                self.materials_labels.append(label)
+                y_offset += 30
+
+            y_offset += 10  # extra space between groups
+
+        # Adjust scrollable height
+        self.materials_list_container.set_dimensions((self.container_width - 20, max(y_offset + 20, self.container_height)))
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
@@ -725,21 +706,12 @@ class InventoryScreen(BaseScreen):
                     self.render_inventory_icons()
 
                     # Save changes to server
-                    try:
-                        payload = {
-                            "character_name": self.screen_manager.player.name,
-                            "inventory": self.inventory_data
-                        }
-                        response = requests.post(f"{SERVER_URL}/inventory/update", json=payload, timeout=5)
-                        response.raise_for_status()
-                    except Exception as e:
-                        print(f"[Inventory] Failed to update inventory: {e}")
+                    self._save_inventory()
 
                     self.dragging_item = None
                     self.dragging_index = None
 
                     self.sync_equipment_to_player()
-                    self.player.save_stats_and_equipment()
                     self.update_secondary_slot_visual()
                     self.refresh_stat_display()
 
@@ -808,7 +780,6 @@ class InventoryScreen(BaseScreen):
 
                                 self.render_inventory_icons()
                                 self.sync_equipment_to_player()
-                                self.player.save_stats_and_equipment()
                                 self.update_secondary_slot_visual()
                                 self.refresh_stat_display()
                                 self._save_inventory()
@@ -835,7 +806,6 @@ class InventoryScreen(BaseScreen):
                         equipped_item["slot"] = free_slots[0]  # Move back to inventory
                         self.render_inventory_icons()
                         self.sync_equipment_to_player()
-                        self.player.save_stats_and_equipment()
                         self.update_secondary_slot_visual()
                         self.refresh_stat_display()
                         self._save_inventory()
@@ -1,5 +1,4 @@
 # screens/main_game_screen.py
-import requests
 
 from chat_system import ChatWindow
 import pygame
@@ -8,7 +7,7 @@ from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
 import datetime
 
-from settings import SERVER_URL
+from network import network, PRIORITY_HIGH
 
 
 class MainGameScreen(BaseScreen):
@@ -20,7 +19,8 @@ class MainGameScreen(BaseScreen):
     def setup(self):
         self.player = self.screen_manager.player
         self.player.start_heartbeat(self.screen_manager.current_account)
-        self.player.calculate_idle_rewards()
+        # The chest shows up in update() once the server answers
+        self.player.claim_idle_rewards()
 
         self.player.chat_window = ChatWindow(self.manager, self.player, self.screen_manager)
         self.player.chat_window.panel.set_relative_position((10, 480))
@@ -52,7 +52,6 @@ class MainGameScreen(BaseScreen):
         self.chest_icon = pygame.image.load("Assets/GUI/Icons/treasureChest.png").convert_alpha()
         self.chest_icon = pygame.transform.scale(self.chest_icon, (64, 64))  # Resize if needed
 
-        self.earned_gold = 0
         self.idle_timer = 0
 
     def teardown(self):
@@ -72,17 +71,12 @@ class MainGameScreen(BaseScreen):
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.logout_button:
-                try:
-                    requests.post(
-                        f"{SERVER_URL}/logout",
-                        json={"username": self.screen_manager.current_account},
-                        timeout=3
-                    )
-                except Exception as e:
-                    print(f"[Logout] Failed to notify server: {e}")
-                from screens.character_select_screen import CharacterSelectScreen
+                # Save first and wait for it, then tell the server we're gone
                 self.player.last_logout_time = datetime.datetime.now(datetime.UTC)
-                self.player.save_to_server(self.screen_manager.auth_token)  # Add this line
+                self.player.save_to_server(self.screen_manager.auth_token)
+                from screens.character_select_screen import CharacterSelectScreen, log_logout_failure
+                network.post("/logout", json={"username": self.screen_manager.current_account},
+                             callback=log_logout_failure, priority=PRIORITY_HIGH)
                 self.screen_manager.set_screen(CharacterSelectScreen(self.manager, self.screen_manager))
 
             for btn in self.menu_buttons:
@@ -120,6 +114,7 @@ class MainGameScreen(BaseScreen):
 
         self.player.update_heartbeat(time_delta)
 
+        # Pays for time on this screen only, the sync manager batches the coins into its next /player/sync
         self.idle_timer += time_delta
         if self.idle_timer >= 2.0:
             self.player.add_coins(50)
@@ -156,19 +151,17 @@ class MainGameScreen(BaseScreen):
 
     def claim_idle_rewards(self):
         if self.player.pending_idle_rewards:
-            self.player.experience += self.player.pending_idle_rewards['xp']
-            self.player.add_coins(0,0,self.player.pending_idle_rewards['gold'], 0)
-
-            # Calculate offline duration
-            offline_seconds = (datetime.datetime.now(datetime.UTC) - self.player.last_logout_time).total_seconds()
-            minutes = int(offline_seconds // 60)
-            seconds = int(offline_seconds % 60)
-
-            xp = self.player.pending_idle_rewards['xp']
-            gold = self.player.pending_idle_rewards['gold']
+            # The server already paid these out when they were claimed, this just shows them
+            rewards = self.player.pending_idle_rewards
+            minutes = int(rewards['offline_seconds'] // 60)
+            seconds = int(rewards['offline_seconds'] % 60)
 
             # Log to chat (client-side only)
-            reward_summary = f"[Idle Rewards] You were offline for {minutes}m {seconds}s and earned {xp} XP and {gold} Gold."
+            reward_summary = (f"[Idle Rewards] You were offline for {minutes}m {seconds}s and earned "
+                              f"{rewards['experience']} XP and {rewards['gold']} Gold.")
+            if rewards['gathered']:
+                gathered = ", ".join(f"{drop['quantity']} x {drop['name']}" for drop in rewards['gathered'])
+                reward_summary += f" You also gathered {gathered}."
             self.player.chat_window.log_message(reward_summary, "System")
             self.player.pending_idle_rewards = None
 
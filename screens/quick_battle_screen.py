@@ -2,12 +2,13 @@ import time
 
 import pygame
 import pygame_gui
-import requests
 from pygame import Rect
 from pygame_gui.elements import UIButton, UITextBox, UILabel
-from enemies import ENEMY_TIERS, NAME_PREFIXES, ELITE_PREFIXES, ELITE_AURA_COLORS
+from enemies import ELITE_AURA_COLORS
 from chat_system import ChatWindow
+from combat import CombatEngine, QUICK_SPAWN_DELAY, generate_quick_enemy
 from items import create_item
+from network import network, PRIORITY_HIGH
 from screen_manager import BaseScreen
 from screen_registry import ScreenRegistry
 import random
@@ -24,7 +25,7 @@ class QuickBattleScreen(BaseScreen):
 
         self.pending_enemy_spawn = False
         self.enemy_spawn_timer = 0.0
-        self.enemy_spawn_delay = 3.0  # 1 second delay
+        self.enemy_spawn_delay = QUICK_SPAWN_DELAY
 
         self.title_label = UILabel(
             relative_rect=Rect((10, 10), (300, 30)),
@@ -56,21 +57,9 @@ class QuickBattleScreen(BaseScreen):
         self.session_start_time = time.time()
 
         self.battle_log = []
-        self.battle_running = True
-        self.player_attack_timer = 0
-        self.enemy_attack_timer = 0
 
-        self.enemy = self.generate_enemy_from_dungeon_level(self.player.highest_dungeon_completed)
-        # self.enemy = self.generate_enemy_from_dungeon_level(MAX_DUNGEON_LEVEL)
-
-        self.player_hp = self.player.total_stats.get("Health", 100)
-        # self.player_damage = self.player.total_stats.get("Bonus Damage", 1) + 5
-
-        self.player_attack_speed = self.player.total_stats.get("Attack Speed", 1.0)
-        self.enemy_attack_speed = self.enemy.get("speed", 1.0)
-
-        self.player_attack_delay = max(0.2, 1.0 / self.player_attack_speed)
-        self.enemy_attack_delay = max(0.2, 1.0 / self.enemy_attack_speed)
+        self.enemy = generate_quick_enemy(self.player.highest_dungeon_completed)
+        self.start_fight()
 
         elite_type = self.enemy.get("elite_type")
         color = ELITE_AURA_COLORS.get(elite_type, "#FFFFFF")
@@ -134,15 +123,15 @@ class QuickBattleScreen(BaseScreen):
         self.player.chat_window.panel.set_relative_position((10, 480))
         self.player.chat_window.panel.set_dimensions((400, 220))
 
+    def start_fight(self):
+        # The engine works on its own copy of the enemy, keep self.enemy pointing at it for the labels
+        self.combat = CombatEngine(self.player.total_stats, self.player.equipment, self.enemy)
+        self.enemy = self.combat.enemy
+
     def start_new_battle(self):
         self.battle_log = []
-        self.enemy = self.generate_enemy_from_dungeon_level(self.player.highest_dungeon_completed)
-        self.player_hp = self.player.total_stats.get("Health", 100)
-        self.enemy_attack_speed = self.enemy.get("speed", 1.0)
-        self.enemy_attack_delay = max(0.2, 1.0 / self.enemy_attack_speed)
-        self.battle_running = True
-        self.player_attack_timer = 0
-        self.enemy_attack_timer = 0
+        self.enemy = generate_quick_enemy(self.player.highest_dungeon_completed)
+        self.start_fight()
         self.update_enemy_labels()
         self.update_hp_display()
         self.add_log(f"<font color='#aaaaaa'>A new {self.enemy['name']} approaches!</font>")
@@ -162,62 +151,11 @@ class QuickBattleScreen(BaseScreen):
         title_text = f"<i>{elite_type}</i>" if elite_type else ""
         self.enemy_title_label.set_text(title_text)
 
-    def generate_enemy_from_dungeon_level(self, level):
-        # Find highest tier
-        tier = ENEMY_TIERS[0]
-        for t in ENEMY_TIERS:
-            if level >= t["min_level"]:
-                tier = t
-            else:
-                break
-
-        is_elite = random.random() < 0.15  # 15% chance to be elite
-        prefix = random.choice(NAME_PREFIXES)
-
-        base_name = f"{random.choice(NAME_PREFIXES)} {tier['name']} Lv{level}"
-
-        elite_type = None
-        if is_elite:
-            elite_type = random.choice(list(ELITE_AURA_COLORS.keys()))
-
-
-            # Do not modify name — show elite_type in title only
-        name = base_name
-
-        hp = int(tier["base_hp"] + level * 5)
-        dmg = int(tier["base_dmg"] + level * 1.5)
-        crit_chance = 10 + level * 0.5  # scale slightly with dungeon level
-        crit_damage = 50  # 1.5x damage
-        speed = round(max(0.5, tier["base_speed"] - level * 0.02), 2)
-        xp = int(tier["base_xp"] + level * 2.5)
-        copper = int(tier["base_copper"] + level * 15)
-
-        if is_elite:
-            hp = int(hp * 1.6)
-            dmg = int(dmg * 1.5)
-            speed = max(speed - 0.1, 0.5)
-            xp = int(xp * 2)
-            copper = int(copper * 1.75)
-
-        return {
-            "name": name,
-            "hp": hp,
-            "max_hp": hp,
-            "damage": dmg,
-            "speed": speed,
-            "reward_xp": xp,
-            "reward_copper": copper,
-            "elite": is_elite,
-            "elite_type": elite_type,
-            "crit_chance": crit_chance,
-            "crit_damage": crit_damage
-        }
-
     def update_hp_display(self):
         self.enemy_hp_label.set_text(f"HP: {self.enemy['hp']} / {self.enemy['max_hp']}")
-        self.player_hp_label.set_text(f"HP: {max(0, self.player_hp)} / {self.player.total_stats.get('Health', 100)}")
+        self.player_hp_label.set_text(f"HP: {max(0, self.combat.player_hp)} / {self.combat.max_hp}")
         self.enemy_hp_pct = max(0, self.enemy["hp"] / self.enemy["max_hp"])
-        self.player_hp_pct = max(0, self.player_hp / self.player.total_stats.get("Health", 100))
+        self.player_hp_pct = max(0, self.combat.player_hp / self.combat.max_hp)
 
     def add_log(self, text):
         self.battle_log.append(text)
@@ -227,17 +165,12 @@ class QuickBattleScreen(BaseScreen):
     def update(self, time_delta):
         self.manager.update(time_delta)
 
-        if self.battle_running:
-            self.player_attack_timer += time_delta
-            self.enemy_attack_timer += time_delta
-
-            if self.player_attack_timer >= self.player_attack_delay:
-                self.player_attack_timer = 0
-                self.player_attack()
+        events = self.combat.advance(time_delta)
+        for event in events:
+            self.show_combat_event(event)
+        if events:
+            self.update_hp_display()
 
-            if self.enemy_attack_timer >= self.enemy_attack_delay:
-                self.enemy_attack_timer = 0
-                self.enemy_attack()
         if self.pending_enemy_spawn:
             self.enemy_spawn_timer += time_delta
             if self.enemy_spawn_timer >= self.enemy_spawn_delay:
@@ -247,120 +180,46 @@ class QuickBattleScreen(BaseScreen):
         if self.player.chat_window:
             self.player.chat_window.update(time_delta)
 
-    def player_attack(self):
-        if not self.battle_running:
-            return
-
-        primary_weapon = self.player.equipment.get("primary")
-        if primary_weapon:
-            min_dmg = primary_weapon["stats"].get("Min Damage", 1)
-            max_dmg = primary_weapon["stats"].get("Max Damage", 5)
-            base_primary_dmg = random.randint(min_dmg, max_dmg)
-        else:
-            base_primary_dmg = random.randint(0, 2)  # default fallback
-
-        secondary_weapon = self.player.equipment.get("secondary")
-        if secondary_weapon:
-            min_dmg = secondary_weapon["stats"].get("Min Damage", 1)
-            max_dmg = secondary_weapon["stats"].get("Max Damage", 5)
-            base_secondary_dmg = random.randint(min_dmg, max_dmg)
-        else:
-            base_secondary_dmg = random.randint(0, 2)
-
-        bonus = self.player.total_stats.get("Bonus Damage", 0)
-
-        self.player_damage = base_primary_dmg + base_secondary_dmg + bonus
-
-        dmg = self.player_damage
-
-        # 🎯 Get crit stats
-        crit_chance = self.player.total_stats.get("Critical Chance", 0)
-        crit_damage = self.player.total_stats.get("Critical Damage", 0)
-
-        # 🎲 Roll for crit
-        is_crit = random.random() < (crit_chance / 100)
-        if is_crit:
-            dmg = int(dmg * (1 + crit_damage / 100))
-            self.add_log(f"<font color='#ffcc00'>CRIT!</font> You hit {self.enemy['name']} for {dmg} damage!")
-        else:
-            self.add_log(f"You hit {self.enemy['name']} for {dmg} damage.")
-
-        self.enemy["hp"] -= dmg
+    def show_combat_event(self, event):
+        kind = event["type"]
+        name = self.enemy["name"]
 
+        if kind == "player_hit":
+            if event["crit"]:
+                self.add_log(f"<font color='#ffcc00'>CRIT!</font> You hit {name} for {event['damage']} damage!")
+            else:
+                self.add_log(f"You hit {name} for {event['damage']} damage.")
 
-        if self.enemy["hp"] <= 0:
-            self.enemy["hp"] = 0
-            self.battle_running = False
-            self.add_log(f"{self.enemy['name']} is defeated!")
+        elif kind == "enemy_defeated":
+            self.add_log(f"{name} is defeated!")
             self.apply_battle_rewards()
 
             # Automatically start new battle
             self.pending_enemy_spawn = True
             self.enemy_spawn_timer = 0.0
-        self.update_hp_display()
-
-    def enemy_attack(self):
-        if not self.battle_running:
-            return
-
-        base_dmg = self.enemy["damage"]
-        crit_chance = self.enemy.get("crit_chance", 0)
-        crit_damage = self.enemy.get("crit_damage", 0)
-
-        dodge_chance = self.player.total_stats.get("Dodge", 0)
-        avoid_chance = self.player.total_stats.get("Avoidance", 0)
-        block_chance = self.player.total_stats.get("Block", 0)
-        armor = self.player.total_stats.get("Armor", 0)
 
-        # Dodge
-        if random.random() < (dodge_chance / 100):
+        elif kind == "dodged":
             self.add_log(f"<font color='#00ffff'>You dodged the attack!</font>")
-            return
 
-        # Avoidance
-        if random.random() < (avoid_chance / 100):
+        elif kind == "avoided":
             self.add_log(f"<font color='#00ffff'>You avoided the attack!</font>")
-            return
-
-        # Crit
-        is_crit = random.random() < (crit_chance / 100)
-        dmg = base_dmg
-        if is_crit:
-            dmg = int(dmg * (1 + crit_damage / 100))
-
-        # Block
-        if random.random() < (block_chance / 100):
-            dmg = int(dmg * 0.5)
-            self.add_log(f"<font color='#aaaaff'>You blocked the attack!</font> Damage reduced.")
-
-        # Armor application (after all multipliers)
-        dmg_after_armor = max(0, dmg - armor)
 
-        if dmg_after_armor <= 0:
-            self.add_log(f"<font color='#cccccc'>Your armor absorbed all damage!</font>")
-        else:
-            if is_crit:
-                self.add_log(
-                    f"<font color='#ff3333'>CRITICAL!</font> {self.enemy['name']} hits you for {dmg_after_armor}.")
+        elif kind == "enemy_hit":
+            if event["blocked"]:
+                self.add_log(f"<font color='#aaaaff'>You blocked the attack!</font> Damage reduced.")
+            if event["damage"] <= 0:
+                self.add_log(f"<font color='#cccccc'>Your armor absorbed all damage!</font>")
+            elif event["crit"]:
+                self.add_log(f"<font color='#ff3333'>CRITICAL!</font> {name} hits you for {event['damage']}.")
             else:
-                self.add_log(f"{self.enemy['name']} hits you for {dmg_after_armor}.")
-
-        self.player_hp -= dmg_after_armor
+                self.add_log(f"{name} hits you for {event['damage']}.")
 
-        if self.player_hp <= 0:
-            self.player_hp = 0
-            self.battle_running = False
+        elif kind == "player_defeated":
             self.add_log("<font color='#ff4444'>You have been defeated.</font>")
 
-            # Reset health only
-            self.player_hp = self.player.total_stats.get("Health", 100)
+            # Reset health only and fight the same enemy again
             self.enemy["hp"] = self.enemy["max_hp"]
-            self.player_attack_timer = 0
-            self.enemy_attack_timer = 0
-
-            self.battle_running = True
-
-        self.update_hp_display()
+            self.start_fight()
 
     def apply_battle_rewards(self):
         xp = self.enemy.get("reward_xp", 0)
@@ -391,28 +250,27 @@ class QuickBattleScreen(BaseScreen):
             }
             if weapon_type:
                 payload["weapon_type"] = weapon_type
-            try:
-                response = requests.post(f"{SERVER_URL}/createitem", json=payload)
-                result = response.json()
-                if result.get("success"):
-                    self.add_log(result["message"])
-                    # Optionally show the item popup if you also want to show what was dropped
-                    # You could refetch inventory and search for newest item to show
-                    # self.show_item_drop_popup(result["item"])
-                else:
-                    self.add_log(f"[Loot Error] {result.get('error', 'Unknown error')}")
-            except Exception as e:
-                self.add_log(f"[Loot Error] {str(e)}")
-
-        if self.player.auth_token:
-            self.player.sync_coins_to_server(self.player.auth_token)
-            self.player.save_to_server(self.player.auth_token)
+            network.post("/createitem", json=payload, callback=self.on_loot, priority=PRIORITY_HIGH)
+
+        # gain_experience and add_coins already queued the save, the sync manager batches it
 
         self.session_kills += 1
         self.session_xp += xp
         self.session_copper += copper
         self.update_session_summary()
 
+    def on_loot(self, result):
+        if not self.is_current:
+            return
+        data = result.json()
+        if result.ok and data.get("success"):
+            self.add_log(data["message"])
+            # Optionally show the item popup if you also want to show what was dropped
+            # You could refetch inventory and search for newest item to show
+            # self.show_item_drop_popup(data["item"])
+        else:
+            self.add_log(f"[Loot Error] {result.describe_error('Unknown error')}")
+
     def update_session_summary(self):
         duration = int(time.time() - self.session_start_time)
         minutes = duration // 60
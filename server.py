@@ -1,18 +1,37 @@
 # server.py
-import threading
-import time
+import asyncio
+import random
+import secrets
 import uuid
 
-from fastapi import FastAPI, HTTPException, Depends, Body, Security, Query, Request
+from fastapi import FastAPI, HTTPException, Depends, Body, Security, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine, or_, and_
+from sqlalchemy import create_engine, or_, and_, select
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from passlib.context import CryptContext
-from jose import jwt
+from jose import jwt, JWTError
 import datetime
 from pydantic import BaseModel
 import models
+from chat_hub import chat_hub, serialize_message, public_clause
+from chat_writer import ChatWriter
+from db_metrics import PoolMetrics, instrumented_pool
+from presence import PresenceTracker
+from roster import OnlineRoster
+from leaderboard import DungeonLeaderboard
 from items import create_item
+from combat import simulate_dungeon, dungeon_rewards, roll_dungeon_loot
+from stat_cache import StatCache
+from inventory import (InventoryChangeLog, InventoryError, persist_ops, slots_for_ops, item_to_dict, items_of,
+                       items_at, equipped_items, equipment_from_items, used_slots, first_free_slot)
+import idle
+from gathering import (catalog as gathering_catalog, roll_drops, drops_message, skill_progress, level_for_xp,
+                       xp_for_level, MAX_SKILL_LEVEL)
+from materials import add_materials, materials_of
+from gather_scheduler import GatherScheduler
 from models import Base, Account, Player
 
 # ⚙️ PostgreSQL Settings (used by server only)
@@ -21,13 +40,90 @@ DATABASE_NAME = "PyRPG"
 DATABASE_USER = "PyRPG_Admin"
 DATABASE_PASSWORD = "Christie91!"
 DATABASE_URL = f"postgresql+psycopg2://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
+
+# ⚙️ Connection pools (the sync and async engines each get their own pool of this size)
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 20  # extra connections opened under burst load, closed again when returned
+DB_POOL_TIMEOUT = 10  # seconds a request waits for a free connection before failing
+DB_POOL_RECYCLE = 1800  # seconds before a connection is replaced, keeps us under server/firewall idle limits
+DB_POOL_PRE_PING = True  # test connections on checkout so a restarted Postgres doesn't fail the first requests
+DB_BEHIND_PGBOUNCER = False  # True when DATABASE_HOST is a PgBouncer in transaction pooling mode
+
+REQUIRED_VERSION = "v0.0.9"  # v0.0.8 clients still save whole totals through /update_player
+
+# ⚙️ Inventory versions kept per character for GET /inventory/{name}?since_version=, older clients get the full bag
+INVENTORY_LOG_SIZE = 50
+
+# ⚙️ Characters whose total stats are kept in memory for /player_stats and dungeon runs
+STAT_CACHE_SIZE = 5000
+
+# ⚙️ Responses at least this big (bytes) are gzipped for clients that accept it (inventories, chat history, leaderboards)
+GZIP_MIN_SIZE = 1000
+
+# ⚙️ Presence (heartbeats are kept in memory, last_seen and offline flags are written in bulk every interval)
+PRESENCE_FLUSH_INTERVAL = 10  # seconds
+ONLINE_TIMEOUT = datetime.timedelta(minutes=2)  # no heartbeat for this long = offline, checked per account
+
+# ⚙️ Chat persistence (messages are written to the database in batches)
+CHAT_FLUSH_INTERVAL = 0.05  # seconds to wait for more messages before writing a batch
+CHAT_FLUSH_BATCH_SIZE = 200
+CHAT_DURABILITY = "async"  # "sync", "async" or "relaxed", see chat_writer.py
+
+POOL_SETTINGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING
+}
+# PgBouncer hands each transaction a different server connection, so asyncpg can't keep prepared statements
+ASYNC_CONNECT_ARGS = {"statement_cache_size": 0, "prepared_statement_cache_size": 0} if DB_BEHIND_PGBOUNCER else {}
 
-REQUIRED_VERSION = "v0.0.8"
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=instrumented_pool(QueuePool, sync_pool_metrics), **POOL_SETTINGS)
 SessionLocal = sessionmaker(bind=engine)
 
+# Hot endpoints (heartbeat, chat, gathering, inventory, player_stats) run on the event loop with asyncpg
+# instead of holding a threadpool worker while they wait on Postgres
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=instrumented_pool(AsyncAdaptedQueuePool, async_pool_metrics),
+    connect_args=ASYNC_CONNECT_ARGS,
+    **POOL_SETTINGS
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+chat_writer = ChatWriter(engine, CHAT_FLUSH_INTERVAL, CHAT_FLUSH_BATCH_SIZE, CHAT_DURABILITY)
+roster = OnlineRoster()
+leaderboard = DungeonLeaderboard()
+leaderboard.attach(Session)  # every session, sync or async, reports committed Player changes
+inventory_log = InventoryChangeLog(INVENTORY_LOG_SIZE)
+inventory_log.attach(Session)
+stat_cache = StatCache(STAT_CACHE_SIZE)
+stat_cache.attach(Session)
+chat_hub.attach(Session)  # messages about a write go out only once it commits, see ChatHub.stage
+gathering_catalog.validate(a.value for a in models.GatheringActivityEnum if a != models.GatheringActivityEnum.none)
+
+def on_presence_expired(username, last_seen):
+    character = roster.get(username)
+    roster.remove(username)
+    print(f"[Presence] Auto-marked {username} as offline (last seen: {last_seen})")
+
+    if character and character["name"]:
+        chat_hub.post(
+            sender="System",
+            message=f"{character['name']} has left the world.",
+            type="System"
+        )
+
+presence = PresenceTracker(engine, ONLINE_TIMEOUT, PRESENCE_FLUSH_INTERVAL, on_expire=on_presence_expired)
+# Pushes gathering progress to players with an open chat stream, see gather_scheduler.py
+gather_scheduler = GatherScheduler(lambda player_name, data: chat_hub.notify(player_name, "GatheringUpdate", data))
+
 app = FastAPI()
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
 SECRET_KEY = "your_super_secret_key"
 ALGORITHM = "HS256"
@@ -68,19 +164,6 @@ class ChatMessage(BaseModel):
     timestamp: float
     type: str = "Chat"  # default to normal chat unless specified
 
-class UpdatePlayerRequest(BaseModel):
-    username: str
-    name: str
-    level: int
-    experience: int
-    copper: int
-    silver: int
-    gold: int
-    platinum: int
-    last_logout_time: str
-    highest_dungeon_completed: int
-    best_dungeon_time_seconds: int
-
 class HeartbeatRequest(BaseModel):
     username: str
     character_name: str
@@ -89,19 +172,26 @@ class HeartbeatRequest(BaseModel):
 class LogoutRequest(BaseModel):
     username: str
 
-class InventoryUpdateRequest(BaseModel):
+class InventoryApplyRequest(BaseModel):
     character_name: str
-    inventory: list
+    version: int  # the inventory_version the ops were made against
+    ops: list[dict]
 
-class StatEquipUpdateRequest(BaseModel):
-    character_name: str
-    stats: dict
-    equipment: dict
+class PlayerSyncRequest(BaseModel):
+    # Only the fields that changed since the client's last sync are sent. Experience and copper are what was
+    # gained (or spent) since then, level, stats and totals are worked out here
+    username: str
+    name: str
+    experience_gained: int = None
+    copper_delta: int = None
 
-class DungeonResult(BaseModel):
+class IdleClaimRequest(BaseModel):
     username: str
-    level_completed: int
-    time_seconds: int
+
+class DungeonRunRequest(BaseModel):
+    username: str
+    level: int
+    seed: int = None
 
 def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
     to_encode = data.copy()
@@ -110,7 +200,10 @@ def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def get_current_username(token: str = Depends(oauth2_scheme)):
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid authentication")
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=401, detail="Invalid authentication")
@@ -123,39 +216,117 @@ def get_db():
     finally:
         db.close()
 
-def background_cleanup_thread():
-    while True:
-        db = SessionLocal()
-        try:
-            cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(minutes=2)
-            stale_users = db.query(Account).filter(Account.is_online == True, Account.last_seen < cutoff).all()
-            for user in stale_users:
-                user.is_online = False
-                print(f"[Cleanup] Auto-marked {user.username} as offline (last seen: {user.last_seen})")
-            db.commit()
-        except Exception as e:
-            print(f"[Cleanup Error] {e}")
-        finally:
-            db.close()
-
-        time.sleep(60)  # Run every 60 seconds
-
-def apply_experience_and_level_up(player: Player, xp_gain: int, db: Session = Depends(get_db)):
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def apply_experience_and_level_up(db, player: Player, xp_gain: int):
     player.experience += xp_gain
     while player.experience >= player.level * 25:
         player.experience -= player.level * 25
         player.level += 1
-        player.stats["base_health"] = player.stats.get("base_health", 10) + 5
-        player.stats["base_mana"] = player.stats.get("base_mana", 10) + 5
-
-        system_msg = models.ChatMessage(
+        # stats is plain JSONB, so assign a new dict or the change never gets flushed
+        stats = dict(player.stats or {})
+        stats["base_health"] = stats.get("base_health", 10) + 5
+        stats["base_mana"] = stats.get("base_mana", 10) + 5
+        player.stats = stats
+
+        chat_hub.stage(
+            db,
             sender="System",
             recipient=player.name,
             message=f"You leveled up to {player.level}! (+5 Health, +5 Mana)",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System"
         )
-        db.add(system_msg)
+
+def add_copper(player: Player, amount: int):
+    # Same condensing as the client: 100 copper -> 1 silver -> ... -> platinum
+    total = (player.copper or 0) + (player.silver or 0) * 100 + (player.gold or 0) * 10000 \
+        + (player.platinum or 0) * 1000000 + amount
+    player.platinum, total = divmod(total, 1000000)
+    player.gold, total = divmod(total, 10000)
+    player.silver, player.copper = divmod(total, 100)
+
+def write_inventory(db, player: Player, rows, ops: list, allow_add=False):
+    """Applies inventory ops to the loaded item rows, bumps the version and stages the change for the log.
+
+    The caller must hold the player's row lock (SELECT ... FOR UPDATE) so two writers can't both build on the same
+    version, and has to delete the returned removed rows. Returns (changes, removed rows).
+    """
+    changes, removed = persist_ops(db, player.id, rows, ops, player.max_inventory_slots or 36,
+                                   player.char_class, allow_add=allow_add)
+    player.inventory_version = (player.inventory_version or 0) + 1
+    inventory_log.stage(db, player, changes)
+    return changes, removed
+
+def place_in_inventory(db: Session, player: Player, item: dict):
+    """Puts item in the first free inventory slot. Returns False when the inventory is full."""
+    # Lock the player row (other pending changes on player, like XP and coins, are kept) and look at slots only
+    db.refresh(player, attribute_names=["inventory_version"], with_for_update=True)
+    slot = first_free_slot(db.execute(used_slots(player.id)).scalars(), player.max_inventory_slots or 36)
+    if slot is None:
+        return False
+
+    changes, _ = write_inventory(db, player, [], [{"op": "add", "item": item, "slot": slot}], allow_add=True)
+    item.update(changes[0]["item"])
+    return True
+
+def load_equipment(db: Session, player: Player):
+    return equipment_from_items(item_to_dict(row) for row in db.execute(equipped_items(player.id)).scalars())
+
+def cached_stats(db: Session, player: Player):
+    """(total stats, equipment) from the stat cache, loading the equipped items only on a miss."""
+    entry, generation = stat_cache.get(player)
+    if entry is None:
+        entry = stat_cache.put(player, load_equipment(db, player), generation)
+    return entry.total_stats, entry.equipment
+
+def settle_gathering(db, player: Player, activity: str, units: int, unit_seconds: int):
+    """Rolls the drops for `units` of gathering and adds the skill xp, leveling up part way through if it gets there.
+
+    Every stretch between level-ups yields at its own level's rate and drop chances. Returns {item_id: quantity}.
+    """
+    stretches, xp = skill_progress(getattr(player, f"{activity}_xp") or 0, units, unit_seconds)
+    drops = {}
+    for level, stretch_units in stretches:
+        tier = gathering_catalog.resolve(activity, level)
+        for item_id, quantity in roll_drops(tier, int(stretch_units * tier.multiplier)).items():
+            drops[item_id] = drops.get(item_id, 0) + quantity
+
+    old_level = getattr(player, f"{activity}_level") or 1
+    level = max(old_level, level_for_xp(xp))
+    setattr(player, f"{activity}_xp", xp)
+    setattr(player, f"{activity}_level", level)
+    if level > old_level:
+        chat_hub.stage(
+            db,
+            sender="System",
+            recipient=player.name,
+            message=f"Your {activity.title()} reached level {level}!",
+            type="System"
+        )
+    return drops
+
+def skill_state(player: Player, activity: str):
+    level = getattr(player, f"{activity}_level") or 1
+    return {
+        "activity": activity,
+        "level": level,
+        "experience": getattr(player, f"{activity}_xp") or 0,
+        "next_level_experience": xp_for_level(level + 1) if level < MAX_SKILL_LEVEL else None
+    }
+
+def player_state(player: Player):
+    """What the client needs to bring its copy of the character in line after the server changed it."""
+    return {
+        "level": player.level,
+        "experience": player.experience,
+        "stats": player.stats,
+        "coins": {"copper": player.copper, "silver": player.silver, "gold": player.gold,
+                  "platinum": player.platinum},
+        "highest_dungeon_completed": player.highest_dungeon_completed,
+        "best_dungeon_time_seconds": player.best_dungeon_time_seconds
+    }
 
 def parse_command_arguments(message: str):
     parts = message.split()
@@ -167,9 +338,43 @@ def parse_command_arguments(message: str):
     return args
 
 @app.on_event("startup")
-def start_background_cleanup():
-    threading.Thread(target=background_cleanup_thread, daemon=True).start()
-    print("[Startup] Background cleanup thread started.")
+def start_presence():
+    presence.start()
+    roster.load(SessionLocal, presence.online_usernames())
+    print("[Startup] Presence tracker started.")
+
+@app.on_event("startup")
+def load_leaderboard():
+    leaderboard.load(SessionLocal)
+    print("[Startup] Dungeon leaderboard loaded.")
+
+@app.on_event("startup")
+async def start_chat_hub():
+    chat_hub.bind_loop(asyncio.get_running_loop())
+    chat_hub.start(SessionLocal, chat_writer)
+    print("[Startup] Chat hub ready for WebSocket subscribers.")
+
+@app.on_event("startup")
+def start_gather_scheduler():
+    gather_scheduler.start()
+    print("[Startup] Gathering scheduler started.")
+
+@app.on_event("shutdown")
+def flush_presence():
+    presence.close()
+
+@app.on_event("shutdown")
+def flush_chat_writer():
+    chat_writer.close()
+    print("[Shutdown] Chat messages flushed.")
+
+@app.on_event("shutdown")
+def stop_gather_scheduler():
+    gather_scheduler.close()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
 
 @app.get("/login_banner")
 def get_login_banner(db: Session = Depends(get_db)):
@@ -238,6 +443,10 @@ async def login(request: Request, db: Session = Depends(get_db)):
     access_token = create_access_token(data={"sub": username})
     user.is_online = True
     db.commit()
+    presence.mark_online(user.username, user.id)
+
+    active = db.query(Player).filter_by(account_id=user.id, is_active=True).first()
+    roster.set_character(user.username, user.role, active.name if active else None, active.is_muted if active else False)
 
     return {
         "access_token": access_token,
@@ -260,8 +469,12 @@ def logout(payload: LogoutRequest, db: Session = Depends(get_db)):
     if active_player:
         active_player.is_active = False
         active_player.last_seen = datetime.datetime.now(datetime.UTC)
+        # Offline idle rewards count from here, /idle/claim pays them out on the next visit
+        active_player.last_logout_time = datetime.datetime.now(datetime.UTC).isoformat()
 
     db.commit()
+    presence.mark_offline(account.username)
+    roster.remove(account.username)
     return {"msg": f"{payload.username} logged out successfully."}
 
 @app.post("/set_active_character")
@@ -270,6 +483,11 @@ def set_active_character(username: str = Body(...), character_name: str = Body(.
     if not account:
         raise HTTPException(status_code=404, detail="Account not found.")
 
+    # The character being switched away from goes idle now
+    previous = db.query(Player).filter_by(account_id=account.id, is_active=True).first()
+    if previous and previous.name != character_name:
+        previous.last_logout_time = datetime.datetime.now(datetime.UTC).isoformat()
+
     # Deactivate all characters
     db.query(Player).filter_by(account_id=account.id).update({"is_active": False})
 
@@ -283,39 +501,42 @@ def set_active_character(username: str = Body(...), character_name: str = Body(.
     account.is_online = True  # ✅ mark account as online
     account.last_seen = datetime.datetime.now(datetime.UTC)  # ✅ set last_seen immediately
 
+    db.commit()
+    presence.mark_online(account.username, account.id)
+    roster.set_character(account.username, account.role, character.name, character.is_muted)
+
     # Send system broadcast when character logs in
-    broadcast = models.ChatMessage(
+    chat_hub.post(
         sender="System",
         message=f"{character.name} has entered the world.",
-        timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
         type="System"
     )
-    db.add(broadcast)
-
-    db.commit()
 
     return {"msg": f"Character '{character_name}' set as active for user '{username}'."}
 
 @app.post("/heartbeat")
-def heartbeat(data: HeartbeatRequest, db: Session = Depends(get_db)):
+async def heartbeat(data: HeartbeatRequest, db: AsyncSession = Depends(get_async_db)):
     if data.client_version != REQUIRED_VERSION:
         raise HTTPException(
             status_code=426,  # Upgrade Required
             detail=f"Client version '{data.client_version}' is outdated. Please update to '{REQUIRED_VERSION}'."
         )
 
-    account = db.query(Account).filter_by(username=data.username).first()
+    # Known accounts never touch the database here, last_seen is flushed in bulk by the presence tracker
+    if presence.touch(data.username):
+        return {"msg": f"Heartbeat OK: {data.username} on {data.client_version}"}
+
+    account = (await db.execute(select(Account).filter_by(username=data.username))).scalars().first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
     account.last_seen = datetime.datetime.now(datetime.UTC)
     account.is_online = True
+    active = (await db.execute(select(Player).filter_by(account_id=account.id, is_active=True))).scalars().first()
+    await db.commit()
 
-    player = db.query(Player).filter_by(account_id=account.id, name=data.character_name).first()
-    if player:
-        player.last_seen = datetime.datetime.now(datetime.UTC)
-
-    db.commit()
+    presence.mark_online(account.username, account.id)
+    roster.set_character(account.username, account.role, active.name if active else None, active.is_muted if active else False)
     return {"msg": f"Heartbeat OK: {data.username} on {data.client_version}"}
 
 @app.post("/register")
@@ -371,10 +592,7 @@ def create_player(username: str, player_data: dict = Body(...), token: str = Dep
     if existing_player:
         raise HTTPException(status_code=400, detail="Character name already exists for this account.")
 
-    raw_inventory = player_data.get("inventory", [])
-    inventory = raw_inventory if isinstance(raw_inventory, list) else []
-
-
+    # New characters start with an empty bag, items are only ever created by the server
     new_player = Player(
         account_id=account.id,
         name=player_data.get("name", "Unnamed"),
@@ -401,9 +619,7 @@ def create_player(username: str, player_data: dict = Body(...), token: str = Dep
             "Dodge": 0,
             "Attack Speed": 1.0
         }),
-        inventory=inventory,
         max_inventory_slots=player_data.get("max_inventory_slots", 36),
-        equipment=player_data.get("equipment", {}),
         skills=player_data.get("skills", {}),
         highest_dungeon_completed=player_data.get("highest_dungeon_completed", 0),
         best_dungeon_time_seconds=player_data.get("best_dungeon_time_seconds", 0)
@@ -415,38 +631,35 @@ def create_player(username: str, player_data: dict = Body(...), token: str = Dep
 
     return {"msg": "Player created successfully!"}
 
-@app.post("/update_player")
-def update_player(request: UpdatePlayerRequest, db: Session = Depends(get_db)):
-
+@app.post("/player/sync")
+def sync_player(request: PlayerSyncRequest, db: Session = Depends(get_db)):
+    """Batched client save: whatever the sync manager collected since last time, in one commit."""
     account = db.query(Account).filter_by(username=request.username).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found.")
 
-    character = db.query(Player).filter_by(account_id=account.id, name=request.name).first()
+    # Locked so a dungeon run or idle claim landing at the same time adds onto the same row instead of racing it
+    character = db.query(Player).filter_by(account_id=account.id, name=request.name).with_for_update().first()
     if not character:
         raise HTTPException(status_code=404, detail="Character not found.")
 
-    character.level = request.level
-    character.experience = request.experience
-    character.copper = request.copper
-    character.silver = request.silver
-    character.gold = request.gold
-    character.platinum = request.platinum
-    character.last_logout_time = request.last_logout_time
-    character.highest_dungeon_completed = request.highest_dungeon_completed
-    character.best_dungeon_time_seconds = request.best_dungeon_time_seconds
+    if request.experience_gained:
+        apply_experience_and_level_up(db, character, max(0, request.experience_gained))
+    if request.copper_delta:
+        total = (character.copper or 0) + (character.silver or 0) * 100 + (character.gold or 0) * 10000 \
+            + (character.platinum or 0) * 1000000
+        add_copper(character, max(request.copper_delta, -total))
+    # Inventory and equipment edits go through /inventory/apply so they're versioned
 
     db.commit()
-    db.refresh(character)
-
-    return {"msg": "Player updated successfully!"}
+    return {"success": True, "synced": sorted(request.dict(exclude_none=True, exclude={"username", "name"}))}
 
 @app.post("/gather/start")
-def start_gathering(data: dict, db: Session = Depends(get_db)):
+async def start_gathering(data: dict, db: AsyncSession = Depends(get_async_db)):
     player_name = data.get("player_name")
     activity = data.get("activity")
 
-    player = db.query(Player).filter(Player.name == player_name).first()
+    player = (await db.execute(select(Player).filter(Player.name == player_name))).scalars().first()
 
     if not player:
         return {"success": False, "error": "Player not found"}
@@ -456,15 +669,16 @@ def start_gathering(data: dict, db: Session = Depends(get_db)):
 
     player.current_gathering_activity = activity
     player.gathering_start_time = datetime.datetime.now(datetime.UTC)
-    db.commit()
+    await db.commit()
+    gather_scheduler.watch(player)
     return {"success": True, "message": f"{activity.title()} started"}
 
 @app.post("/gather/status")
-def gather_status(payload: dict, db: Session = Depends(get_db)):
+async def gather_status(payload: dict, db: AsyncSession = Depends(get_async_db)):
     player_name = payload.get("player_name")
     stop = payload.get("stop", False)
 
-    player = db.query(Player).filter_by(name=player_name).first()
+    player = (await db.execute(select(Player).filter_by(name=player_name))).scalars().first()
     if not player:
         return {"success": False, "error": "Player not found."}
 
@@ -472,77 +686,46 @@ def gather_status(payload: dict, db: Session = Depends(get_db)):
         return {"success": False, "error": "No gathering in progress."}
 
     # Calculate time passed (in minutes)
-    now = datetime.datetime.utcnow()
-    elapsed = (now - player.gathering_start_time).total_seconds()
-    minutes = int(elapsed // 60)
+    now = datetime.datetime.now(datetime.UTC)
+    activity = player.current_gathering_activity
+    activity = activity.value if hasattr(activity, "value") else activity
+
+    # Base 1 item per minute, +10% per skill level
+    minutes = idle.gathering_units((now - player.gathering_start_time).total_seconds())
 
     if minutes < 1:
         return {"success": True, "message": "Not enough time has passed to gather materials."}
 
-    # Gather base logic (very simple for now)
-    skill_level = getattr(player, f"{player.current_gathering_activity}_level", 1)
+    drops = settle_gathering(db, player, activity, minutes, idle.GATHER_UNIT_SECONDS)
+    if drops:
+        await db.execute(add_materials(player.id, drops))
 
-    # Example: base 1 item per minute, +10% per skill level
-    total_items = int(minutes * (1 + (0.1 * (skill_level - 1))))
-
-    from item_ID import (
-        WOODCUTTING_ITEMS, MINING_ITEMS, FARMING_ITEMS, SCAVENGING_ITEMS,
-    )
-
-    activity_item_pools = {
-        "woodcutting": WOODCUTTING_ITEMS,
-        "mining": MINING_ITEMS,
-        "farming": FARMING_ITEMS,
-        "scavenging": SCAVENGING_ITEMS
-    }
-
-    pool = activity_item_pools.get(player.current_gathering_activity, {})
-    player_level = getattr(player, f"{player.current_gathering_activity}_level", 1)
-
-    # Choose the best item the player qualifies for
-    qualified_items = [
-        item_id for item_id in sorted(pool.keys())
-        if get_item_level(item_id) <= player_level
-    ]
-
-    if not qualified_items:
-        return {"success": False, "error": "No gatherable items available for your level."}
-
-    item_id = qualified_items[-1]  # highest one the player qualifies for
-
-    # Add to gathered_materials (stack or create new)
-    gathered = db.query(models.GatheredMaterial).filter_by(player_id=player.id, item_id=item_id).first()
-    if gathered:
-        gathered.quantity += total_items
-    else:
-        gathered = models.GatheredMaterial(player_id=player.id, item_id=item_id, quantity=total_items)
-        db.add(gathered)
-
-    from item_ID import get_item_name
-
-    item_name = get_item_name(item_id)
-    message = f"You gathered {total_items} x {item_name} over {minutes} minute(s)."
+    gathered = gathering_catalog.describe(drops)
+    message = f"You gathered {drops_message(gathered)} over {minutes} minute(s)."
 
     # If stopping, reset the activity
     if stop:
         player.current_gathering_activity = "none"
         player.gathering_start_time = None
-        message += ". Gathering stopped."
+        message += " Gathering stopped."
     else:
-        player.gathering_start_time = now  # reset for partial collection
+        # Only whole minutes were paid, the partial one keeps counting
+        player.gathering_start_time += datetime.timedelta(seconds=minutes * idle.GATHER_UNIT_SECONDS)
 
-    db.commit()
+    await db.commit()
+    gather_scheduler.watch(player)  # stopped players are dropped
 
     return {
         "success": True,
         "message": message,
-        "item_id": item_id,
-        "quantity_gathered": total_items
+        "drops": gathered,
+        "quantity_gathered": sum(drops.values()),
+        "skill": skill_state(player, activity)
     }
 
 @app.get("/gather/state")
-def get_gathering_state(player_name: str, db: Session = Depends(get_db)):
-    player = db.query(Player).filter_by(name=player_name).first()
+async def get_gathering_state(player_name: str, db: AsyncSession = Depends(get_async_db)):
+    player = (await db.execute(select(Player).filter_by(name=player_name))).scalars().first()
     if not player:
         return {"success": False, "error": "Player not found"}
 
@@ -557,6 +740,25 @@ def get_gathering_state(player_name: str, db: Session = Depends(get_db)):
         "status": f"Currently {activity.value.title()}"
     }
 
+@app.get("/gather/summary")
+async def get_gathering_summary(player_name: str, db: AsyncSession = Depends(get_async_db)):
+    """Every skill, the active activity and what it has gathered so far, in one request.
+
+    Also (re)starts the GatheringUpdate pushes for players with an open chat stream.
+    """
+    player = (await db.execute(select(Player).filter_by(name=player_name))).scalars().first()
+    if not player:
+        return {"success": False, "error": "Player not found"}
+
+    pending = gather_scheduler.watch(player)
+    return {
+        "success": True,
+        "skills": {activity: skill_state(player, activity) for activity in gathering_catalog.pools},
+        "gathering": pending is not None,
+        "activity": pending["activity"] if pending else None,
+        "pending": pending
+    }
+
 @app.post("/collect_materials")
 def collect_materials(payload: dict, db: Session = Depends(get_db)):
     player_name = payload.get("player_name")
@@ -572,78 +774,48 @@ def collect_materials(payload: dict, db: Session = Depends(get_db)):
 
     now = datetime.datetime.now(datetime.UTC)
     elapsed = (now - player.gathering_start_time).total_seconds()
-    units = max(1, int(elapsed // 5))  # 1 unit per 5 seconds
+    # The scheduler's pushed progress uses the same rate, so "N item(s) so far" is what this pays
+    units = idle.collect_units(elapsed)
 
     activity = player.current_gathering_activity.value if hasattr(player.current_gathering_activity, 'value') else player.current_gathering_activity
 
-    skill_level = getattr(player, f"{activity}_level", 1)
-
-    from item_ID import (
-        WOODCUTTING_ITEMS, MINING_ITEMS, FARMING_ITEMS, SCAVENGING_ITEMS,
-        get_item_level, get_item_name, get_item_rarity
-    )
-
-    activity_pools = {
-        "woodcutting": WOODCUTTING_ITEMS,
-        "mining": MINING_ITEMS,
-        "farming": FARMING_ITEMS,
-        "scavenging": SCAVENGING_ITEMS
-    }
-
-    pool = activity_pools.get(activity)
-    if not pool:
+    if gathering_catalog.resolve(activity, 1) is None:
         player.current_gathering_activity = "none"
         player.gathering_start_time = None
         db.commit()
         return {"success": False, "error": f"Invalid gathering activity: {activity}"}
 
-    eligible_items = [item_id for item_id in sorted(pool.keys()) if get_item_level(item_id) <= skill_level]
-
-    if not eligible_items:
-        best_item_id = next(iter(pool), None)
-        total_items = 0
-    else:
-        best_item_id = eligible_items[-1]
-        total_items = int(units * (1 + 0.1 * (skill_level - 1)))
-
-        existing = db.query(models.GatheredMaterial).filter_by(player_id=player.id, item_id=best_item_id).first()
-        if existing:
-            existing.quantity += total_items
-        else:
-            new_entry = models.GatheredMaterial(
-                player_id=player.id,
-                item_id=best_item_id,
-                quantity=total_items,
-                name=get_item_name(best_item_id),
-                rarity=get_item_rarity(best_item_id)
-            )
-            db.add(new_entry)
+    # One draw per level passed through, however many units piled up
+    drops = settle_gathering(db, player, activity, units, idle.COLLECT_UNIT_SECONDS)
+    if drops:
+        db.execute(add_materials(player.id, drops))
 
     player.current_gathering_activity = "none"
     player.gathering_start_time = None
+    gather_scheduler.unwatch(player.name)
 
-    message = f"You collected {total_items} x {get_item_name(best_item_id)} after {elapsed} second(s) of {activity}."
+    gathered = gathering_catalog.describe(drops)
+    message = f"You collected {drops_message(gathered)} after {elapsed} second(s) of {activity}."
 
-    system_msg = models.ChatMessage(
+    db.commit()
+
+    chat_hub.post(
         sender="System",
         recipient=player.name,
         message=message,
-        timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
         type="System"
     )
-    db.add(system_msg)
-
-    db.commit()
 
     return {
         "success": True,
         "message": message,
-        "item_id": best_item_id,
-        "quantity": total_items
+        "drops": gathered,
+        "quantity": sum(drops.values()),
+        "skill": skill_state(player, activity)
     }
 
 
-from item_ID import get_item_name, get_item_rarity, get_item_level  # ✅ Import your item lookup function
+from item_ID import get_item_name, get_item_rarity  # ✅ Import your item lookup function
 
 @app.get("/gathered_materials")
 def get_gathered_materials(player_name: str, db: Session = Depends(get_db)):
@@ -651,7 +823,7 @@ def get_gathered_materials(player_name: str, db: Session = Depends(get_db)):
     if not player:
         return {"success": False, "error": "Player not found."}
 
-    results = db.query(models.GatheredMaterial).filter_by(player_id=player.id).all()
+    results = db.execute(materials_of(player.id)).scalars().all()
 
     return {
         "success": True,
@@ -666,100 +838,157 @@ def get_gathered_materials(player_name: str, db: Session = Depends(get_db)):
         ]
     }
 
-@app.post("/dungeon_complete")
-def dungeon_complete(data: DungeonResult, db: Session = Depends(get_db)):
+@app.post("/idle/claim")
+def claim_idle_progress(data: IdleClaimRequest, db: Session = Depends(get_db)):
+    """Pays out everything the active character accrued since the last claim, in one write."""
     player = (
         db.query(Player)
         .join(Account, Account.id == Player.account_id)
         .filter(Account.username == data.username, Player.is_active == True)
+        .with_for_update(of=Player)  # serialized with /player/sync so neither write loses the other's gains
         .first()
     )
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
 
-    # Update if it's a new highest level or better time
-    updated = False
-    if data.level_completed > (player.highest_dungeon_completed or 0):
-        player.highest_dungeon_completed = data.level_completed
-        player.best_dungeon_time_seconds = data.time_seconds
-        updated = True
-    elif data.level_completed == (player.highest_dungeon_completed or 0):
-        if data.time_seconds < (player.best_dungeon_time_seconds or 9999999):
-            player.best_dungeon_time_seconds = data.time_seconds
-            updated = True
-
-    if updated:
-        db.commit()
+    now = datetime.datetime.now(datetime.UTC)
+    settled_at = idle.parse_time(player.idle_settled_at)
+    logout_at = idle.parse_time(player.last_logout_time)
+    # Time in game isn't paid here, the main screen's copper tick covers it (through /player/sync)
+    _, _, offline_seconds = idle.split_windows(settled_at, logout_at, now)
+    offline_xp, offline_gold = idle.offline_rewards(offline_seconds)
+
+    if offline_xp:
+        apply_experience_and_level_up(db, player, offline_xp)
+    if offline_gold:
+        add_copper(player, offline_gold * 10000)
+
+    # Gathering keeps going while away, same closed form as /gather/status
+    gathered = None
+    activity = player.current_gathering_activity
+    if activity and activity != models.GatheringActivityEnum.none and player.gathering_start_time:
+        activity = activity.value if hasattr(activity, "value") else activity
+        units = idle.gathering_units((now - idle.parse_time(player.gathering_start_time)).total_seconds())
+        if units:
+            drops = settle_gathering(db, player, activity, units, idle.GATHER_UNIT_SECONDS)
+            if drops:
+                db.execute(add_materials(player.id, drops))
+            player.gathering_start_time += datetime.timedelta(seconds=units * idle.GATHER_UNIT_SECONDS)
+            gathered = gathering_catalog.describe(drops) or None
+
+    player.idle_settled_at = now
+    db.commit()
+    # Only once it's committed, a failed commit must not leave the scheduler counting from the new start time
+    gather_scheduler.watch(player)
 
-    return {"success": True, "message": "Dungeon completion recorded"}
+    return {
+        "success": True,
+        "offline_seconds": int(offline_seconds),
+        "rewards": {"experience": offline_xp, "gold": offline_gold, "gathered": gathered},
+        "player": player_state(player)
+    }
 
-@app.get("/dungeon_leaderboard")
-def dungeon_leaderboard(player_name: str = None, db: Session = Depends(get_db)):
-    top_players = (
+@app.post("/dungeon/run")
+def run_dungeon(data: DungeonRunRequest, db: Session = Depends(get_db)):
+    player = (
         db.query(Player)
-        .order_by(Player.highest_dungeon_completed.desc(), Player.best_dungeon_time_seconds.asc())
-        .limit(10)
-        .all()
+        .join(Account, Account.id == Player.account_id)
+        .filter(Account.username == data.username, Player.is_active == True)
+        .with_for_update(of=Player)  # serialized with /player/sync so neither write loses the other's gains
+        .first()
     )
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
 
-    result = [
-        {
-            "name": p.name,
-            "class": p.char_class,
-            "level": p.level,
-            "dungeon": p.highest_dungeon_completed,
-            "time": p.best_dungeon_time_seconds
-        } for p in top_players
-    ]
-
-    # If player_name not in top 10, find their rank
-    player_rank_info = None
-    if player_name:
-        subquery = db.query(
-            Player.name,
-            Player.highest_dungeon_completed,
-            Player.best_dungeon_time_seconds
-        ).order_by(
-            Player.highest_dungeon_completed.desc(),
-            Player.best_dungeon_time_seconds.asc()
-        ).all()
-
-        for idx, p in enumerate(subquery, 1):
-            if p.name == player_name:
-                player = db.query(Player).filter_by(name=player_name).first()
-                player_rank_info = {
-                    "rank": idx,
-                    "name": player.name,
-                    "class": player.char_class,
-                    "level": player.level,
-                    "dungeon": player.highest_dungeon_completed,
-                    "time": player.best_dungeon_time_seconds
-                }
-                break
-
-    return {"success": True, "leaders": result, "player_rank": player_rank_info}
+    highest = player.highest_dungeon_completed or 0
+    if data.level < 1 or data.level > highest + 1:
+        raise HTTPException(status_code=400, detail=f"Dungeon level {data.level} is locked")
+
+    # The client seed is mixed with a server secret so a run can't be re-rolled offline until it looks good
+    seed = ((data.seed or 0) << 32) ^ secrets.randbits(64)
+    rng = random.Random(seed)
+
+    total_stats, equipment = cached_stats(db, player)
+    run = simulate_dungeon(total_stats, equipment, data.level, rng=rng, record_events=True)
+    fights = run.pop("fights")
+
+    rewards = None
+    if run["cleared"]:
+        first_time = data.level > highest
+        xp_reward, copper_reward = dungeon_rewards(data.level, first_time)
+        apply_experience_and_level_up(db, player, xp_reward)
+        add_copper(player, copper_reward)
+
+        # Same rules dungeon_complete used, but with the time the server measured
+        time_seconds = int(round(run["seconds"]))
+        if data.level > highest:
+            player.highest_dungeon_completed = data.level
+            player.best_dungeon_time_seconds = time_seconds
+        elif data.level == highest and time_seconds < (player.best_dungeon_time_seconds or 9999999):
+            player.best_dungeon_time_seconds = time_seconds
+
+        item = roll_dungeon_loot(data.level, player.char_class, first_time, rng=rng)
+        if item and not place_in_inventory(db, player, item):
+            chat_hub.stage(
+                db,
+                sender="System",
+                recipient=player.name,
+                message=f"Your inventory is full, {item['name']} was lost.",
+                type="System"
+            )
+            item = None
 
-@app.post("/inventory/update")
-def update_inventory(request: InventoryUpdateRequest, db: Session = Depends(get_db)):
-    player = db.query(Player).filter_by(name=request.character_name).first()
-    if not player:
-        raise HTTPException(status_code=404, detail="Character not found.")
+        rewards = {"experience": xp_reward, "copper": copper_reward, "first_time": first_time, "item": item}
 
-    player.inventory = request.inventory
+    # Rewards, inventory and the leaderboard (through the commit hook) all land together
     db.commit()
 
-    return {"success": True, "message": f"Inventory updated for {request.character_name}."}
+    if rewards and rewards["item"]:
+        chat_hub.post(
+            sender="InventoryUpdate",
+            recipient=player.name,
+            message=f"{rewards['item']['name']} added to {player.name}'s inventory.",
+            type="InventoryUpdate"
+        )
 
-@app.post("/stats_equipment/update")
-def update_stats_and_equipment(request: StatEquipUpdateRequest, db: Session = Depends(get_db)):
-    player = db.query(Player).filter_by(name=request.character_name).first()
+    return {
+        "success": True,
+        "seed": seed,
+        "run": run,
+        "max_health": total_stats.get("Health", 100),
+        "fights": fights,
+        "rewards": rewards,
+        "player": player_state(player)
+    }
+
+@app.get("/dungeon_leaderboard")
+def dungeon_leaderboard(player_name: str = None):
+    # Ranked in memory, dungeon runs and any other Player commit update it incrementally
+    player_rank_info = leaderboard.rank_of(player_name) if player_name else None
+    return {"success": True, "leaders": leaderboard.top(), "player_rank": player_rank_info}
+
+@app.post("/inventory/apply")
+async def apply_inventory_ops(request: InventoryApplyRequest, db: AsyncSession = Depends(get_async_db)):
+    """Applies move/swap/equip/remove ops if the client's version is still current (409 otherwise)."""
+    player = (await db.execute(
+        select(Player).filter_by(name=request.character_name).with_for_update()
+    )).scalars().first()
     if not player:
         raise HTTPException(status_code=404, detail="Character not found.")
 
-    player.stats = request.stats
-    player.equipment = request.equipment
-    db.commit()
-    return {"success": True, "message": f"Stats and equipment updated for {request.character_name}."}
+    if request.version != (player.inventory_version or 0):
+        raise HTTPException(status_code=409, detail="Inventory changed on the server, reload it.")
+
+    try:
+        rows = (await db.execute(items_at(player.id, slots_for_ops(request.ops)))).scalars().all()
+        changes, removed = write_inventory(db, player, rows, request.ops)
+    except InventoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for row in removed:
+        await db.delete(row)
+    await db.commit()
+
+    return {"success": True, "version": player.inventory_version, "changes": changes}
 
 @app.post("/add_experience")
 def add_experience(payload: dict, db: Session = Depends(get_db)):
@@ -779,17 +1008,15 @@ def add_experience(payload: dict, db: Session = Depends(get_db)):
     if not target_player:
         return {"success": False, "error": f"{target} is not online or doesn't exist."}
 
-    apply_experience_and_level_up(target_player, amount)
+    apply_experience_and_level_up(db, target_player, amount)
     db.commit()
 
-    system_msg = models.ChatMessage(
+    chat_hub.post(
         sender="System",
         recipient=target_player.name,
         message=f"You gained {amount} XP! Your new level is {target_player.level}.",
-        timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
         type="System"
     )
-    db.add(system_msg)
 
     return {
         "success": True,
@@ -870,37 +1097,19 @@ def create_item_endpoint(data: dict, db: Session = Depends(get_db)):
     if not target:
         return {"success": False, "error": f"Target {target_name} not found"}
 
-    # Load current inventory
-    inventory = target.inventory or []
-
-    # Determine used slots
-    used_slots = {itm.get("slot") for itm in inventory if isinstance(itm.get("slot"), int)}
-    max_slots = target.max_inventory_slots or 36
-    all_slots = set(range(max_slots))
-    free_slots = list(all_slots - used_slots)
-
-    if not free_slots:
+    if not place_in_inventory(db, target, item):
         return {"success": False, "error": "Target inventory is full"}
 
-    # Assign the first free slot
-    item["slot"] = free_slots[0]
-
-
-    inventory.append(item)
-    target.inventory = inventory
     db.commit()
     db.refresh(target)
 
-    # ✅ Send system whisper to muted player
-    system_msg = models.ChatMessage(
+    # ✅ Let the target's inventory screen know it needs a reload
+    chat_hub.post(
         sender="InventoryUpdate",
         recipient=target_name,
         message=f"{item['name']} added to {target.name}'s inventory.",
-        timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
         type="InventoryUpdate"
     )
-    db.add(system_msg)
-    db.commit()
 
 
     return {"success": True,
@@ -918,26 +1127,13 @@ def give_item(payload: dict, db: Session = Depends(get_db)):
         return {"success": False, "error": f"Invalid item ID: {item_id}"}
 
     item_name = get_item_name(item_id)
-    rarity = get_item_rarity(item_id)
 
     player = db.query(Player).filter_by(name=target_name).first()
     if not player:
         return {"success": False, "error": f"Target player '{target_name}' not found"}
 
-    # Find or create the material record
-    material = db.query(models.GatheredMaterial).filter_by(player_id=player.id, item_id=item_id).first()
-    if material:
-        material.quantity += quantity
-    else:
-        material = models.GatheredMaterial(
-            player_id=player.id,
-            item_id=item_id,
-            name=item_name,
-            quantity=quantity,
-            rarity=rarity
-        )
-        db.add(material)
-
+    # Stacks onto the existing record or creates it, in one statement
+    db.execute(add_materials(player.id, {item_id: quantity}))
     db.commit()
     return {
         "success": True,
@@ -945,33 +1141,26 @@ def give_item(payload: dict, db: Session = Depends(get_db)):
     }
 
 @app.post("/chat/send")
-def send_chat_message(chat: ChatMessage):
-    db = SessionLocal()
-
-    player = db.query(Player).filter_by(name=chat.sender, is_active=True).first()
+async def send_chat_message(chat: ChatMessage, db: AsyncSession = Depends(get_async_db)):
+    player = (await db.execute(select(Player).filter_by(name=chat.sender, is_active=True))).scalars().first()
     if not player:
         return {"success": False, "error": "Sender not found."}
 
     if player.is_muted:
-        system_msg = models.ChatMessage(
+        await chat_hub.post_async(
             sender="System",
             message="You have been muted. Please contact a GM to resolve this issue.\n User /gms to find any GMs online right now",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System",
             recipient=player.name  # Only this player receives it
         )
-        db.add(system_msg)
-        db.commit()
         return {"success": False, "error": "Muted"}
 
-    new_msg = models.ChatMessage(
+    await chat_hub.post_async(
         sender=chat.sender,
         message=chat.message,
         timestamp=chat.timestamp,
         type=chat.type
     )
-    db.add(new_msg)
-    db.commit()
     return {"success": True}
 
 @app.post("/whisper")
@@ -990,18 +1179,29 @@ def send_whisper(payload: dict, db: Session = Depends(get_db)):
         return {"success": False, "error": f"{recipient_name} is not online."}
 
     # Store message as a private ChatMessage (or handle separately if needed)
-    whisper_message = models.ChatMessage(
+    chat_hub.post(
         sender=sender_name,
         recipient=recipient_name,
         message=message,
-        timestamp=time.time(),
         type="whisper"
     )
-    db.add(whisper_message)
-    db.commit()
 
     return {"success": True}
 
+@app.get("/metrics")
+def get_metrics(username: str = Depends(get_current_username), db: Session = Depends(get_db)):
+    """Connection pool and query metrics, GMs and devs only (signed in, the role comes from their account)."""
+    account = db.query(Account).filter_by(username=username).first()
+    if not account or account.role not in ("gm", "dev"):
+        raise HTTPException(status_code=403, detail="Only GMs and developers can read the metrics.")
+
+    return {
+        "db_pool": {
+            "sync": sync_pool_metrics.snapshot(engine.pool),
+            "async": async_pool_metrics.snapshot(async_engine.sync_engine.pool)
+        }
+    }
+
 @app.get("/required_version")
 def get_required_version():
     return { "version": REQUIRED_VERSION, "download_url": f"https://github.com/Mr-Cee/PyRPG/releases/download/{REQUIRED_VERSION}/update_package.zip" }
@@ -1014,6 +1214,12 @@ def get_players(username: str, token: str = Depends(oauth2_scheme), db: Session
 
     players = db.query(Player).filter_by(account_id=account.id).all()
 
+    # Every character's items in one indexed query
+    inventories = {p.id: [] for p in players}
+    if players:
+        for row in db.execute(items_of(*inventories)).scalars():
+            inventories[row.owner_id].append(item_to_dict(row))
+
     player_list = []
     for p in players:
         player_list.append({
@@ -1027,8 +1233,9 @@ def get_players(username: str, token: str = Depends(oauth2_scheme), db: Session
                 "gold": p.gold,
                 "platinum": p.platinum
             },
-            "inventory": p.inventory,
-            "equipment": p.equipment,
+            "inventory": inventories[p.id],
+            "inventory_version": p.inventory_version or 0,
+            "equipment": equipment_from_items(inventories[p.id]),
             "skills": p.skills,
             "username": account.username,
             "role": account.role,
@@ -1040,38 +1247,19 @@ def get_players(username: str, token: str = Depends(oauth2_scheme), db: Session
     return player_list
 
 @app.get("/player_stats")
-def get_player_stats(requester_name: str, target_name: str = None, db: Session = Depends(get_db)):
+async def get_player_stats(requester_name: str, target_name: str = None, db: AsyncSession = Depends(get_async_db)):
     if target_name is None:
         target_name = requester_name
 
-    player = db.query(Player).filter_by(name=target_name).first()
+    player = (await db.execute(select(Player).filter_by(name=target_name))).scalars().first()
     if not player:
         raise HTTPException(status_code=404, detail="Character not found.")
-
-        # Build total_stats with gear bonuses
-    total_stats = player.stats.copy() if player.stats else {}
-
-    # Add equipment stat bonuses
-    if player.equipment:
-        for item in player.equipment.values():
-            if item and isinstance(item, dict):
-                for stat, value in item.get("stats", {}).items():
-                    total_stats[stat] = total_stats.get(stat, 0) + value
-
-    # Derived stats
-    strength = total_stats.get("Strength", 0)
-    intelligence = total_stats.get("Intelligence", 0)
-    dexterity = total_stats.get("Dexterity", 0)
-    vitality = total_stats.get("Vitality", 0)
-
-    total_stats["Bonus Damage"] = strength // 5
-    total_stats["Bonus Mana"] = intelligence // 5
-    total_stats["Bonus Health"] = vitality // 5
-    total_stats["Avoidance"] = dexterity // 10
-    total_stats["Health"] = total_stats["base_health"] + vitality // 5
-    total_stats["Mana"] = total_stats["base_mana"] + intelligence // 5
-    total_stats["Avoidance"] = intelligence // 10
-    total_stats["Dodge"] = dexterity // 10
+    entry, generation = stat_cache.get(player)
+    if entry is None:
+        equipment = equipment_from_items(
+            item_to_dict(row) for row in (await db.execute(equipped_items(player.id))).scalars()
+        )
+        entry = stat_cache.put(player, equipment, generation)
 
     return {
         "name": player.name,
@@ -1085,8 +1273,8 @@ def get_player_stats(requester_name: str, target_name: str = None, db: Session =
             "platinum": player.platinum
         },
         "base_stats": player.stats if hasattr(player, "stats") else {},
-        "total_stats": total_stats,
-        "equipment": player.equipment,
+        "total_stats": entry.total_stats,
+        "equipment": entry.equipment,
         "is_muted": player.is_muted,
         "highest_dungeon_completed": player.highest_dungeon_completed,
         "best_dungeon_time_seconds": player.best_dungeon_time_seconds
@@ -1104,21 +1292,16 @@ def get_player_coins(requester_name: str, db: Session = Depends(get_db)):
         "platinum": player.platinum
     }
 
-@app.get("/chat/fetch")
-def fetch_chat_messages(since: float = Query(0.0), player_name: str = Query(...), db: Session = Depends(get_db)):
-    messages = (
-        db.query(models.ChatMessage)
+async def query_chat_messages(db: AsyncSession, since: float, player_name: str):
+    messages = (await db.execute(
+        select(models.ChatMessage)
         .filter(models.ChatMessage.timestamp > since)
         .filter(
             or_(
-                models.ChatMessage.type == "Chat",
-                models.ChatMessage.type == "Admin",
+                public_clause(),
                 and_(
                     models.ChatMessage.type == "System",
-                    or_(
-                        models.ChatMessage.recipient == None,
-                        models.ChatMessage.recipient == player_name
-                    )
+                    models.ChatMessage.recipient == player_name
                 ),
                 and_(
                     models.ChatMessage.type == "whisper",
@@ -1135,86 +1318,86 @@ def fetch_chat_messages(since: float = Query(0.0), player_name: str = Query(...)
             )
         )
         .order_by(models.ChatMessage.timestamp)
-        .all()
-    )
+    )).scalars().all()
+    return [serialize_message(msg) for msg in messages]
 
-    return {
-        "messages": [
-            {
-                "sender": msg.sender,
-                "recipient": getattr(msg, "recipient", None),
-                "message": msg.message,
-                "timestamp": msg.timestamp,
-                "type": msg.type
-            } for msg in messages
-        ]
-    }
+# Live messages are pushed over /chat/ws, this is only used to catch up after (re)connecting
+@app.get("/chat/fetch")
+async def fetch_chat_messages(since: float = Query(0.0), player_name: str = Query(...), db: AsyncSession = Depends(get_async_db)):
+    messages, complete = chat_hub.fetch(since, player_name)
+
+    # Only go to the database when the range starts before what the hub still holds in memory
+    if not complete:
+        merged = {msg["id"]: msg for msg in await query_chat_messages(db, since, player_name)}
+        merged.update((msg["id"], msg) for msg in messages)
+        messages = sorted(merged.values(), key=lambda msg: msg["timestamp"])
+
+    return {"messages": messages}
+
+async def _wait_for_disconnect(websocket: WebSocket, queue: asyncio.Queue):
+    # Clients never send anything, we only read to notice when they go away
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        try:
+            queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+@app.websocket("/chat/ws")
+async def chat_stream(websocket: WebSocket, player_name: str = Query(...)):
+    await websocket.accept()
+    queue = chat_hub.subscribe(player_name)
+    reader = asyncio.create_task(_wait_for_disconnect(websocket, queue))
+
+    try:
+        while True:
+            msg = await queue.get()
+            if msg is None:
+                break
+            await websocket.send_json(msg)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        chat_hub.unsubscribe(player_name, queue)
 
 @app.get("/chat/recent")
-def fetch_recent_messages(limit: int = 25, db: Session = Depends(get_db)):
-    messages = db.query(models.ChatMessage).order_by(models.ChatMessage.timestamp.desc()).limit(limit).all()
-    return {
-        "messages": [
-            {
-                "sender": msg.sender,
-                "message": msg.message,
-                "timestamp": msg.timestamp,
-                "type": msg.type
-            } for msg in reversed(messages)
-        ]
-    }
+def fetch_recent_messages(limit: int = 25):
+    return {"messages": chat_hub.recent_messages(limit)}
 
 @app.get("/online_players")
-def get_online_players(db: Session = Depends(get_db)):
-    now = datetime.datetime.now(datetime.UTC)
-    cutoff = now - datetime.timedelta(minutes=2)
-
-    accounts = db.query(Account).filter(Account.is_online == True, Account.last_seen >= cutoff).all()
+def get_online_players():
     result = []
 
-    for account in accounts:
-        character = db.query(Player).filter_by(account_id=account.id, is_active=True).first()
-        if character:
+    # Served from the roster, the database is only read on startup and when someone logs in
+    for username, character in roster.characters(presence.online_usernames()):
+        if character["name"]:
             result.append({
-                "name": character.name,
-                "is_muted": character.is_muted
+                "name": character["name"],
+                "is_muted": character["is_muted"]
             })
         else:
-            result.append(f"[No Active Character for {account.username}]")
+            result.append(f"[No Active Character for {username}]")
 
     return {"online": result}
 
 @app.get("/online_gms")
-def get_online_gms(db: Session = Depends(get_db)):
+def get_online_gms():
     gm_roles = ["gm", "dev"]
-    online_gms = (
-        db.query(models.Player)
-        .join(models.Account, models.Account.id == models.Player.account_id)
-        .filter(
-            models.Player.is_active == True,
-            models.Account.is_online == True,
-            models.Account.role.in_(gm_roles)
-        )
-        .all()
-    )
-    gm_names = [gm.name for gm in online_gms]
+    online_gms = roster.characters(presence.online_usernames(), roles=gm_roles)
+    gm_names = [gm["name"] for _, gm in online_gms if gm["name"]]
     return {"success": True, "gms": gm_names}
 
 @app.get("/online_staff")
-def get_online_staff(db: Session = Depends(get_db)):
+def get_online_staff():
     staff_roles = ["gm", "dev"]
-    staff = (
-        db.query(models.Player.name, models.Account.role)
-        .join(models.Account, models.Account.id == models.Player.account_id)
-        .filter(
-            models.Player.is_active == True,
-            models.Account.is_online == True,
-            models.Account.role.in_(staff_roles)
-        )
-        .all()
-    )
+    staff = roster.characters(presence.online_usernames(), roles=staff_roles)
 
-    formatted = [f"{name} ({role})" for name, role in staff]
+    formatted = [f"{member['name']} ({member['role']})" for _, member in staff if member["name"]]
     return {"success": True, "staff": formatted}
 
 @app.post("/report")
@@ -1232,28 +1415,12 @@ def submit_report(payload: dict, db: Session = Depends(get_db)):
     db.refresh(report)
 
     # Broadcast to online GMs/Devs in Admin tab
-    timestamp = datetime.datetime.now(datetime.UTC).timestamp()
-    staff = (
-        db.query(models.Player.name)
-        .join(models.Account, models.Account.id == models.Player.account_id)
-        .filter(
-            models.Player.is_active == True,
-            models.Account.is_online == True,
-            models.Account.role.in_(["gm", "dev"])
-        )
-        .all()
-    )
-
-    new_msg = models.ChatMessage(
-        id=str(uuid.uuid4()),
+    chat_hub.post(
         sender="Report",
         recipient="Admin",  # Not targeting a player, but tagged as admin
         message=f"[Report] from {sender}: {message}",
-        timestamp=time.time(),
         type="Admin"  # So it only shows in admin tab
     )
-    db.add(new_msg)
-    db.commit()
     return {"success": True}
 
 @app.get("/my_reports")
@@ -1279,12 +1446,23 @@ def reports_view(db: Session = Depends(get_db)):
     }
 
 @app.get("/inventory/{character_name}")
-def get_inventory(character_name: str, db: Session = Depends(get_db)):
-    player = db.query(Player).filter_by(name=character_name).first()
+async def get_inventory(character_name: str, since_version: int = None, db: AsyncSession = Depends(get_async_db)):
+    """The whole inventory list, or with since_version only the slots that changed after that version."""
+    player = (await db.execute(select(Player).filter_by(name=character_name))).scalars().first()
     if not player:
-        return []
+        if since_version is None:
+            return []
+        raise HTTPException(status_code=404, detail="Character not found.")
+
+    version = player.inventory_version or 0
+    changes = None if since_version is None else inventory_log.since(player.id, since_version, version)
+    if changes is not None:
+        return {"version": version, "full": False, "changes": changes}
 
-    return player.inventory  # This assumes it's a JSON-serializable list
+    inventory = [item_to_dict(row) for row in (await db.execute(items_of(player.id))).scalars()]
+    if since_version is None:
+        return inventory
+    return {"version": version, "full": True, "inventory": inventory}
 
 @app.post("/report_resolve")
 def resolve_report(payload: dict, db: Session = Depends(get_db)):
@@ -1367,14 +1545,11 @@ def admin_command(payload: dict, db: Session = Depends(get_db)):
             return {"success": False, "error": "Usage: /broadcast <message>"}
 
         message = parts[1]
-        broadcast = models.ChatMessage(
+        chat_hub.post(
             sender="System",
             message=f"[Admin] {message}",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System"
         )
-        db.add(broadcast)
-        db.commit()
         return {"success": True, "message": "Broadcast sent."}
 
     elif command == "kick":
@@ -1394,17 +1569,18 @@ def admin_command(payload: dict, db: Session = Depends(get_db)):
 
         player.is_active = False
 
+        db.commit()
+        if account:
+            presence.mark_offline(account.username)
+            roster.remove(account.username)
+
         # ✅ System whisper to the kicked player
-        kick_msg = models.ChatMessage(
+        chat_hub.post(
             sender="System",
             recipient=player.name,
             message="[kick] You have been kicked by an admin.",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System"
         )
-        db.add(kick_msg)
-
-        db.commit()
 
         return {"success": True, "message": f"{target_name} kicked."}
 
@@ -1417,26 +1593,23 @@ def admin_command(payload: dict, db: Session = Depends(get_db)):
             return {"success": False, "error": f"Player {target_name} not found."}
         player.is_muted = True
 
+        db.commit()
+        roster.set_muted(player.name, True)
+
         # ✅ Send system whisper to muted player
-        system_msg = models.ChatMessage(
+        chat_hub.post(
             sender="System",
             recipient=player.name,
             message="You have been muted by a GM. You will not be able to chat until unmuted.",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System"
         )
-        db.add(system_msg)
         # ✅ Send system whisper to muted player
-        admin_msg = models.ChatMessage(
+        chat_hub.post(
             sender="Admin",
             recipient=player.name,
             message=f"{target_name} has been muted.",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="Admin"
         )
-        db.add(admin_msg)
-
-        db.commit()
         return {"success": True}
 
     elif command == "unmute":
@@ -1448,27 +1621,24 @@ def admin_command(payload: dict, db: Session = Depends(get_db)):
             return {"success": False, "error": f"Player {target_name} not found."}
         player.is_muted = False
 
+        db.commit()
+        roster.set_muted(player.name, False)
+
         # ✅ Send system whisper to unmuted player
-        system_msg = models.ChatMessage(
+        chat_hub.post(
             sender="System",
             recipient=player.name,
             message="You have been unmuted by a GM. You can now chat again.",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="System"
         )
-        db.add(system_msg)
 
         # ✅ Send system whisper to unmuted player
-        system_msg = models.ChatMessage(
+        chat_hub.post(
             sender="Admin",
             recipient=player.name,
             message=f"{target_name} has been unmuted.",
-            timestamp=datetime.datetime.now(datetime.UTC).timestamp(),
             type="Admin"
         )
-        db.add(system_msg)
-
-        db.commit()
         return {"success": True}
 
     elif command == "spawnboss":
@@ -1,7 +1,7 @@
 GAME_WIDTH = 1280
 GAME_HEIGHT = 720
 
-CLIENT_VERSION = "v0.0.8"
+CLIENT_VERSION = "v0.0.9"
 
 PUBLIC_IP = "75.119.187.81"
 
@@ -9,6 +9,22 @@ PUBLIC_IP = "75.119.187.81"
 SERVER_HOST = f"{PUBLIC_IP}"  # change to your server's LAN IP
 SERVER_PORT = 8000
 SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
+SERVER_WS_URL = f"ws://{SERVER_HOST}:{SERVER_PORT}"
+NETWORK_WORKERS = 4  # background threads for client HTTP, see network.py
+NETWORK_TIMEOUT = 5  # default seconds per request
+NETWORK_TIMEOUTS = {  # per-endpoint overrides, matched by path prefix
+    "/chat/send": 1,
+    "/chat/recent": 2,
+    "/chat/fetch": 2,
+    "/heartbeat": 2,
+    "/online_players": 2,
+    "/logout": 3,
+    "/dungeon/run": 10,  # the whole run is simulated before the server answers
+}
+NETWORK_RETRIES = 2  # extra attempts after a failed connection (or a 502/503/504 on GET/DELETE)
+NETWORK_BACKOFF = 0.25  # seconds before the first retry, doubled each time and jittered
+NETWORK_BACKOFF_CAP = 2
+SYNC_INTERVAL = 5  # seconds between batched saves of the player's coins, XP, stats, equipment and inventory
 
 RARITY_TIERS = {
     "Common": 65,
@@ -1 +1 @@
-python -m uvicorn server:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
+python -m uvicorn server:app --host 0.0.0.0 --port 8000 --reload --timeout-keep-alive 65
\ No newline at end of file
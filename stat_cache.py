@@ -0,0 +1,79 @@
+# stat_cache.py
+# Total stats of recently used characters, so /player_stats and dungeon runs don't re-add every equipped item.
+# Entries are dropped on commit whenever a session changes a character's base stats, class or any of their items
+# (level ups from /player/sync and server grants, /inventory/apply, loot), and rebuilt on the next read.
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+
+import models
+from stats import StatEngine
+
+
+class StatCacheEntry:
+    def __init__(self, base_stats, equipment, char_class):
+        self.base_stats = dict(base_stats)
+        self.equipment = equipment
+        self.total_stats = StatEngine(base_stats, equipment, char_class).total
+
+
+class StatCache:
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # player_id (str) -> StatCacheEntry, least recently used first
+        self.generations = {}  # player_id -> times invalidated, so a read that raced a commit isn't stored
+
+    def attach(self, session_class):
+        event.listen(session_class, "after_flush", self._collect)
+        event.listen(session_class, "after_commit", self._apply)
+        event.listen(session_class, "after_rollback", lambda session: session.info.pop("stat_cache", None))
+
+    def get(self, player):
+        """The cached entry, or (None, generation) to pass to put() after loading the equipment."""
+        player_id = str(player.id)
+        with self.lock:
+            entry = self.entries.get(player_id)
+            # Also checks the base stats, the player row may have been loaded after the last invalidation
+            if entry is not None and entry.base_stats == (player.stats or {}):
+                self.entries.move_to_end(player_id)
+                return entry, None
+            return None, self.generations.get(player_id, 0)
+
+    def put(self, player, equipment, generation):
+        entry = StatCacheEntry(player.stats or {}, equipment, player.char_class)
+        player_id = str(player.id)
+        with self.lock:
+            if self.generations.get(player_id, 0) == generation:
+                self.entries[player_id] = entry
+                self.entries.move_to_end(player_id)
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *player_ids):
+        with self.lock:
+            for player_id in player_ids:
+                self.entries.pop(player_id, None)
+                self.generations[player_id] = self.generations.get(player_id, 0) + 1
+
+    # --- Session hooks ---
+
+    @staticmethod
+    def _collect(session, flush_context):
+        changed = session.info.setdefault("stat_cache", set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, models.Item):
+                changed.add(str(obj.owner_id))
+            elif isinstance(obj, models.Player):
+                attrs = inspect(obj).attrs
+                if obj in session.dirty and not (attrs.stats.history.has_changes()
+                                                 or attrs.char_class.history.has_changes()):
+                    continue
+                changed.add(str(obj.id))
+
+    def _apply(self, session):
+        changed = session.info.pop("stat_cache", None)
+        if changed:
+            self.invalidate(*changed)
@@ -0,0 +1,128 @@
+# stats.py
+# Total stat calculation, shared by the client, the server and the balance simulator.
+
+
+def calculate_total_stats(base_stats, equipment, char_class):
+    return StatEngine(base_stats, equipment, char_class).total
+
+
+class StatEngine:
+    """Total stats kept up to date one slot at a time.
+
+    Every equipped item's stats are its slot's contribution, and the gear sums are adjusted by just that
+    contribution when the slot changes, so equipping a ring doesn't re-add the rest of the gear. The derived
+    stats only depend on those sums and the two hands, and are worked out again on the next read.
+    """
+
+    def __init__(self, base_stats=None, equipment=None, char_class=None):
+        self.char_class = char_class
+        self.base = dict(base_stats or {})
+        self.items = {}  # slot -> equipped item
+        self.gear = {}  # stat -> sum over every equipped item
+        self.sources = {}  # stat -> how many items add to it, so a stat no item gives anymore drops out
+        self._total = None
+        self.sync(equipment or {})
+
+    def set_base(self, base_stats):
+        if base_stats != self.base:
+            self.base = dict(base_stats or {})
+            self._total = None
+
+    def equip(self, slot, item):
+        self.unequip(slot)
+        if not item:
+            return
+        self.items[slot] = item
+        for stat, value in (item.get("stats") or {}).items():
+            self.gear[stat] = self.gear.get(stat, 0) + value
+            self.sources[stat] = self.sources.get(stat, 0) + 1
+        self._total = None
+
+    def unequip(self, slot):
+        item = self.items.pop(slot, None)
+        if item is None:
+            return
+        for stat, value in (item.get("stats") or {}).items():
+            self.sources[stat] -= 1
+            if self.sources[stat]:
+                # Rounded so float stats (Block, Dodge) don't pick up drift over many swaps
+                remaining = self.gear[stat] - value
+                self.gear[stat] = round(remaining, 6) if isinstance(remaining, float) else remaining
+            else:
+                del self.sources[stat], self.gear[stat]
+        self._total = None
+
+    def sync(self, equipment):
+        """Catches up with an equipment dict, touching only the slots whose item changed."""
+        for slot in set(self.items) | set(equipment):
+            item = equipment.get(slot)
+            current = self.items.get(slot)
+            if item is not current and item != current:
+                self.equip(slot, item)
+
+    @property
+    def total(self):
+        if self._total is None:
+            total = self.base.copy()
+            for stat, value in self.gear.items():
+                total[stat] = total.get(stat, 0) + value
+            self._total = derive_stats(total, self.items.get("primary"), self.items.get("secondary"), self.char_class)
+        return dict(self._total)
+
+
+def derive_stats(total_stats, primary, secondary, char_class):
+    """Fills in the derived stats and attack speed of base + gear stats, in place."""
+    # Make sure there's always a fallback
+    total_stats["Attack Speed"] = total_stats.get("Attack Speed", 1.0)
+
+    # Raw stats
+    strength = total_stats.get("Strength", 0)
+    intelligence = total_stats.get("Intelligence", 0)
+    dexterity = total_stats.get("Dexterity", 0)
+    vitality = total_stats.get("Vitality", 0)
+
+    # Derived bonuses
+    total_stats["Bonus Damage"] = strength // 5
+    total_stats["Bonus Mana"] = intelligence // 5
+    total_stats["Bonus Health"] = vitality // 5
+    total_stats["Avoidance"] = dexterity // 10
+
+    # Final calculated pools
+    total_stats["Health"] = total_stats["base_health"] + vitality // 5  # Or however you want to base the starting HP
+    total_stats["Mana"] = total_stats["base_mana"] + intelligence // 5  # Similar logic
+    total_stats["Avoidance"] = intelligence // 10
+    total_stats["Dodge"] = dexterity // 10
+
+    # Begin updated logic for Attack Speed
+    # Default base speed
+    attack_speed = 1.0
+
+    if primary and primary.get("weapon_type") in ("Bow", "Staff"):
+        # 2-handed weapons override everything
+        attack_speed = primary["stats"].get("Attack Speed", 1.0)
+
+    else:
+        primary_speed = primary["stats"].get("Attack Speed", 1.0) if primary else 1.0
+        secondary_bonus = 0
+
+        if secondary:
+            weapon_type = secondary.get("weapon_type")
+            secondary_speed = secondary["stats"].get("Attack Speed", 0)
+
+            if weapon_type == "Shield":
+                secondary_bonus = 0
+            elif weapon_type == "Focus":
+                secondary_bonus = secondary_speed * 0.05  # Small bonus for focus
+            elif weapon_type in ("Sword", "Dagger"):
+                if char_class == "Rogue":
+                    secondary_bonus = secondary_speed * 0.25
+                else:
+                    secondary_bonus = secondary_speed * 0.10
+
+        attack_speed = round(primary_speed + secondary_bonus, 2)
+
+    # Ensure attack_speed is never below a minimum cap
+    attack_speed = max(0.2, attack_speed)
+    total_stats["Attack Speed"] = attack_speed
+
+    return total_stats
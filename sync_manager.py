@@ -0,0 +1,242 @@
+# sync_manager.py
+# Batches the player's local changes into one /player/sync request every few seconds.
+# Snapshots are taken on the main thread (so nothing reads the player mid-change), the HTTP happens on a worker.
+# The inventory (equipped items included) is the exception: InventorySync sends each edit right away as versioned ops.
+#
+# Experience and coins are sent as what was gained or spent since the last sync, never as totals, so a sync
+# can't overwrite what the server granted in the meantime (dungeon runs, idle claims). Level, base stats and
+# totals are the server's, the client catches up through apply_server_state. Requests that answer with that state
+# go through post_after_sync, so the answer covers everything synced before it and pending() is what's left on top.
+import queue
+import threading
+
+import requests
+
+from network import network, transport, PRIORITY_HIGH, PRIORITY_NORMAL
+from settings import SYNC_INTERVAL
+
+
+class SyncManager:
+    def __init__(self, player, interval=SYNC_INTERVAL):
+        self.player = player
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.experience_gained = 0
+        self.copper_delta = 0  # net copper value gained (or spent, negative) since the last snapshot
+        self.holds = 0  # post_after_sync requests still waiting for their answer, no snapshots go out meanwhile
+        self.elapsed = 0.0
+
+        self.outbox = queue.Queue()
+        self.worker = None
+
+    def add_experience(self, amount):
+        with self.lock:
+            self.experience_gained += amount
+
+    def add_copper(self, amount):
+        with self.lock:
+            self.copper_delta += amount
+
+    def pending(self):
+        """(experience, copper) gained since the last snapshot, not on the server yet."""
+        with self.lock:
+            return self.experience_gained, self.copper_delta
+
+    def post_after_sync(self, path, callback, priority=PRIORITY_NORMAL, **kwargs):
+        """network.post once everything gained so far has been synced, for requests answering with server state.
+
+        Snapshots are held until the answer is in, so that state is exactly the synced gains plus whatever the
+        request itself granted, and pending() can be added on top without counting anything twice.
+        """
+        def on_answer(result):
+            with self.lock:
+                self.holds -= 1
+            callback(result)
+
+        with self.lock:
+            self.holds += 1
+        self._queue_snapshot(force=True)
+        self._ensure_worker()
+        self.outbox.put(lambda: network.post(path, callback=on_answer, priority=priority, **kwargs))
+
+    def update(self, time_delta):
+        """Call once per frame. Queues what was gained since the last snapshot at most every `interval` seconds."""
+        self.elapsed += time_delta
+        if self.elapsed >= self.interval:
+            self.elapsed = 0.0
+            self._queue_snapshot()
+
+    def flush(self, wait=False):
+        """Sends what was gained right away. wait=True blocks until it's on the server (logout/quit)."""
+        self._queue_snapshot(force=True)
+        if wait:
+            self.outbox.join()
+
+    def _queue_snapshot(self, force=False):
+        with self.lock:
+            if self.holds and not force:
+                return
+            deltas = {"experience_gained": self.experience_gained, "copper_delta": self.copper_delta}
+            deltas = {key: value for key, value in deltas.items() if value}
+            if not deltas or not self.player.username:
+                return
+            self.experience_gained = self.copper_delta = 0
+
+        payload = {"username": self.player.username, "name": self.player.name, **deltas}
+        self._ensure_worker()
+        self.outbox.put(payload)
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._send_loop, daemon=True)
+            self.worker.start()
+
+    def _send_loop(self):
+        # One worker sends in order, so an older snapshot never lands after a newer one
+        while True:
+            payload = self.outbox.get()
+            if callable(payload):
+                # A post_after_sync request, everything queued before it has been sent
+                try:
+                    payload()
+                finally:
+                    self.outbox.task_done()
+                continue
+            try:
+                response = transport.request("POST", "/player/sync", json=payload)
+                if response.status_code != 200:
+                    print(f"[Sync] Failed to sync: {response.status_code}: {response.text}")
+            except Exception as e:
+                print(f"[Sync] Error syncing: {e}")
+                # Folded into the next snapshot only when the server never got them (refused, unreachable),
+                # a read timeout may have been applied already and would count twice
+                if isinstance(e, requests.exceptions.ConnectionError):
+                    self.add_experience(payload.get("experience_gained", 0))
+                    self.add_copper(payload.get("copper_delta", 0))
+            finally:
+                self.outbox.task_done()
+
+
+class InventorySync:
+    """Keeps player.inventory in step with the server through /inventory/apply and ?since_version= catch-ups.
+
+    Screens move the player's item dicts between slots and call push(). The ops are worked out by comparing
+    every item's slot with where the server last had it, so screens don't have to describe their edits.
+    Runs on the main thread, network callbacks included.
+    """
+
+    def __init__(self, player):
+        self.player = player
+        self.version = None  # None until we've seen the server's inventory
+        self.confirmed = {}  # id(item) -> (item, slot) as the server has it
+        self.in_flight = False
+        self.push_again = False
+        self.refresh_again = False
+        self.listener = None  # called after the server changed the inventory (the open inventory screen)
+
+    def reset(self, version):
+        self.version = version
+        self.confirmed = {id(item): (item, item.get("slot")) for item in self.player.inventory}
+
+    def diff_ops(self):
+        """(ops, new confirmed): swaps that take the server's slots to the local ones, then removals."""
+        where = {item_id: slot for item_id, (item, slot) in self.confirmed.items()}
+        occupant = {slot: item_id for item_id, slot in where.items()}
+        local = {id(item) for item in self.player.inventory}
+
+        ops = []
+        for item in self.player.inventory:
+            item_id = id(item)
+            if item_id not in where or item.get("slot") == where[item_id]:
+                continue
+            current, target = where[item_id], item.get("slot")
+            ops.append({"op": "swap", "from": current, "to": target})
+
+            displaced = occupant.get(target)
+            occupant[target] = item_id
+            where[item_id] = target
+            if displaced is not None:
+                occupant[current] = displaced
+                where[displaced] = current
+            else:
+                occupant.pop(current, None)
+
+        for item_id, slot in where.items():
+            if item_id not in local:
+                ops.append({"op": "remove", "slot": slot})
+
+        confirmed = {item_id: (self.confirmed[item_id][0], slot) for item_id, slot in where.items() if item_id in local}
+        return ops, confirmed
+
+    def push(self):
+        if self.version is None:
+            return  # Nothing to build on yet, the pending reload brings the screen in line
+        if self.in_flight:
+            self.push_again = True
+            return
+
+        ops, confirmed = self.diff_ops()
+        if not ops:
+            return
+
+        self.in_flight = True
+        network.post(
+            "/inventory/apply",
+            json={"character_name": self.player.name, "version": self.version, "ops": ops},
+            callback=lambda result: self._on_applied(result, confirmed),
+            priority=PRIORITY_HIGH
+        )
+
+    def _on_applied(self, result, confirmed):
+        self.in_flight = False
+        if not result.ok:
+            # Someone else changed it first (409) or the move was invalid: the server's copy wins
+            print(f"[Inventory] Edit rejected: {result.describe_error()}")
+            self.push_again = self.refresh_again = False
+            self.refresh(full=True)
+            return
+
+        self.version = result.json().get("version", self.version)
+        self.confirmed = confirmed
+
+        if self.refresh_again:
+            self.refresh_again = False
+            self.refresh()
+        if self.push_again:
+            self.push_again = False
+            self.push()
+
+    def refresh(self, full=False):
+        """Fetches what changed since our version (or everything). Safe to call from any thread."""
+        since = -1 if full or self.version is None else self.version
+        network.get(f"/inventory/{self.player.name}", params={"since_version": since},
+                    callback=self._on_refreshed, priority=PRIORITY_HIGH)
+
+    def _on_refreshed(self, result):
+        if not result.ok:
+            print(f"[Inventory] Failed to reload inventory: {result.describe_error()}")
+            return
+        if self.in_flight:
+            # Our own edit is still on its way, catch up once it has landed
+            self.refresh_again = True
+            return
+
+        data = result.json()
+        version = data.get("version", 0)
+        if self.version is not None and version < self.version:
+            return  # answered before our last edit landed, we're already ahead
+
+        if data.get("full"):
+            self.player.inventory = data.get("inventory") or []
+        else:
+            self.apply_changes(data.get("changes", []))
+        self.reset(version)
+
+        if self.listener:
+            self.listener()
+
+    def apply_changes(self, changes):
+        changed_slots = [change["slot"] for change in changes]
+        inventory = [item for item in self.player.inventory if item.get("slot") not in changed_slots]
+        inventory.extend(change["item"] for change in changes if change["item"] is not None)
+        self.player.inventory = inventory